@@ -5,12 +5,21 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from soap_client import SOAPClient
 from config import Config
-import traceback
+from metrics import instrument_flask
+from logger import get_logger
+import tracing
 import requests  # ⭐ AGREGAR ESTA LÍNEA
 
 
+log = get_logger('BACKEND REST')
+
 app = Flask(__name__)
 CORS(app)  # Permitir requests desde cualquier origen
+instrument_flask(app, 'backend_rest')  # GET /metrics y duración de cada request
+
+# Servicio de entrada: cada request empieza una traza (o continúa la del cliente)
+tracing.init_tracing('backend_rest')
+tracing.instrument_flask(app, root=True)
 
 # Cliente SOAP global
 soap_client = SOAPClient(Config.SOAP_URL)
@@ -69,8 +78,6 @@ def register():
         if not data.get('email'):
             return jsonify({'error': 'email es requerido'}), 400
         
-        print(f"[BACKEND REST] Registrando usuario: {data['username']}")
-        
         # Llamar al servidor SOAP
         success, result = soap_client.register(
             username=data['username'],
@@ -81,15 +88,14 @@ def register():
         )
         
         if success:
-            print(f"[BACKEND REST] Usuario registrado exitosamente: ID={result['user_id']}")
+            log.info("Usuario %s registrado: ID=%s", data['username'], result['user_id'])
             return jsonify(result), 201
         else:
-            print(f"[BACKEND REST] Error al registrar: {result.get('message')}")
+            log.info("Error al registrar %s: %s", data['username'], result.get('message'))
             return jsonify(result), 400
             
     except Exception as e:
-        print(f"[BACKEND REST] Error en registro: {e}")
-        traceback.print_exc()
+        log.exception("Error en registro: %s", e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 # ═══════════════════════════════════════════════════════
@@ -128,8 +134,6 @@ def login():
         if not data.get('password'):
             return jsonify({'error': 'password es requerido'}), 400
         
-        print(f"[BACKEND REST] Login usuario: {data['username']}")
-        
         # Llamar al servidor SOAP
         success, result = soap_client.login(
             username=data['username'],
@@ -137,15 +141,14 @@ def login():
         )
         
         if success:
-            print(f"[BACKEND REST] Login exitoso: {data['username']}")
+            log.info("Login exitoso: %s", data['username'])
             return jsonify(result), 200
         else:
-            print(f"[BACKEND REST] Login fallido: {result.get('message')}")
+            log.info("Login fallido de %s: %s", data['username'], result.get('message'))
             return jsonify(result), 401
             
     except Exception as e:
-        print(f"[BACKEND REST] Error en login: {e}")
-        traceback.print_exc()
+        log.exception("Error en login: %s", e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 # ═══════════════════════════════════════════════════════
@@ -174,16 +177,13 @@ def logout():
         if not data or not data.get('token'):
             return jsonify({'error': 'token es requerido'}), 400
         
-        print(f"[BACKEND REST] Logout token: {data['token'][:10]}...")
-        
         # Llamar al servidor SOAP
         success, result = soap_client.logout(token=data['token'])
         
         return jsonify(result), 200 if success else 400
             
     except Exception as e:
-        print(f"[BACKEND REST] Error en logout: {e}")
-        traceback.print_exc()
+        log.exception("Error en logout: %s", e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 # ═══════════════════════════════════════════════════════
@@ -240,8 +240,7 @@ def process_batch():
         if not data.get('images') or not isinstance(data['images'], list):
             return jsonify({'error': 'images debe ser un array'}), 400
         
-        print(f"[BACKEND REST] Procesando lote: {data['batch_name']}")
-        print(f"[BACKEND REST] Número de imágenes: {len(data['images'])}")
+        log.info("Procesando lote '%s': %d imágenes", data['batch_name'], len(data['images']))
         
         # Llamar al servidor SOAP
         success, result = soap_client.process_batch(
@@ -251,15 +250,14 @@ def process_batch():
         )
         
         if success:
-            print(f"[BACKEND REST] Lote procesado exitosamente")
+            log.info("Lote '%s' procesado (batch_id=%s)", data['batch_name'], result.get('batch_id'))
             return jsonify(result), 200
         else:
-            print(f"[BACKEND REST] Error procesando lote")
+            log.warning("Error procesando lote '%s': %s", data['batch_name'], result.get('message'))
             return jsonify(result), 400
             
     except Exception as e:
-        print(f"[BACKEND REST] Error en process_batch: {e}")
-        traceback.print_exc()
+        log.exception("Error en process_batch: %s", e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 
@@ -274,8 +272,6 @@ def get_nodes_metrics():
     Obtener métricas de todos los nodos (vía SOAP)
     """
     try:
-        print(f"[BACKEND REST] Solicitando métricas de nodos vía SOAP")
-        
         success, nodes = soap_client.get_nodes_metrics()
         
         if success:
@@ -284,8 +280,7 @@ def get_nodes_metrics():
             return jsonify({'error': 'Error obteniendo métricas'}), 500
             
     except Exception as e:
-        print(f"[BACKEND REST] Error en métricas: {e}")
-        traceback.print_exc()
+        log.exception("Error en métricas: %s", e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 @app.route('/api/metrics/batches/<int:batch_id>', methods=['GET'])
@@ -295,8 +290,6 @@ def get_batch_metrics(batch_id):
     Obtener métricas de un lote procesado (vía SOAP)
     """
     try:
-        print(f"[BACKEND REST] Solicitando métricas de batch {batch_id} vía SOAP")
-        
         success, metrics = soap_client.get_batch_metrics(batch_id)
         
         if success:
@@ -305,8 +298,7 @@ def get_batch_metrics(batch_id):
             return jsonify({'error': 'Lote no encontrado'}), 404
             
     except Exception as e:
-        print(f"[BACKEND REST] Error en métricas de lote: {e}")
-        traceback.print_exc()
+        log.exception("Error en métricas de lote %s: %s", batch_id, e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 # ═══════════════════════════════════════════════════════
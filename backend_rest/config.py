@@ -11,5 +11,13 @@ class Config:
     PORT = int(os.getenv('REST_PORT', 3000))
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     
+    # Servidor de producción (gunicorn -c gunicorn.conf.py wsgi:app)
+    WORKERS = int(os.getenv('WORKERS', 0)) or (os.cpu_count() or 1) * 2 + 1
+    THREADS = int(os.getenv('THREADS', 16))                     # Casi todo es espera al SOAP
+    KEEPALIVE = int(os.getenv('KEEPALIVE', 5))
+    WORKER_TIMEOUT = int(os.getenv('WORKER_TIMEOUT', 300))      # Lotes grandes esperan al SOAP
+    GRACEFUL_TIMEOUT = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+    MAX_REQUESTS = int(os.getenv('MAX_REQUESTS', 0))
+    
     # URL del servidor SOAP
     SOAP_URL = os.getenv('SOAP_URL', 'http://localhost:8000/soap')
@@ -0,0 +1,30 @@
+# Archivo: backend_rest/gunicorn.conf.py
+# CONFIGURACIÓN DE GUNICORN PARA EL BACKEND REST (PRODUCCIÓN)
+#
+# Uso:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Recarga sin cortar conexiones (código nuevo, workers nuevos):
+#   kill -HUP <pid del master>
+
+from config import Config
+
+bind = f'{Config.HOST}:{Config.PORT}'
+
+# Casi todo el tiempo de un request es espera al servidor SOAP: pocos
+# procesos con muchos threads
+worker_class = 'gthread'
+workers = Config.WORKERS
+threads = Config.THREADS
+
+keepalive = Config.KEEPALIVE
+timeout = Config.WORKER_TIMEOUT
+graceful_timeout = Config.GRACEFUL_TIMEOUT
+max_requests = Config.MAX_REQUESTS
+max_requests_jitter = Config.MAX_REQUESTS // 10
+
+# Sin preload: el cliente SOAP (y su sesión HTTP) se crea en cada worker
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,338 @@
+# Archivo: backend_rest/metrics.py
+# MÉTRICAS EN FORMATO DE TEXTO DE PROMETHEUS: CONTADORES, GAUGES E HISTOGRAMAS
+#
+# Mantener igual en backend_rest/, server/, db_service/ y node/: cada
+# servicio se despliega desde su propio directorio.
+#
+# Uso:
+#   REQUESTS = counter('app_requests_total', 'Requests atendidos', ['route'])
+#   LATENCY = histogram('app_request_seconds', 'Latencia', ['route'])
+#   REQUESTS.labels('/login').inc()
+#   with LATENCY.labels('/login').time():
+#       ...
+#   expose()  -> texto para GET /metrics
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites superiores (segundos) por defecto de los histogramas de latencia
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _Shards:
+    """
+    Celdas de acumulación por thread
+
+    Cada thread suma en su propia lista (threading.local), así un inc() u
+    observe() no toma locks ni compite con otros threads: el lock solo se
+    usa la primera vez que un thread escribe y al leer (collect). Las
+    celdas de threads terminados se suman a una base y se descartan, para
+    que los servidores con un thread por request no acumulen celdas.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cells = []                # (thread, celda)
+        self._retired = [0.0] * size    # Totales de threads terminados
+        self._next_sweep = 64
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            pass
+
+        cell = [0.0] * self.size
+        with self._lock:
+            self._cells.append((threading.current_thread(), cell))
+            if len(self._cells) >= self._next_sweep:
+                self._sweep()
+        self._local.cell = cell
+        return cell
+
+    def _sweep(self):
+        """Se llama con el lock tomado"""
+        alive = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                alive.append((thread, cell))
+            else:
+                for index, value in enumerate(cell):
+                    self._retired[index] += value
+        self._cells = alive
+        self._next_sweep = 2 * len(alive) + 64
+
+    def totals(self):
+        with self._lock:
+            self._sweep()
+            totals = list(self._retired)
+            for _, cell in self._cells:
+                for index, value in enumerate(cell):
+                    totals[index] += value
+        return totals
+
+class _CounterChild:
+    __slots__ = ('_shards',)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.cell()[0] += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self._shards.totals()[0])]
+
+class _GaugeChild:
+    __slots__ = ('_value', '_function')
+
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        """Calcular el valor al exportar (p. ej. conexiones en uso de un pool)"""
+        self._function = function
+
+    def samples(self, name, labels):
+        value = self._value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                value = None
+        if value is None:
+            return []
+        return [(name, labels, value)]
+
+class _HistogramChild:
+    __slots__ = ('_buckets', '_shards')
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        # Un contador por bucket (+Inf incluido), suma y cantidad
+        self._shards = _Shards(len(buckets) + 3)
+
+    def observe(self, value):
+        cell = self._shards.cell()
+        cell[bisect.bisect_left(self._buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self):
+        """Observar la duración (segundos) del bloque"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name, labels):
+        totals = self._shards.totals()
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float('inf'),), totals):
+            cumulative += count
+            samples.append((f'{name}_bucket', labels + (('le', bound),), cumulative))
+        samples.append((f'{name}_sum', labels, totals[-2]))
+        samples.append((f'{name}_count', labels, totals[-1]))
+        return samples
+
+class Metric:
+    """
+    Métrica con nombre, ayuda y (opcionalmente) labels
+
+    Sin labels la métrica se usa directamente (REQUESTS.inc()); con labels
+    cada combinación de valores es un hijo (REQUESTS.labels('GET').inc()).
+    Conviene guardar el hijo en los caminos más calientes.
+    """
+
+    def __init__(self, kind, name, documentation, labelnames, child_factory):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._child_factory = child_factory
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._children[()] = child_factory()
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} espera labels {self.labelnames}')
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._child_factory()
+        return child
+
+    def __getattr__(self, name):
+        # inc/set/observe/time de la métrica sin labels
+        if name.startswith('_') or self.__dict__.get('labelnames', True):
+            raise AttributeError(name)
+        return getattr(self._default, name)
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        samples = []
+        for key, child in children:
+            samples.extend(child.samples(self.name, tuple(zip(self.labelnames, key))))
+        return samples
+
+class Registry:
+    """Conjunto de métricas de un proceso"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Módulos importados dos veces comparten la métrica
+                if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+                    raise ValueError(f'Métrica {metric.name} ya registrada con otro tipo o labels')
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def expose(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        if not isinstance(value, str):
+            value = _format_value(value)
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+# Registro compartido por todo el proceso
+REGISTRY = Registry()
+
+def counter(name, documentation, labelnames=()):
+    """Contador monótono (inc)"""
+    return REGISTRY.register(Metric('counter', name, documentation, labelnames, _CounterChild))
+
+def gauge(name, documentation, labelnames=()):
+    """Valor instantáneo (set o set_function)"""
+    return REGISTRY.register(Metric('gauge', name, documentation, labelnames, _GaugeChild))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Distribución por buckets acumulativos (observe o time)"""
+    buckets = tuple(sorted(float(bound) for bound in buckets))
+    return REGISTRY.register(Metric('histogram', name, documentation, labelnames,
+                                    lambda: _HistogramChild(buckets)))
+
+def expose():
+    return REGISTRY.expose()
+
+def instrument_flask(app, prefix):
+    """
+    Registrar GET /metrics y medir cada request de una app Flask
+
+    prefix_http_requests_seconds{method, route, status}: la ruta es la
+    regla de Flask (/api/batches/<int:batch_id>), no la URL, para que la
+    cantidad de series no crezca con los ids. Con gunicorn cada worker
+    tiene su propio registro: cada scrape ve el worker que lo atiende.
+    """
+    from flask import Response, g, request
+
+    requests_seconds = histogram(
+        f'{prefix}_http_requests_seconds', 'Duración de los requests HTTP',
+        ['method', 'route', 'status']
+    )
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            requests_seconds.labels(request.method, route, response.status_code).observe(
+                time.perf_counter() - start
+            )
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Métricas del worker en formato Prometheus"""
+        return Response(expose(), content_type=CONTENT_TYPE)
+
+    return app
+
+def start_http_server(port, host='0.0.0.0'):
+    """Servir GET /metrics en un thread propio (servicios sin servidor HTTP)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404, 'Solo /metrics')
+                return
+            body = expose().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    return server
+
+# Métricas del proceso (todos los servicios)
+gauge('process_start_time_seconds', 'Inicio del proceso (epoch)').set(time.time())
+gauge('process_threads', 'Threads vivos del proceso').set_function(threading.active_count)
@@ -6,6 +6,17 @@ import xml.etree.ElementTree as ET
 import json
 import gzip
 import base64
+import time
+
+from metrics import histogram
+from logger import get_logger
+import tracing
+
+SOAP_CALL_SECONDS = histogram(
+    'backend_soap_call_seconds', 'Latencia de las llamadas al servidor SOAP', ['operation', 'status']
+)
+
+log = get_logger('SOAP CLIENT')
 
 class SOAPClient:
     """Cliente que traduce peticiones REST a SOAP"""
@@ -23,6 +34,19 @@ class SOAPClient:
             'ns': 'http://example.org/ImageProcessingService.wsdl'
         }
     
+    def _post(self, operation, soap_envelope):
+        """POST del envelope al servidor SOAP, medido por operación"""
+        start = time.perf_counter()
+        status = 'error'
+        with tracing.span(f'soap {operation}', kind='client') as span:
+            try:
+                response = self.session.post(self.soap_url, data=soap_envelope, headers=tracing.inject())
+                status = response.status_code
+                span.set_attribute('http.status_code', status)
+                return response
+            finally:
+                SOAP_CALL_SECONDS.labels(operation, status).observe(time.perf_counter() - start)
+    
     def register(self, username, password, email, first_name=None, last_name=None):
         """Registrar usuario"""
         
@@ -43,10 +67,8 @@ class SOAPClient:
   </soap:Body>
 </soap:Envelope>'''
         
-        print(f"[SOAP CLIENT] Enviando RegisterRequest a {self.soap_url}")
-        
         try:
-            response = self.session.post(self.soap_url, data=soap_envelope)
+            response = self._post('Register', soap_envelope)
             
             if response.status_code == 200:
                 root = ET.fromstring(response.text)
@@ -67,7 +89,7 @@ class SOAPClient:
                 }
                 
         except Exception as e:
-            print(f"[SOAP CLIENT] Error: {e}")
+            log.error("Error en Register: %s", e)
             return False, {
                 'success': False,
                 'message': f'Error de comunicación: {str(e)}'
@@ -86,10 +108,8 @@ class SOAPClient:
   </soap:Body>
 </soap:Envelope>'''
         
-        print(f"[SOAP CLIENT] Enviando LoginRequest")
-        
         try:
-            response = self.session.post(self.soap_url, data=soap_envelope)
+            response = self._post('Login', soap_envelope)
             
             if response.status_code == 200:
                 root = ET.fromstring(response.text)
@@ -112,7 +132,7 @@ class SOAPClient:
                 }
                 
         except Exception as e:
-            print(f"[SOAP CLIENT] Error: {e}")
+            log.error("Error en Login: %s", e)
             return False, {
                 'success': False,
                 'message': f'Error de comunicación: {str(e)}'
@@ -130,10 +150,8 @@ class SOAPClient:
   </soap:Body>
 </soap:Envelope>'''
         
-        print(f"[SOAP CLIENT] Enviando LogoutRequest")
-        
         try:
-            response = self.session.post(self.soap_url, data=soap_envelope)
+            response = self._post('Logout', soap_envelope)
             
             if response.status_code == 200:
                 root = ET.fromstring(response.text)
@@ -152,7 +170,7 @@ class SOAPClient:
                 }
                 
         except Exception as e:
-            print(f"[SOAP CLIENT] Error: {e}")
+            log.error("Error en Logout: %s", e)
             return False, {
                 'success': False,
                 'message': f'Error de comunicación: {str(e)}'
@@ -161,15 +179,13 @@ class SOAPClient:
     def process_batch(self, token, batch_name, images):
         """Procesar lote de imágenes"""
         
-        print(f"[SOAP CLIENT] Preparando lote con {len(images)} imágenes")
-        
         # Convertir a JSON
         images_json = json.dumps(images)
-        print(f"[SOAP CLIENT] JSON generado: {len(images_json)} bytes ({len(images_json)/1024:.1f} KB)")
         
         # ✅ OPTIMIZACIÓN: SIN GZIP - Solo base64 (mucho más rápido)
         images_json_base64 = base64.b64encode(images_json.encode('utf-8')).decode('utf-8')
-        print(f"[SOAP CLIENT] Tamaño final: {len(images_json_base64)} bytes ({len(images_json_base64)/1024:.1f} KB)")
+        log.debug("Lote con %d imágenes: JSON %d bytes, base64 %d bytes",
+                  len(images), len(images_json), len(images_json_base64))
         
         # Construir XML SOAP
         soap_envelope = f'''<?xml version="1.0" encoding="UTF-8"?>
@@ -183,10 +199,8 @@ class SOAPClient:
   </soap:Body>
 </soap:Envelope>'''
         
-        print(f"[SOAP CLIENT] Enviando ProcessBatchRequest")
-        
         try:
-            response = self.session.post(self.soap_url, data=soap_envelope)
+            response = self._post('ProcessBatch', soap_envelope)
             
             if response.status_code == 200:
                 root = ET.fromstring(response.text)
@@ -203,8 +217,7 @@ class SOAPClient:
                 download_url_elem = root.find('.//ns:download_url', self.namespaces)
                 download_url = download_url_elem.text if download_url_elem is not None else ''
                 
-                print(f"[SOAP CLIENT] Lote procesado exitosamente")
-                print(f"[SOAP CLIENT] Download URL: {download_url}")
+                log.debug("Lote procesado, descarga: %s", download_url)
                 
                 return success, {
                     'success': success,
@@ -223,9 +236,7 @@ class SOAPClient:
                 }
                 
         except Exception as e:
-            print(f"[SOAP CLIENT] Error: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error en ProcessBatch: %s", e)
             return False, {
                 'success': False,
                 'message': f'Error de comunicación: {str(e)}'
@@ -241,10 +252,8 @@ class SOAPClient:
   </soap:Body>
 </soap:Envelope>'''
         
-        print(f"[SOAP CLIENT] Enviando GetNodesMetricsRequest")
-        
         try:
-            response = self.session.post(self.soap_url, data=soap_envelope)
+            response = self._post('GetNodesMetrics', soap_envelope)
             
             if response.status_code == 200:
                 root = ET.fromstring(response.text)
@@ -261,9 +270,7 @@ class SOAPClient:
                 return False, {'nodes': []}
                 
         except Exception as e:
-            print(f"[SOAP CLIENT] Error: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error en GetNodesMetrics: %s", e)
             return False, {'nodes': []}
     
     def get_batch_metrics(self, batch_id):
@@ -277,10 +284,8 @@ class SOAPClient:
   </soap:Body>
 </soap:Envelope>'''
         
-        print(f"[SOAP CLIENT] Enviando GetBatchMetricsRequest para batch {batch_id}")
-        
         try:
-            response = self.session.post(self.soap_url, data=soap_envelope)
+            response = self._post('GetBatchMetrics', soap_envelope)
             
             if response.status_code == 200:
                 root = ET.fromstring(response.text)
@@ -296,5 +301,5 @@ class SOAPClient:
                 return False, {}
                 
         except Exception as e:
-            print(f"[SOAP CLIENT] Error: {e}")
+            log.error("Error en GetBatchMetrics (lote %s): %s", batch_id, e)
             return False, {}
\ No newline at end of file
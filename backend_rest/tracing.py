@@ -0,0 +1,478 @@
+# Archivo: backend_rest/tracing.py
+# TRAZAS DISTRIBUIDAS: CONTEXTO W3C (traceparent), SPANS Y EXPORTACIÓN OTLP/JSON
+#
+# Mantener igual en backend_rest/, server/, db_service/ y node/: cada
+# servicio se despliega desde su propio directorio.
+#
+# El contexto viaja en el header HTTP "traceparent" (backend_rest → SOAP →
+# db_service) y en la metadata gRPC del mismo nombre (servidor → nodos).
+#
+# Variables de entorno:
+#   TRACE_EXPORTER       none (por defecto: sin trazas), file u otlp
+#   TRACE_FILE           JSON Lines de salida (por defecto traces/<servicio>.jsonl)
+#   TRACE_FILE_MAX_BYTES Tamaño al que se rota el archivo (50 MB, 0 = sin límite)
+#   TRACE_FILE_BACKUPS   Archivos rotados que se conservan (<servicio>.1.jsonl, ...; 3)
+#   TRACE_OTLP_ENDPOINT  Colector OTLP/HTTP (por defecto http://localhost:4318)
+#   TRACE_SAMPLE_RATE    Fracción de trazas nuevas que se registran (1.0)
+#
+# Cada línea del archivo es un ExportTraceServiceRequest en JSON (el mismo
+# formato que el file exporter del OpenTelemetry Collector).
+# tools/trace_timeline.py las lee y arma el camino crítico de un lote.
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from logger import get_logger
+
+log = get_logger('TRACING')
+
+TRACEPARENT = 'traceparent'
+
+_TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Códigos de SpanKind de OTLP
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+class SpanContext:
+    """Identificadores que se propagan entre servicios"""
+
+    __slots__ = ('trace_id', 'span_id', 'sampled')
+
+    def __init__(self, trace_id, span_id, sampled=True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+def parse_traceparent(value):
+    """SpanContext del header traceparent, o None si falta o es inválido"""
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if match is None or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & 1))
+
+class Span:
+    """Una etapa con inicio, fin, atributos y span padre"""
+
+    __slots__ = ('name', 'context', 'parent_id', 'kind', 'start_ns', 'end_ns',
+                 'attributes', 'links', 'error')
+
+    def __init__(self, name, context, parent_id=None, kind='internal', attributes=None,
+                 links=(), start_ns=None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.links = [link for link in links if link is not None]
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, message):
+        self.error = str(message)
+
+    def end(self, end_ns=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.context.sampled and _exporter is not None:
+            _exporter.submit(self)
+
+class _NoopSpan:
+    """Span de un request sin traza: no registra ni propaga nada"""
+
+    context = None
+    name = ''
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_error(self, message):
+        pass
+
+    def end(self, end_ns=None):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+_current = contextvars.ContextVar('tracing_span', default=NOOP_SPAN)
+_CURRENT = object()     # parent por defecto: el span activo
+
+_sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', 1.0))
+_exporter = None
+
+def _new_id(bits):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+def current_span():
+    return _current.get()
+
+def current_context():
+    """SpanContext activo (None fuera de una traza)"""
+    return _current.get().context
+
+def start_span(name, parent=_CURRENT, root=False, kind='internal', attributes=None, links=(),
+               start_ns=None):
+    """
+    Crear un span (hay que llamar end() o usar span())
+
+    Args:
+        parent: SpanContext padre; por defecto el span activo
+        root: Sin padre, empezar una traza nueva (sujeta a TRACE_SAMPLE_RATE).
+              Si es False y no hay padre no se registra nada (NOOP_SPAN)
+        kind: 'internal', 'server' o 'client'
+        links: SpanContext relacionados (p. ej. los registros de un envío en bloque)
+    """
+    if parent is _CURRENT:
+        parent = current_context()
+
+    if parent is not None:
+        context = SpanContext(parent.trace_id, _new_id(64), parent.sampled)
+        parent_id = parent.span_id
+    elif root:
+        context = SpanContext(_new_id(128), _new_id(64), random.random() < _sample_rate)
+        parent_id = None
+    else:
+        return NOOP_SPAN
+
+    return Span(name, context, parent_id, kind, attributes, links, start_ns)
+
+def activate(span):
+    """Hacer span el activo del contexto actual. Retorna el token para deactivate"""
+    return _current.set(span)
+
+def deactivate(token):
+    _current.reset(token)
+
+@contextmanager
+def span(name, parent=_CURRENT, root=False, kind='internal', attributes=None, links=()):
+    """Span del bloque; queda activo adentro y registra la excepción si la hay"""
+    current = start_span(name, parent, root, kind, attributes, links)
+    if current is NOOP_SPAN:
+        yield current
+        return
+
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+def traced(name, kind='internal'):
+    """Decorador: cada llamada es un span (atributos con current_span().set_attribute)"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, kind=kind):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_span(name, start_ns, end_ns, parent=_CURRENT, attributes=None):
+    """Registrar una etapa ya medida (p. ej. la espera en una cola)"""
+    recorded = start_span(name, parent, attributes=attributes, start_ns=start_ns)
+    recorded.end(end_ns)
+
+def wrap(function):
+    """Función que corre con el span activo de ahora (para threads y pools)"""
+    captured = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(captured)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+def inject(headers=None):
+    """Agregar traceparent a headers (dict) si hay una traza activa"""
+    headers = {} if headers is None else headers
+    context = current_context()
+    if context is not None:
+        headers[TRACEPARENT] = context.traceparent()
+    return headers
+
+def inject_metadata():
+    """Metadata gRPC con traceparent (o None fuera de una traza)"""
+    context = current_context()
+    if context is None:
+        return None
+    return ((TRACEPARENT, context.traceparent()),)
+
+def extract(headers):
+    """SpanContext recibido en headers HTTP o metadata gRPC (mapping o pares)"""
+    if headers is None:
+        return None
+    if not hasattr(headers, 'get'):
+        headers = dict(headers)
+    return parse_traceparent(headers.get(TRACEPARENT) or headers.get('Traceparent'))
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+def _encode_span(span):
+    encoded = {
+        'traceId': span.context.trace_id,
+        'spanId': span.context.span_id,
+        'parentSpanId': span.parent_id or '',
+        'name': span.name,
+        'kind': SPAN_KINDS.get(span.kind, 1),
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': [_attribute(key, value) for key, value in span.attributes.items()],
+        'status': {'code': 2, 'message': span.error} if span.error else {'code': 0}
+    }
+    if span.links:
+        encoded['links'] = [{'traceId': link.trace_id, 'spanId': link.span_id} for link in span.links]
+    return encoded
+
+class SpanExporter:
+    """
+    Exporta spans en bloque desde un thread propio
+
+    end() solo encola (nunca espera disco ni red); si la cola se llena los
+    spans se descartan y se cuentan en dropped. En modo file el archivo se
+    rota al llegar a max_bytes y se conservan backups archivos viejos.
+    """
+
+    def __init__(self, service, mode='file', path=None, endpoint=None,
+                 batch_size=512, flush_interval=1.0, max_queue=20000,
+                 max_bytes=50 * 1024 * 1024, backups=3):
+        self.service = service
+        self.mode = mode
+        self.path = path or os.path.join('traces', f'{service}.jsonl')
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.endpoint = (endpoint or 'http://localhost:4318').rstrip('/') + '/v1/traces'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = []              # Lote que arma el thread (visible para flush)
+        self._export_lock = threading.Lock()
+
+        self.exported = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # Después de un fork el thread del padre no existe en el hijo
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                    self._pending = []
+                    self._export_lock = threading.Lock()
+                    self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def submit(self, span):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _take_pending(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _run(self):
+        while True:
+            span = self._queue.get()
+            with self._lock:
+                self._pending.append(span)
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    span = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                with self._lock:
+                    self._pending.append(span)
+            with self._export_lock:
+                batch = self._take_pending()
+                if batch:
+                    self._export(batch)
+
+    def _payload(self, spans):
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [_attribute('service.name', self.service)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'tracing'},
+                    'spans': [_encode_span(span) for span in spans]
+                }]
+            }]
+        }
+
+    def _rotated_path(self, index):
+        # <servicio>.1.jsonl: sigue entrando en los globs *.jsonl de trace_timeline
+        root, ext = os.path.splitext(self.path)
+        return f'{root}.{index}{ext}'
+
+    def _rotate_if_full(self, incoming):
+        """Rotar el archivo si con incoming bytes más pasaría de max_bytes"""
+        if not self.max_bytes:
+            return
+        try:
+            if os.path.getsize(self.path) + incoming <= self.max_bytes:
+                return
+        except OSError:
+            return      # Todavía no existe
+
+        # Otro worker puede estar rotando el mismo archivo: lo que ya no está se saltea
+        moves = [(self._rotated_path(index), self._rotated_path(index + 1))
+                 for index in range(self.backups - 1, 0, -1)]
+        if self.backups:
+            moves.append((self.path, self._rotated_path(1)))
+        for source, target in moves:
+            try:
+                os.replace(source, target)
+            except FileNotFoundError:
+                pass
+        if not self.backups:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _export(self, spans):
+        try:
+            body = json.dumps(self._payload(spans), separators=(',', ':'))
+            if self.mode == 'otlp':
+                request = urllib.request.Request(
+                    self.endpoint, data=body.encode('utf-8'),
+                    headers={'Content-Type': 'application/json'}, method='POST'
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._rotate_if_full(len(body.encode('utf-8')) + 1)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(body + '\n')
+            self.exported += len(spans)
+        except Exception as e:
+            self.dropped += len(spans)
+            log.warning("⚠ No se pudieron exportar %d spans: %s", len(spans), e)
+
+    def flush(self):
+        """Exportar lo encolado (al terminar el proceso)"""
+        # Con _export_lock: espera el envío en curso del thread y toma
+        # también el lote que estaba armando
+        with self._export_lock:
+            spans = self._take_pending()
+            while True:
+                try:
+                    spans.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for start in range(0, len(spans), self.batch_size):
+                self._export(spans[start:start + self.batch_size])
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'exported': self.exported, 'dropped': self.dropped}
+
+def init_tracing(service):
+    """Configurar el exportador del proceso (una vez, al iniciar el servicio)"""
+    global _exporter
+    if _exporter is not None:
+        return _exporter
+
+    mode = os.getenv('TRACE_EXPORTER', 'none').lower()
+    if mode == 'none':
+        return None
+
+    _exporter = SpanExporter(
+        service,
+        mode=mode,
+        path=os.getenv('TRACE_FILE') or None,
+        endpoint=os.getenv('TRACE_OTLP_ENDPOINT') or None,
+        max_bytes=int(os.getenv('TRACE_FILE_MAX_BYTES', 50 * 1024 * 1024)),
+        backups=int(os.getenv('TRACE_FILE_BACKUPS', 3))
+    )
+    atexit.register(_exporter.flush)
+    log.info("%s: exportando spans (%s, muestreo %.0f%%)", service, mode, _sample_rate * 100)
+    return _exporter
+
+def instrument_flask(app, root=False):
+    """
+    Un span por request de una app Flask
+
+    Continúa la traza del header traceparent; con root=True (servicio de
+    entrada) los requests sin traceparent empiezan una traza nueva.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_span():
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        request_span = start_span(
+            f'{request.method} {rule}', parent=extract(request.headers), root=root, kind='server'
+        )
+        if request_span is not NOOP_SPAN:
+            g._trace_span = request_span
+            g._trace_token = _current.set(request_span)
+
+    @app.after_request
+    def _tag_response(response):
+        request_span = g.get('_trace_span')
+        if request_span is not None:
+            request_span.set_attribute('http.status_code', response.status_code)
+        return response
+
+    @app.teardown_request
+    def _end_request_span(error=None):
+        request_span = g.pop('_trace_span', None)
+        token = g.pop('_trace_token', None)
+        if request_span is None:
+            return
+        if error is not None:
+            request_span.set_error(error)
+        request_span.end()
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass    # Teardown en otro contexto (respuestas en streaming)
+
+    return app
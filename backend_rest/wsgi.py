@@ -0,0 +1,4 @@
+# Archivo: backend_rest/wsgi.py
+# PUNTO DE ENTRADA WSGI (gunicorn -c gunicorn.conf.py wsgi:app)
+
+from app import app
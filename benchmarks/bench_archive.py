@@ -0,0 +1,88 @@
+# Archivo: benchmarks/bench_archive.py
+# BENCHMARK: ZIP ORIGINAL (DEFLATE EN UN THREAD) vs ARCHIVE ENGINE
+#
+# Genera un lote sintético (JPEG + TIFF sin compresión, que es lo que
+# devuelven los nodos) y mide MB/s de:
+#   - baseline: zipfile.ZIP_DEFLATED en BytesIO (implementación anterior)
+#   - engine zip / none / tar con N workers
+# No requiere servicios corriendo.
+#
+# Uso:
+#   python benchmarks/bench_archive.py --images 200 --workers 1 4 8
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'db_service'))
+
+from PIL import Image
+from archive_engine import ArchiveEngine
+from object_store import LocalStore
+
+def make_images(directory, count, size):
+    """Crea count imágenes alternando JPEG y TIFF. Retorna [(nombre, nombre)]"""
+    entries = []
+    for i in range(count):
+        img = Image.effect_noise((size, size), 40 + i % 50).convert('RGB')
+        extension = 'jpg' if i % 2 == 0 else 'tif'
+        path = os.path.join(directory, f'{i}_processed.{extension}')
+        img.save(path)
+        entries.append((os.path.basename(path), os.path.basename(path)))
+    return entries
+
+def run_baseline(directory, entries):
+    """Implementación anterior de download_batch"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for key, arcname in entries:
+            zip_file.write(os.path.join(directory, key), arcname)
+    return buffer.tell()
+
+def run_engine(engine, entries, compression_type):
+    return sum(len(chunk) for chunk in engine.build(entries, compression_type))
+
+def measure(label, func, input_bytes, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output_bytes = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"  {label:<22} {best * 1000:9.1f} ms  "
+          f"{input_bytes / best / 1024**2:8.1f} MB/s  "
+          f"salida {output_bytes / 1024**2:7.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de generación de archivos de descarga')
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--size', type=int, default=512, help='Lado de cada imagen en píxeles')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Generando {args.images} imágenes de {args.size}x{args.size}...")
+        entries = make_images(directory, args.images, args.size)
+        input_bytes = sum(os.path.getsize(os.path.join(directory, key)) for key, _ in entries)
+        print(f"Entrada: {input_bytes / 1024**2:.1f} MB\n")
+
+        measure('baseline (zipfile)', lambda: run_baseline(directory, entries), input_bytes, args.repeat)
+
+        for workers in args.workers:
+            engine = ArchiveEngine(LocalStore(directory), workers=workers)
+            for compression_type in ('zip', 'none', 'tar'):
+                measure(
+                    f'engine {compression_type} x{workers}',
+                    lambda: run_engine(engine, entries, compression_type),
+                    input_bytes, args.repeat
+                )
+            engine.executor.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# Archivo: benchmarks/bench_prepared_statements.py
+# BENCHMARK: CONSULTAS CALIENTES COMO TEXTO VS. PREPARED STATEMENT REUTILIZADO
+#
+# Mide, sobre una misma conexión, las consultas de parámetros fijos más
+# frecuentes del DB Service de dos formas:
+#   - texto: un cursor por llamada, como Database.execute_query
+#   - prepared: un cursor prepared=True por consulta que se reutiliza (lo que
+#     haría una caché de statements por conexión del pool)
+# y muestra la mediana y el p95 por llamada más los comandos que recibió el
+# servidor (Com_stmt_execute, Com_stmt_reset, Com_select) en cada modo.
+#
+# Una caché de statements solo vale la pena si "prepared" le gana a "texto"
+# con un margen claro. El cursor preparado de mysql-connector manda
+# COM_STMT_RESET antes de cada ejecución (dos viajes por llamada en lugar de
+# uno), así que en la misma red suele perder.
+#
+# Solo lee. Usa las variables DB_HOST, DB_PORT, DB_USER, DB_PASSWORD y
+# DB_NAME del DB Service.
+#
+# Uso:
+#   python benchmarks/bench_prepared_statements.py --runs 2000
+
+import argparse
+import os
+import statistics
+import time
+
+import mysql.connector
+
+# (nombre, consulta, consulta que devuelve un parámetro existente o None)
+QUERIES = [
+    ('login',
+     "SELECT user_id, username, email, password_hash, is_active FROM users WHERE username = %s",
+     "SELECT username FROM users ORDER BY user_id LIMIT 1"),
+    ('batch',
+     "SELECT * FROM batch_requests WHERE batch_id = %s",
+     "SELECT MAX(batch_id) FROM batch_requests"),
+    ('result_file',
+     """SELECT result_filename, storage_path FROM processed_results
+        WHERE image_id = %s AND status = 'success'
+        ORDER BY result_id DESC LIMIT 1""",
+     "SELECT MAX(image_id) FROM processed_results"),
+    ('active_nodes',
+     "SELECT * FROM processing_nodes WHERE status = %s",
+     "SELECT 'active'"),
+]
+
+STATUS_COUNTERS = ('Com_stmt_prepare', 'Com_stmt_execute', 'Com_stmt_reset', 'Com_select')
+
+def session_counters(connection):
+    cursor = connection.cursor()
+    cursor.execute("SHOW SESSION STATUS WHERE Variable_name IN (%s, %s, %s, %s)", STATUS_COUNTERS)
+    counters = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return counters
+
+def run_text(connection, query, params, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(query, params)
+        cursor.fetchall()
+        cursor.close()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+def run_prepared(connection, query, params, runs):
+    # La primera ejecución prepara; las siguientes reutilizan el statement
+    cursor = connection.cursor(prepared=True)
+    cursor.execute(query, params)
+    cursor.fetchall()
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1e6)
+    cursor.close()
+    return timings
+
+def measure(connection, run, query, params, runs):
+    """Mediana y p95 en µs y comandos por llamada que vio el servidor"""
+    before = session_counters(connection)
+    timings = sorted(run(connection, query, params, runs))
+    after = session_counters(connection)
+    # SHOW SESSION STATUS no suma en Com_select, así que no ensucia la cuenta
+    commands = {name: (after[name] - before[name]) / runs for name in STATUS_COUNTERS}
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))], commands
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultas calientes: texto vs. prepared statement reutilizado')
+    parser.add_argument('--host', default=os.getenv('DB_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('DB_PORT', 3306)))
+    parser.add_argument('--user', default=os.getenv('DB_USER', 'root'))
+    parser.add_argument('--password', default=os.getenv('DB_PASSWORD', 'root'))
+    parser.add_argument('--database', default=os.getenv('DB_NAME', 'image_processing_system'))
+    parser.add_argument('--runs', type=int, default=2000, help='Ejecuciones por consulta y modo')
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(
+        host=args.host, port=args.port, user=args.user,
+        password=args.password, database=args.database, autocommit=True
+    )
+    print(f"mysql-connector {mysql.connector.__version__} "
+          f"({'extensión C' if connection.__class__.__name__.startswith('CMySQL') else 'Python puro'}), "
+          f"servidor {connection.get_server_info()}, {args.runs} ejecuciones por modo")
+
+    print(f"\n  {'consulta':<13} {'modo':<9} {'p50 µs':>9} {'p95 µs':>9}  comandos por llamada")
+    verdicts = []
+    for name, query, param_query in QUERIES:
+        cursor = connection.cursor()
+        cursor.execute(param_query)
+        params = (cursor.fetchone()[0],)
+        cursor.close()
+
+        results = {}
+        for mode, run in (('texto', run_text), ('prepared', run_prepared)):
+            p50, p95, commands = measure(connection, run, query, params, args.runs)
+            results[mode] = p50
+            described = ', '.join(f"{key}={value:.2f}" for key, value in commands.items() if value)
+            print(f"  {name:<13} {mode:<9} {p50:9.1f} {p95:9.1f}  {described}")
+        verdicts.append((name, results['texto'], results['prepared']))
+
+    print()
+    for name, text, prepared in verdicts:
+        change = (prepared - text) / text * 100
+        print(f"  {name:<13} prepared {'más rápido' if change < 0 else 'más lento'} ({change:+.1f}%)")
+
+    connection.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# Archivo: benchmarks/bench_query_plans.py
+# BENCHMARK: PLANES Y TIEMPOS DE LAS CONSULTAS CALIENTES ANTES/DESPUÉS DE LAS MIGRACIONES
+#
+# Crea una base aparte (por defecto image_processing_bench) con schema.sql,
+# la llena con millones de filas sintéticas (generadas en MySQL con un CTE
+# recursivo, sin pasar por Python), mide las consultas de los endpoints
+# calientes con el esquema base, aplica db_service/migrations y vuelve a
+# medir. Con las migraciones cada consulta debe usar el índice esperado y
+# sin filesort; si no, termina con código 1.
+#
+# Requiere MySQL 8 (CTE recursivos). Usa las variables DB_HOST, DB_PORT,
+# DB_USER y DB_PASSWORD del DB Service.
+#
+# Uso:
+#   python benchmarks/bench_query_plans.py --logs 5000000 --batches 20000 --images-per-batch 50
+#   python benchmarks/bench_query_plans.py --keep     # no borrar la base al terminar
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import mysql.connector
+
+DB_SERVICE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db_service')
+sys.path.insert(0, DB_SERVICE_DIR)
+
+import migrate      # noqa: E402
+
+SCHEMA_DB_NAME = 'image_processing_system'
+
+# Filas insertadas por sentencia al generar datos
+SEED_CHUNK = 100000
+
+# (nombre, consulta, parámetros, {tabla/alias: índice esperado después de migrar})
+# Los parámetros se completan en main() con ids que existen en los datos generados
+QUERIES = [
+    ('logs_batch',
+     "SELECT * FROM execution_logs WHERE batch_id = %s ORDER BY timestamp DESC",
+     'batch', {'execution_logs': 'idx_log_batch_time'}),
+    ('logs_recent',
+     "SELECT * FROM execution_logs ORDER BY timestamp DESC LIMIT 50",
+     None, {'execution_logs': 'idx_log_time'}),
+    ('logs_image',
+     "SELECT * FROM execution_logs WHERE image_id = %s ORDER BY timestamp DESC",
+     'image', {'execution_logs': 'idx_log_image_time'}),
+    ('batch_download',
+     """SELECT i.image_id, i.original_filename, pr.result_filename, pr.storage_path, pr.status
+        FROM images i
+        JOIN processed_results pr ON i.image_id = pr.image_id
+        WHERE i.batch_id = %s AND pr.status = 'success'
+        ORDER BY i.image_id""",
+     'batch', {'i': 'idx_image_batch', 'pr': 'idx_result_image_status'}),
+    ('result_file',
+     """SELECT result_filename, storage_path FROM processed_results
+        WHERE image_id = %s AND status = 'success'
+        ORDER BY result_id DESC LIMIT 1""",
+     'image', {'processed_results': 'idx_result_image_status'}),
+    ('user_batches',
+     "SELECT * FROM batch_requests WHERE user_id = %s ORDER BY created_at DESC",
+     'user', {'batch_requests': 'idx_batch_user_created'}),
+]
+
+def connect(args, database=None):
+    return mysql.connector.connect(
+        host=args.host, port=args.port, user=args.user,
+        password=args.password, database=database, autocommit=True
+    )
+
+def create_database(args):
+    """Base nueva con schema.sql (nombre de base reemplazado)"""
+    with open(os.path.join(DB_SERVICE_DIR, 'schema.sql'), encoding='utf-8') as f:
+        schema = f.read().replace(SCHEMA_DB_NAME, args.database)
+
+    connection = connect(args)
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {args.database}")
+    for statement in migrate.split_statements(schema):
+        cursor.execute(statement)
+    cursor.close()
+    connection.close()
+
+def seed_rows(cursor, table, columns, select, total):
+    """INSERT ... SELECT sobre una secuencia n = 0..total-1, en bloques de SEED_CHUNK"""
+    for offset in range(0, total, SEED_CHUNK):
+        count = min(SEED_CHUNK, total - offset)
+        cursor.execute(f"""
+            INSERT INTO {table} ({columns})
+            WITH RECURSIVE seq (i) AS (
+                SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i < {count - 1}
+            )
+            SELECT {select} FROM (SELECT i + {offset} AS n FROM seq) AS s
+        """)
+        print(f"\r  {table:<20} {offset + count:>12,} / {total:,}", end='', flush=True)
+    print()
+
+def seed(args):
+    """Usuarios, lotes, imágenes, resultados y logs repartidos en ~9 meses"""
+    images = args.batches * args.images_per_batch
+
+    connection = connect(args, args.database)
+    cursor = connection.cursor()
+    cursor.execute(f"SET SESSION cte_max_recursion_depth = {SEED_CHUNK + 1}")
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    cursor.execute("SET SESSION unique_checks = 0")
+
+    start = time.perf_counter()
+    seed_rows(cursor, 'users', 'username, password_hash, email',
+              "CONCAT('bench_', n), 'x', CONCAT('bench_', n, '@example.com')", args.users)
+    seed_rows(cursor, 'batch_requests', 'user_id, batch_name, status, total_images, created_at',
+              f"1 + n % {args.users}, CONCAT('batch-', n), 'completed', {args.images_per_batch}, "
+              f"NOW() - INTERVAL (n % 270) DAY - INTERVAL (n % 86400) SECOND", args.batches)
+    seed_rows(cursor, 'images', 'batch_id, original_filename, storage_path, file_size',
+              f"1 + n DIV {args.images_per_batch}, CONCAT(n, '.jpg'), CONCAT('/data/in/', n, '.jpg'), 1024",
+              images)
+    seed_rows(cursor, 'processed_results',
+              'image_id, node_id, result_filename, storage_path, status, processing_time_ms',
+              "1 + n, 1 + n % 3, CONCAT(n, '.png'), CONCAT('/data/out/', n, '.png'), "
+              "IF(n % 10 = 0, 'failed', 'success'), n % 2000", images)
+    seed_rows(cursor, 'execution_logs', 'node_id, batch_id, image_id, log_level, message, timestamp',
+              f"1 + n % 3, 1 + n % {args.batches}, 1 + n % {images}, "
+              f"ELT(1 + n % 4, 'info', 'warning', 'error', 'debug'), CONCAT('Log sintético ', n), "
+              f"NOW() - INTERVAL (n % 270) DAY - INTERVAL (n % 86400) SECOND", args.logs)
+
+    for table in ('batch_requests', 'images', 'processed_results', 'execution_logs'):
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+
+    print(f"  Datos generados en {time.perf_counter() - start:.1f} s")
+    cursor.close()
+    connection.close()
+
+def measure(connection, query, params, runs):
+    """
+    EXPLAIN y tiempo de ejecución (mediana de runs, leyendo todas las filas)
+
+    Returns:
+        tuple: ({tabla: (índice, filas estimadas, Extra)}, ms, filas devueltas)
+    """
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("EXPLAIN " + query, params)
+    plan = {row['table']: (row['key'], row['rows'], row['Extra'] or '') for row in cursor.fetchall()}
+    cursor.close()
+
+    timings = []
+    returned = 0
+    cursor = connection.cursor()
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        returned = len(cursor.fetchall())
+        timings.append((time.perf_counter() - start) * 1000)
+    cursor.close()
+
+    return plan, statistics.median(timings), returned
+
+def run_queries(connection, params, runs, label):
+    print(f"\n  [{label}]")
+    print(f"  {'consulta':<16} {'ms':>9} {'filas':>7}  plan")
+    results = {}
+    for name, query, param_key, _ in QUERIES:
+        query_params = (params[param_key],) if param_key else ()
+        plan, ms, returned = measure(connection, query, query_params, runs)
+        results[name] = (plan, ms)
+        described = '; '.join(
+            f"{table}: {key or 'FULL SCAN'} ~{rows} filas" + (' +filesort' if 'filesort' in extra else '')
+            for table, (key, rows, extra) in plan.items()
+        )
+        print(f"  {name:<16} {ms:9.2f} {returned:7d}  {described}")
+    return results
+
+def check_plans(results):
+    """Verificar índice esperado y ausencia de filesort. Retorna lista de fallas"""
+    failures = []
+    for name, _, _, expected in QUERIES:
+        plan, _ = results[name]
+        for table, index in expected.items():
+            key, _, extra = plan.get(table, (None, 0, ''))
+            if key != index:
+                failures.append(f"{name}: {table} usa {key or 'FULL SCAN'}, se esperaba {index}")
+            if 'filesort' in extra:
+                failures.append(f"{name}: {table} ordena con filesort")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Planes de las consultas calientes con millones de filas')
+    parser.add_argument('--host', default=os.getenv('DB_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('DB_PORT', 3306)))
+    parser.add_argument('--user', default=os.getenv('DB_USER', 'root'))
+    parser.add_argument('--password', default=os.getenv('DB_PASSWORD', 'root'))
+    parser.add_argument('--database', default='image_processing_bench')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--batches', type=int, default=20000)
+    parser.add_argument('--images-per-batch', type=int, default=50)
+    parser.add_argument('--logs', type=int, default=3000000)
+    parser.add_argument('--runs', type=int, default=5, help='Ejecuciones por consulta (se toma la mediana)')
+    parser.add_argument('--keep', action='store_true', help='No borrar la base al terminar')
+    args = parser.parse_args()
+
+    images = args.batches * args.images_per_batch
+    print(f"Base {args.database}: {args.batches:,} lotes, {images:,} imágenes/resultados, {args.logs:,} logs")
+
+    create_database(args)
+    seed(args)
+
+    # Ids a mitad de rango (ni el primero ni el último)
+    params = {'batch': args.batches // 2, 'image': images // 2, 'user': args.users // 2}
+
+    connection = connect(args, args.database)
+    try:
+        before = run_queries(connection, params, args.runs, 'esquema base')
+
+        print()
+        migrate.apply_pending(connection)
+        # Retención larga: los datos generados no deben borrarse
+        migrate.maintain_partitions(connection, retention_months=120)
+        for table in ('batch_requests', 'processed_results', 'execution_logs'):
+            cursor = connection.cursor()
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+            cursor.close()
+
+        after = run_queries(connection, params, args.runs, 'con migraciones')
+
+        print(f"\n  {'consulta':<16} {'antes ms':>10} {'después ms':>11} {'mejora':>8}")
+        for name, _, _, _ in QUERIES:
+            old_ms, new_ms = before[name][1], after[name][1]
+            print(f"  {name:<16} {old_ms:10.2f} {new_ms:11.2f} {old_ms / max(new_ms, 0.001):7.1f}x")
+
+        failures = check_plans(after)
+    finally:
+        if not args.keep:
+            cursor = connection.cursor()
+            cursor.execute(f"DROP DATABASE IF EXISTS {args.database}")
+            cursor.close()
+        connection.close()
+
+    if failures:
+        print("\n✗ Planes inesperados:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✓ Todas las consultas usan el índice esperado y sin filesort")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# Archivo: benchmarks/bench_results_ingest.py
+# BENCHMARK: INGESTA DE RESULTADOS POR IMAGEN vs EN BLOQUE
+#
+# Compara filas/segundo de POST /api/images/{id}/result (una llamada por
+# imagen) contra POST /api/images/results/batch (N resultados por llamada).
+# Requiere el DB Service corriendo (por defecto en http://localhost:5000).
+#
+# Uso:
+#   python benchmarks/bench_results_ingest.py --images 1000 --block 100
+
+import argparse
+import time
+import requests
+
+def setup_images(base_url, session, count):
+    """Crea usuario, lote e imágenes de prueba. Retorna (image_ids, node_id)"""
+    suffix = str(int(time.time() * 1000))
+    
+    resp = session.post(f'{base_url}/api/users/register', json={
+        'username': f'bench_{suffix}',
+        'password': 'benchmark123',
+        'email': f'bench_{suffix}@example.com'
+    })
+    resp.raise_for_status()
+    user_id = resp.json()['user_id']
+    
+    resp = session.post(f'{base_url}/api/batches', json={
+        'user_id': user_id,
+        'batch_name': f'bench-results-{suffix}'
+    })
+    resp.raise_for_status()
+    batch_id = resp.json()['batch_id']
+    
+    image_ids = []
+    for offset in range(0, count, 500):
+        chunk = min(500, count - offset)
+        resp = session.post(f'{base_url}/api/images/batch', json={
+            'batch_id': batch_id,
+            'images': [
+                {
+                    'original_filename': f'{offset + i}.jpg',
+                    'storage_path': f'/tmp/bench_{batch_id}_{offset + i}.jpg',
+                    'file_size': 1024,
+                    'transformations': []
+                }
+                for i in range(chunk)
+            ]
+        })
+        resp.raise_for_status()
+        image_ids.extend(resp.json()['image_ids'])
+    
+    resp = session.get(f'{base_url}/api/nodes/active')
+    resp.raise_for_status()
+    nodes = resp.json()
+    if not nodes:
+        raise SystemExit('No hay nodos activos en la DB para asociar resultados')
+    
+    return batch_id, image_ids, nodes[0]['node_id']
+
+def make_result(image_id, node_id):
+    return {
+        'image_id': image_id,
+        'node_id': node_id,
+        'result_filename': f'{image_id}_processed.jpg',
+        'storage_path': f'bench/{image_id}_processed.jpg',
+        'processing_time_ms': 10,
+        'status': 'success',
+        'error_message': '',
+        'mark_processed': True
+    }
+
+def bench_per_image(base_url, session, image_ids, node_id):
+    start = time.perf_counter()
+    for image_id in image_ids:
+        data = make_result(image_id, node_id)
+        resp = session.post(f'{base_url}/api/images/{image_id}/result', json=data)
+        resp.raise_for_status()
+        session.put(f'{base_url}/api/images/{image_id}/processed').raise_for_status()
+    return time.perf_counter() - start
+
+def bench_bulk(base_url, session, image_ids, node_id, block):
+    start = time.perf_counter()
+    for offset in range(0, len(image_ids), block):
+        results = [make_result(image_id, node_id) for image_id in image_ids[offset:offset + block]]
+        resp = session.post(f'{base_url}/api/images/results/batch', json={'results': results})
+        resp.raise_for_status()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ingesta de resultados')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--images', type=int, default=1000)
+    parser.add_argument('--block', type=int, default=100, help='Resultados por llamada en modo bloque')
+    args = parser.parse_args()
+    
+    session = requests.Session()
+    
+    print("="*60)
+    print("BENCHMARK: INGESTA DE RESULTADOS")
+    print("="*60)
+    
+    _, per_image_ids, node_id = setup_images(args.url, session, args.images)
+    _, bulk_ids, _ = setup_images(args.url, session, args.images)
+    
+    per_image_s = bench_per_image(args.url, session, per_image_ids, node_id)
+    bulk_s = bench_bulk(args.url, session, bulk_ids, node_id, args.block)
+    
+    per_image_rate = len(per_image_ids) / per_image_s
+    bulk_rate = len(bulk_ids) / bulk_s
+    
+    print(f"Filas:                 {args.images}")
+    print(f"Por imagen:            {per_image_s:8.2f} s  {per_image_rate:10.1f} filas/s")
+    print(f"En bloque ({args.block:>4}/call): {bulk_s:8.2f} s  {bulk_rate:10.1f} filas/s")
+    print(f"Aceleración:           {bulk_rate / per_image_rate:8.1f}x")
+    print("="*60)
+
+if __name__ == '__main__':
+    main()
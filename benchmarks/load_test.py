@@ -0,0 +1,183 @@
+# Archivo: benchmarks/load_test.py
+# PRUEBA DE CARGA: REQUESTS/SEGUNDO Y LATENCIA p50/p95/p99 DE LOS ENDPOINTS CALIENTES
+#
+# Lanza N clientes concurrentes (threads con conexión keep-alive propia)
+# contra el DB Service o el Backend REST durante una cantidad de segundos
+# y reporta, por endpoint, requests/s, latencias y errores.
+# Sirve para comparar "python app.py" contra gunicorn (gunicorn.conf.py).
+#
+# Escenarios:
+#   db       GET /health, POST /api/users/login, GET /api/transformations,
+#            GET /api/nodes/active (DB Service, puerto 5000)
+#   backend  GET /health, POST /api/login (Backend REST, puerto 3000)
+#
+# Uso:
+#   python benchmarks/load_test.py --target db --url http://localhost:5000 --concurrency 32 --duration 20
+#   python benchmarks/load_test.py --target backend --url http://localhost:3000
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+def setup_user(url, register_path):
+    """Registra un usuario de prueba. Retorna (username, password)"""
+    suffix = str(int(time.time() * 1000))
+    username, password = f'load_{suffix}', 'loadtest123'
+    status, body = request_once(url, 'POST', register_path, {
+        'username': username,
+        'password': password,
+        'email': f'load_{suffix}@example.com'
+    })
+    if status != 201:
+        raise SystemExit(f'No se pudo registrar el usuario de prueba: {status} {body[:200]}')
+    return username, password
+
+def request_once(url, method, path, payload=None):
+    parsed = urlparse(url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    try:
+        body = json.dumps(payload) if payload is not None else None
+        connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+def build_scenario(target, url):
+    """Lista de (nombre, método, ruta, payload) que cada cliente recorre en ronda"""
+    if target == 'db':
+        username, password = setup_user(url, '/api/users/register')
+        credentials = {'username': username, 'password': password}
+        return [
+            ('health', 'GET', '/health', None),
+            ('login', 'POST', '/api/users/login', credentials),
+            ('transformations', 'GET', '/api/transformations', None),
+            ('nodes_active', 'GET', '/api/nodes/active', None)
+        ]
+
+    username, password = setup_user(url, '/api/register')
+    return [
+        ('health', 'GET', '/health', None),
+        ('login', 'POST', '/api/login', {'username': username, 'password': password})
+    ]
+
+class Worker(threading.Thread):
+    """Cliente con conexión keep-alive propia (se reabre si el servidor la cierra)"""
+
+    def __init__(self, url, scenario, deadline, offset):
+        super().__init__(daemon=True)
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.scenario = scenario
+        self.deadline = deadline
+        self.offset = offset
+        self.latencies = {name: [] for name, _, _, _ in scenario}
+        self.errors = {name: 0 for name, _, _, _ in scenario}
+        self.connection = None
+
+    def _request(self, method, path, body):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        self.connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = self.connection.getresponse()
+        response.read()
+        if response.will_close:
+            self.connection.close()
+            self.connection = None
+        return response.status
+
+    def run(self):
+        bodies = [json.dumps(payload) if payload is not None else None
+                  for _, _, _, payload in self.scenario]
+        i = self.offset
+
+        while time.perf_counter() < self.deadline:
+            index = i % len(self.scenario)
+            name, method, path, _ = self.scenario[index]
+            i += 1
+
+            start = time.perf_counter()
+            try:
+                status = self._request(method, path, bodies[index])
+            except (OSError, http.client.HTTPException):
+                if self.connection is not None:
+                    self.connection.close()
+                    self.connection = None
+                self.errors[name] += 1
+                continue
+
+            if status >= 400:
+                self.errors[name] += 1
+            else:
+                self.latencies[name].append(time.perf_counter() - start)
+
+        if self.connection is not None:
+            self.connection.close()
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def report(workers, scenario, elapsed):
+    print(f"\n  {'endpoint':<16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+
+    total_ok = 0
+    total_errors = 0
+    for name, _, _, _ in scenario:
+        latencies = sorted(value for worker in workers for value in worker.latencies[name])
+        errors = sum(worker.errors[name] for worker in workers)
+        total_ok += len(latencies)
+        total_errors += errors
+        print(f"  {name:<16} {len(latencies) / elapsed:9.1f} "
+              f"{percentile(latencies, 0.50) * 1000:8.1f} "
+              f"{percentile(latencies, 0.95) * 1000:8.1f} "
+              f"{percentile(latencies, 0.99) * 1000:8.1f} "
+              f"{errors:8d}")
+
+    all_latencies = sorted(value for worker in workers
+                           for values in worker.latencies.values() for value in values)
+    print(f"  {'TOTAL':<16} {total_ok / elapsed:9.1f} "
+          f"{percentile(all_latencies, 0.50) * 1000:8.1f} "
+          f"{percentile(all_latencies, 0.95) * 1000:8.1f} "
+          f"{percentile(all_latencies, 0.99) * 1000:8.1f} "
+          f"{total_errors:8d}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de endpoints calientes')
+    parser.add_argument('--target', choices=['db', 'backend'], default='db')
+    parser.add_argument('--url', default=None, help='Por defecto http://localhost:5000 (db) o :3000 (backend)')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20, help='Segundos de carga')
+    parser.add_argument('--warmup', type=float, default=2, help='Segundos de calentamiento (no se miden)')
+    args = parser.parse_args()
+
+    url = args.url or ('http://localhost:5000' if args.target == 'db' else 'http://localhost:3000')
+    scenario = build_scenario(args.target, url)
+
+    print(f"Objetivo: {url} ({args.target}), {args.concurrency} clientes, {args.duration:.0f} s")
+
+    if args.warmup > 0:
+        warmup = [Worker(url, scenario, time.perf_counter() + args.warmup, i) for i in range(args.concurrency)]
+        for worker in warmup:
+            worker.start()
+        for worker in warmup:
+            worker.join()
+
+    start = time.perf_counter()
+    workers = [Worker(url, scenario, start + args.duration, i) for i in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    report(workers, scenario, elapsed)
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,14 @@ from flask_cors import CORS
 from config import Config
 from routes import register_routes
 from database import Database
+from migrate import pending_migrations
+from auth_cache import auth_cache
+from heartbeat_aggregator import heartbeat_aggregator
+from metrics import instrument_flask
+import tracing
+from logger import get_logger
+
+log = get_logger('REST API')
 
 def create_app():
     """
@@ -20,6 +28,13 @@ def create_app():
     # Habilitar CORS para permitir requests desde el servidor SOAP
     CORS(app)
     
+    # GET /metrics y duración de cada request
+    instrument_flask(app, 'db_service')
+    
+    # Continuar las trazas que llegan con traceparent (SOAP Server)
+    tracing.init_tracing('db_service')
+    tracing.instrument_flask(app)
+    
     # Registrar todas las rutas ###############################################################################################
     register_routes(app)
     #############################################################################################################################
@@ -32,6 +47,19 @@ def create_app():
             'service': 'Image Processing DB Service'
         }), 200
     
+    # Métricas internas del proceso (pool de conexiones, caché de login, heartbeats)
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        """Contadores en vivo de este worker"""
+        try:
+            return jsonify({
+                'db_pool': Database().pool_stats(),
+                'auth': auth_cache.stats(),
+                'heartbeats': heartbeat_aggregator.stats()
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     # Ruta de información
     @app.route('/', methods=['GET'])
     def index():
@@ -66,9 +94,20 @@ def main():
     # Inicializar conexión a la base de datos
     try:
         db = Database()
-        print("[REST API] Conexión a base de datos inicializada")
+        log.info("Conexión a base de datos inicializada")
     except Exception as e:
-        print(f"[REST API] ERROR: No se pudo conectar a la base de datos: {e}")
+        log.error("No se pudo conectar a la base de datos: %s", e)
+        return
+    
+    # El código usa columnas y tablas que crean las migraciones
+    connection = db.get_connection()
+    try:
+        pending = pending_migrations(connection)
+    finally:
+        connection.close()
+    if pending:
+        log.error("Migraciones pendientes (%s): correr 'python migrate.py up'",
+                  ', '.join(version for version, _ in pending))
         return
     
     # Crear aplicación Flask
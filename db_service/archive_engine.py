@@ -0,0 +1,373 @@
+# Archivo: db_service/archive_engine.py
+# MOTOR DE ARCHIVOS DE DESCARGA: ZIP / TAR CON COMPRESIÓN EN PARALELO
+
+import io
+import os
+import struct
+import tarfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from logger import get_logger
+from object_store import get_store
+
+try:
+    import zstandard
+except ImportError:     # zstd es opcional: sin el paquete los TAR van en gzip
+    zstandard = None
+
+log = get_logger('ARCHIVE')
+
+# Formatos que ya vienen comprimidos: recomprimirlos solo gasta CPU
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+# output_format de batch_requests -> (formato Pillow, extensión)
+OUTPUT_FORMATS = {
+    'jpg': ('JPEG', '.jpg'),
+    'png': ('PNG', '.png'),
+    'tif': ('TIFF', '.tif')
+}
+FORMAT_ALIASES = {'.jpeg': '.jpg', '.tiff': '.tif'}
+
+# Solo estas extensiones se convierten a output_format; el resto va tal cual
+IMAGE_EXTENSIONS = {'.jpg', '.png', '.tif', '.gif', '.webp', '.bmp'}
+
+TAR_BLOCK_SIZE = 1024 * 1024    # Bytes del stream TAR por miembro gzip/frame zstd
+ZIP64_LIMIT = 0xFFFFFFFF        # Tamaños/offsets desde aquí requieren ZIP64
+ZIP_UTF8_FLAG = 0x0800
+
+class ArchiveEngine:
+    """
+    Genera el archivo de descarga de un lote respetando compression_type
+    y output_format de batch_requests
+
+        - 'zip':  ZIP; cada entrada se comprime (DEFLATE) en un thread del pool
+        - 'tar':  TAR comprimido por bloques en paralelo (miembros gzip o frames zstd)
+        - 'none': ZIP sin compresión (las entradas se guardan tal cual)
+
+    JPEG/PNG/GIF/WebP nunca se recomprimen. Las entradas cuyo formato no
+    coincide con output_format se convierten con Pillow en el mismo pool.
+    El resultado es un generador de bloques de bytes; la memoria queda
+    acotada a unas pocas entradas en vuelo por worker.
+    """
+
+    def __init__(self, storage, workers=None, level=6, tar_codec='gzip'):
+        """
+        Args:
+            storage: Almacenamiento de donde se leen las entradas
+            workers: Threads de compresión (por defecto, uno por core)
+            level: Nivel de compresión DEFLATE / zstd
+            tar_codec: 'gzip' o 'zstd' para compression_type='tar'
+        """
+        self.storage = storage
+        self.workers = workers or os.cpu_count() or 1
+        self.level = level
+        self.tar_codec = tar_codec if (tar_codec != 'zstd' or zstandard) else 'gzip'
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix='archive'
+        )
+
+    def describe(self, compression_type):
+        """Retorna (mimetype, extensión) del archivo que genera build()"""
+        if compression_type == 'tar':
+            if self.tar_codec == 'zstd':
+                return 'application/zstd', '.tar.zst'
+            return 'application/gzip', '.tar.gz'
+        return 'application/zip', '.zip'
+
+    def build(self, entries, compression_type='zip', output_format=None):
+        """
+        Generar el archivo de un lote
+
+        Args:
+            entries: Lista de tuplas (clave_en_almacenamiento, nombre_en_archivo)
+            compression_type: 'zip', 'tar' o 'none'
+            output_format: 'jpg', 'png', 'tif' o None (sin conversión)
+
+        Yields:
+            bytes: Siguiente bloque del archivo
+        """
+        if compression_type == 'tar':
+            return self._build_tar(entries, output_format)
+        return self._build_zip(entries, output_format, compress=(compression_type != 'none'))
+
+    # ============= PREPARACIÓN DE ENTRADAS =============
+
+    def _ordered(self, func, items):
+        """map() sobre el pool en orden, con pocas tareas en vuelo (memoria acotada)"""
+        items = iter(items)
+        pending = deque()
+        window = self.workers * 2
+
+        for item in items:
+            pending.append(self.executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+    def _load_entry(self, entry, output_format):
+        """
+        Leer (y convertir si hace falta) un archivo
+
+        Returns:
+            tuple: (nombre_en_archivo, bytes, mtime) o None si no se pudo leer
+        """
+        key, arcname = entry
+        try:
+            head = self.storage.head(key)
+            if head is None:
+                raise FileNotFoundError(key)
+
+            data = self.storage.read_bytes(key)
+            name, extension = os.path.splitext(arcname)
+            extension = FORMAT_ALIASES.get(extension.lower(), extension.lower())
+
+            target = OUTPUT_FORMATS.get(output_format)
+            if target and extension in IMAGE_EXTENSIONS and extension != target[1]:
+                return name + target[1], convert_image(data, target[0]), head['mtime']
+
+            return arcname, data, head['mtime']
+
+        except Exception as e:
+            log.warning("✗ Omitido %s: %s", arcname, e)
+            return None
+
+    # ============= ZIP =============
+
+    def _zip_entry(self, entry, output_format, compress):
+        """Leer, convertir y comprimir una entrada (corre en el pool)"""
+        loaded = self._load_entry(entry, output_format)
+        if loaded is None:
+            return None
+
+        arcname, data, mtime = loaded
+        crc = zlib.crc32(data)
+
+        extension = os.path.splitext(arcname)[1].lower()
+        if compress and extension not in STORED_EXTENSIONS:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            payload = compressor.compress(data) + compressor.flush()
+            method = 8
+        else:
+            payload = data
+            method = 0
+
+        return arcname, payload, len(data), crc, method, mtime
+
+    def _build_zip(self, entries, output_format, compress):
+        offset = 0
+        central = []
+
+        prepared = self._ordered(
+            lambda entry: self._zip_entry(entry, output_format, compress),
+            entries
+        )
+
+        for item in prepared:
+            if item is None:
+                continue
+
+            arcname, payload, size, crc, method, mtime = item
+            name = arcname.encode('utf-8')
+            dos_time, dos_date = _dos_datetime(mtime)
+            compressed_size = len(payload)
+
+            zip64 = size >= ZIP64_LIMIT or compressed_size >= ZIP64_LIMIT
+            extra = struct.pack('<HHQQ', 0x0001, 16, size, compressed_size) if zip64 else b''
+
+            header = struct.pack(
+                '<IHHHHHIIIHH',
+                0x04034b50,
+                45 if zip64 else 20,
+                ZIP_UTF8_FLAG,
+                method,
+                dos_time,
+                dos_date,
+                crc,
+                0xFFFFFFFF if zip64 else compressed_size,
+                0xFFFFFFFF if zip64 else size,
+                len(name),
+                len(extra)
+            )
+
+            central.append((name, size, compressed_size, crc, method, dos_time, dos_date, offset))
+
+            yield header + name + extra
+            yield payload
+            offset += len(header) + len(name) + len(extra) + compressed_size
+
+        yield _zip_central_directory(central, offset)
+
+    # ============= TAR =============
+
+    def _tar_segments(self, entries, output_format):
+        """
+        Serializar el TAR como segmentos (bytes, comprimible)
+
+        Los segmentos de formatos ya comprimidos se marcan para no gastar
+        CPU intentando comprimirlos de nuevo.
+        """
+        prepared = self._ordered(
+            lambda entry: self._load_entry(entry, output_format),
+            entries
+        )
+
+        for item in prepared:
+            if item is None:
+                continue
+
+            arcname, data, mtime = item
+            info = tarfile.TarInfo(arcname)
+            info.size = len(data)
+            info.mtime = int(mtime)
+            info.mode = 0o644
+
+            compressible = os.path.splitext(arcname)[1].lower() not in STORED_EXTENSIONS
+
+            yield info.tobuf(format=tarfile.PAX_FORMAT), True
+            yield data, compressible
+
+            padding = -len(data) % tarfile.BLOCKSIZE
+            if padding:
+                yield b'\0' * padding, True
+
+        # Fin de archivo: dos bloques vacíos
+        yield b'\0' * (tarfile.BLOCKSIZE * 2), True
+
+    @staticmethod
+    def _tar_blocks(segments):
+        """Reagrupar segmentos en bloques de ~TAR_BLOCK_SIZE con su marca de comprimible"""
+        parts = []
+        size = 0
+        compressible = False
+
+        for data, segment_compressible in segments:
+            view = memoryview(data)
+            while view:
+                take = view[:TAR_BLOCK_SIZE - size]
+                view = view[len(take):]
+                parts.append(take)
+                size += len(take)
+                compressible = compressible or segment_compressible
+
+                if size >= TAR_BLOCK_SIZE:
+                    yield b''.join(parts), compressible
+                    parts, size, compressible = [], 0, False
+
+        if parts:
+            yield b''.join(parts), compressible
+
+    def _compress_block(self, block):
+        """Comprimir un bloque del stream TAR como miembro gzip o frame zstd"""
+        data, compressible = block
+
+        if self.tar_codec == 'zstd':
+            level = self.level if compressible else 1
+            return zstandard.ZstdCompressor(level=level).compress(data)
+
+        # Nivel 0 = bloques DEFLATE "stored": solo CRC y copia
+        level = self.level if compressible else 0
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def _build_tar(self, entries, output_format):
+        blocks = self._tar_blocks(self._tar_segments(entries, output_format))
+        # Miembros gzip / frames zstd concatenados forman un único stream válido
+        yield from self._ordered(self._compress_block, blocks)
+
+# Instancia compartida por las rutas de descarga (un solo pool por proceso)
+archive_engine = ArchiveEngine(
+    get_store(Config.RESULTS_DIR),
+    workers=Config.ARCHIVE_WORKERS,
+    level=Config.ARCHIVE_COMPRESSION_LEVEL,
+    tar_codec=Config.ARCHIVE_TAR_CODEC
+)
+
+def convert_image(data, pil_format):
+    """Convertir una imagen (bytes) al formato pedido y retornar sus bytes"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        if pil_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        output = io.BytesIO()
+        img.save(output, format=pil_format)
+        return output.getvalue()
+
+def _dos_datetime(timestamp):
+    """Fecha/hora en formato MS-DOS para los headers ZIP"""
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+def _zip_central_directory(central, cd_offset):
+    """Directorio central + fin de archivo (con registros ZIP64 si hacen falta)"""
+    records = []
+
+    for name, size, compressed_size, crc, method, dos_time, dos_date, offset in central:
+        zip64_fields = []
+        if size >= ZIP64_LIMIT or compressed_size >= ZIP64_LIMIT:
+            zip64_fields += [size, compressed_size]
+        if offset >= ZIP64_LIMIT:
+            zip64_fields.append(offset)
+
+        extra = b''
+        if zip64_fields:
+            extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields)
+
+        big_sizes = size >= ZIP64_LIMIT or compressed_size >= ZIP64_LIMIT
+
+        records.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII',
+            0x02014b50,
+            (3 << 8) | 45,          # Creado en Unix, versión 4.5
+            45 if zip64_fields else 20,
+            ZIP_UTF8_FLAG,
+            method,
+            dos_time,
+            dos_date,
+            crc,
+            0xFFFFFFFF if big_sizes else compressed_size,
+            0xFFFFFFFF if big_sizes else size,
+            len(name),
+            len(extra),
+            0,                      # Comentario
+            0,                      # Disco
+            0,                      # Atributos internos
+            0o100644 << 16,         # Atributos externos (archivo regular 644)
+            min(offset, 0xFFFFFFFF)
+        ) + name + extra)
+
+    directory = b''.join(records)
+    count = len(central)
+    cd_size = len(directory)
+
+    trailer = b''
+    if count >= 0xFFFF or cd_size >= ZIP64_LIMIT or cd_offset >= ZIP64_LIMIT:
+        zip64_eocd_offset = cd_offset + cd_size
+        trailer += struct.pack(
+            '<IQHHIIQQQQ',
+            0x06064b50, 44, 45, 45, 0, 0,
+            count, count, cd_size, cd_offset
+        )
+        trailer += struct.pack('<IIQI', 0x07064b50, 0, zip64_eocd_offset, 1)
+
+    trailer += struct.pack(
+        '<IHHHHIIH',
+        0x06054b50, 0, 0,
+        min(count, 0xFFFF),
+        min(count, 0xFFFF),
+        min(cd_size, 0xFFFFFFFF),
+        min(cd_offset, 0xFFFFFFFF),
+        0
+    )
+
+    return directory + trailer
@@ -0,0 +1,195 @@
+# Archivo: db_service/auth_cache.py
+# VERIFICACIÓN DE CONTRASEÑAS: CACHÉ DE CREDENCIALES, POOL DE BCRYPT Y last_login DIFERIDO
+
+import atexit
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import bcrypt
+from config import Config
+from database import Database
+from logger import get_logger
+
+log = get_logger('AUTH')
+
+class AuthBusyError(Exception):
+    """Hay demasiadas verificaciones bcrypt en espera"""
+
+class AuthCache:
+    """
+    Evita correr bcrypt en cada login
+
+    - Caché de credenciales verificadas: la clave es un HMAC (secreto
+      aleatorio del proceso) de usuario + contraseña + password_hash
+      actual, así en memoria nunca queda la contraseña y un cambio de
+      contraseña invalida la entrada solo (cambia el hash guardado).
+      Las entradas viven ttl_seconds y el total se acota con LRU.
+    - bcrypt corre en un pool de workers acotado; si hay más de
+      max_pending verificaciones en espera se rechaza con AuthBusyError
+      en lugar de dejar a los threads de requests esperando.
+    - last_login se acumula en memoria y se escribe en bloque cada
+      flush_interval segundos (un UPDATE por bloque en lugar de uno por login).
+    """
+
+    def __init__(self, ttl_seconds=300, max_entries=10000, workers=2,
+                 max_pending=64, flush_interval=5.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+
+        self._secret = os.urandom(32)
+        self._verified = OrderedDict()      # hmac -> vence (time.monotonic)
+        self._lock = threading.Lock()
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+        self._last_logins = {}              # user_id -> datetime del último login
+        self._logins_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._run_flusher, name='last-login', daemon=True)
+        self._flusher.start()
+
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def _key(self, username, password, password_hash):
+        message = b'\0'.join([
+            username.encode('utf-8'),
+            password.encode('utf-8'),
+            password_hash.encode('utf-8')
+        ])
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def check_password(self, username, password, password_hash):
+        """
+        Verificar una contraseña contra el password_hash guardado
+
+        Returns:
+            bool: True si la contraseña es correcta
+
+        Raises:
+            AuthBusyError: Si el pool de bcrypt está saturado
+        """
+        key = self._key(username, password, password_hash)
+        now = time.monotonic()
+
+        with self._lock:
+            expires_at = self._verified.get(key)
+            if expires_at is not None:
+                if expires_at > now:
+                    self._verified.move_to_end(key)
+                    self.hits += 1
+                    return True
+                del self._verified[key]
+            self.misses += 1
+
+        valid = self._run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+        # Solo se cachean aciertos: una contraseña incorrecta siempre paga bcrypt
+        if valid and self.ttl_seconds > 0:
+            with self._lock:
+                self._verified[key] = time.monotonic() + self.ttl_seconds
+                self._verified.move_to_end(key)
+                while len(self._verified) > self.max_entries:
+                    self._verified.popitem(last=False)
+
+        return valid
+
+    def hash_password(self, password):
+        """bcrypt.hashpw en el pool acotado (registro de usuarios)"""
+        return self._run_bcrypt(
+            lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        ).decode('utf-8')
+
+    def invalidate(self):
+        """Vaciar la caché (p. ej. después de cambiar contraseñas por SQL)"""
+        with self._lock:
+            self._verified.clear()
+
+    def _run_bcrypt(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise AuthBusyError('Demasiadas verificaciones de contraseña en curso')
+
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def record_login(self, user_id):
+        """Anotar un login; se escribe en la DB en el próximo flush"""
+        with self._logins_lock:
+            self._last_logins[user_id] = datetime.now()
+
+    def flush(self):
+        """Escribir los last_login pendientes (un UPDATE por bloque de 500)"""
+        with self._logins_lock:
+            pending, self._last_logins = self._last_logins, {}
+
+        if not pending:
+            return 0
+
+        items = list(pending.items())
+        try:
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                cases = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+                placeholders = ', '.join(['%s'] * len(chunk))
+                params = [value for pair in chunk for value in pair]
+                params.extend(user_id for user_id, _ in chunk)
+                Database().execute_update(
+                    f"UPDATE users SET last_login = CASE user_id {cases} END "
+                    f"WHERE user_id IN ({placeholders})",
+                    tuple(params)
+                )
+        except Exception as e:
+            log.warning("⚠ Error escribiendo last_login (%d usuarios): %s", len(items), e)
+            # Reencolar sin pisar logins más nuevos
+            with self._logins_lock:
+                for user_id, logged_at in pending.items():
+                    if self._last_logins.get(user_id, logged_at) <= logged_at:
+                        self._last_logins[user_id] = logged_at
+            return 0
+
+        return len(items)
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Detener el flusher y escribir lo pendiente"""
+        self._stop.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            cached = len(self._verified)
+        with self._logins_lock:
+            pending_logins = len(self._last_logins)
+        return {
+            'cached_credentials': cached,
+            'hits': self.hits,
+            'misses': self.misses,
+            'rejected': self.rejected,
+            'pending_last_login': pending_logins
+        }
+
+# Instancia compartida por las rutas del proceso
+auth_cache = AuthCache(
+    ttl_seconds=Config.AUTH_CACHE_TTL,
+    max_entries=Config.AUTH_CACHE_MAX_ENTRIES,
+    workers=Config.BCRYPT_WORKERS,
+    max_pending=Config.BCRYPT_MAX_PENDING,
+    flush_interval=Config.LAST_LOGIN_FLUSH_INTERVAL
+)
+atexit.register(auth_cache.close)
@@ -0,0 +1,197 @@
+# Archivo: db_service/batch_metrics.py
+# MÉTRICAS DE LOTE MATERIALIZADAS: CONTEOS POR NODO, HISTOGRAMA DE LATENCIA, THROUGHPUT
+
+import bisect
+
+# Límites superiores (ms) del histograma de processing_time_ms; el último
+# bucket es +Inf. Deben coincidir con migrations/004_batch_metrics.sql
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+INF_BUCKET_MS = 2147483647
+
+# Filas por sentencia de upsert
+UPSERT_CHUNK = 500
+
+NODE_METRICS_QUERY = """
+    SELECT m.node_id, n.node_name, m.succeeded, m.failed, m.bytes_in, m.bytes_out,
+           m.processing_time_ms, m.first_result_at, m.last_result_at
+    FROM batch_node_metrics m
+    LEFT JOIN processing_nodes n ON n.node_id = m.node_id
+    WHERE m.batch_id = %s
+"""
+
+HISTOGRAM_QUERY = """
+    SELECT node_id, le_ms, count
+    FROM batch_latency_histogram
+    WHERE batch_id = %s
+"""
+
+def latency_bucket(processing_time_ms):
+    """Límite superior del bucket donde cae una latencia"""
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, processing_time_ms or 0)
+    return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else INF_BUCKET_MS
+
+class MetricsDeltas:
+    """
+    Incrementos de métricas por (lote, nodo) pendientes de aplicar
+
+    Se acumulan mientras se registra un bloque de resultados y se escriben
+    con dos INSERT ... ON DUPLICATE KEY UPDATE multi-fila (contadores por
+    nodo e histograma), en la misma transacción que los resultados.
+    """
+
+    def __init__(self):
+        self._nodes = {}        # (batch_id, node_id) -> [ok, fallidos, bytes_in, bytes_out, ms]
+        self._buckets = {}      # (batch_id, node_id, le_ms) -> count
+
+    def add_result(self, batch_id, node_id, status, processing_time_ms=None,
+                   bytes_in=None, bytes_out=None):
+        """Contabilizar un resultado"""
+        entry = self._nodes.setdefault((batch_id, node_id), [0, 0, 0, 0, 0])
+        if status == 'success':
+            entry[0] += 1
+            entry[3] += bytes_out or 0
+        else:
+            entry[1] += 1
+        entry[2] += bytes_in or 0
+        entry[4] += processing_time_ms or 0
+
+        key = (batch_id, node_id, latency_bucket(processing_time_ms))
+        self._buckets[key] = self._buckets.get(key, 0) + 1
+
+    def __bool__(self):
+        return bool(self._nodes)
+
+    def apply(self, cursor):
+        """Escribir los incrementos en la transacción del cursor"""
+        nodes = sorted(self._nodes.items())
+        for offset in range(0, len(nodes), UPSERT_CHUNK):
+            chunk = nodes[offset:offset + UPSERT_CHUNK]
+            cursor.execute(f"""
+                INSERT INTO batch_node_metrics
+                (batch_id, node_id, succeeded, failed, bytes_in, bytes_out,
+                 processing_time_ms, first_result_at, last_result_at)
+                VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, NOW(3), NOW(3))'] * len(chunk))}
+                ON DUPLICATE KEY UPDATE
+                    succeeded = succeeded + VALUES(succeeded),
+                    failed = failed + VALUES(failed),
+                    bytes_in = bytes_in + VALUES(bytes_in),
+                    bytes_out = bytes_out + VALUES(bytes_out),
+                    processing_time_ms = processing_time_ms + VALUES(processing_time_ms),
+                    last_result_at = VALUES(last_result_at)
+            """, tuple(value for key, counts in chunk for value in (*key, *counts)))
+
+        buckets = sorted(self._buckets.items())
+        for offset in range(0, len(buckets), UPSERT_CHUNK):
+            chunk = buckets[offset:offset + UPSERT_CHUNK]
+            cursor.execute(f"""
+                INSERT INTO batch_latency_histogram (batch_id, node_id, le_ms, count)
+                VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))}
+                ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+            """, tuple(value for key, count in chunk for value in (*key, count)))
+
+def _percentile(histogram, total, fraction):
+    """
+    Percentil estimado desde el histograma (interpolación lineal en el bucket)
+
+    Args:
+        histogram: Lista ordenada de (le_ms, count)
+    """
+    if not total:
+        return 0.0
+
+    target = fraction * total
+    lower = 0
+    cumulative = 0
+    for le_ms, count in histogram:
+        if count and cumulative + count >= target:
+            if le_ms == INF_BUCKET_MS:
+                return float(lower)     # Sin límite superior: el último conocido
+            return round(lower + (le_ms - lower) * (target - cumulative) / count, 1)
+        cumulative += count
+        lower = le_ms if le_ms != INF_BUCKET_MS else lower
+    return float(lower)
+
+def _latency_summary(histogram):
+    """{count, p50, p95, p99, buckets acumulados} desde {le_ms: count}"""
+    ordered = sorted(histogram.items())
+    total = sum(count for _, count in ordered)
+
+    cumulative = 0
+    buckets = {}
+    for le_ms, count in ordered:
+        cumulative += count
+        buckets['le_inf' if le_ms == INF_BUCKET_MS else f'le_{le_ms}ms'] = cumulative
+
+    return {
+        'count': total,
+        'p50_ms': _percentile(ordered, total, 0.50),
+        'p95_ms': _percentile(ordered, total, 0.95),
+        'p99_ms': _percentile(ordered, total, 0.99),
+        'histogram': buckets
+    }
+
+def _throughput(results, bytes_out, first_at, last_at):
+    elapsed = (last_at - first_at).total_seconds() if first_at and last_at else 0
+    if elapsed <= 0:
+        return {'window_seconds': 0.0, 'images_per_second': 0.0, 'bytes_out_per_second': 0.0}
+    return {
+        'window_seconds': round(elapsed, 3),
+        'images_per_second': round(results / elapsed, 2),
+        'bytes_out_per_second': round(bytes_out / elapsed, 1)
+    }
+
+def metrics_dict(node_rows, histogram_rows):
+    """
+    Armar las métricas del lote desde las filas materializadas
+
+    Solo recorre nodos x buckets (decenas de filas), nunca los resultados.
+
+    Returns:
+        dict: totales, latencia (p50/p95/p99 + histograma), throughput y
+              el mismo detalle por nodo
+    """
+    by_node = {}
+    for row in histogram_rows:
+        node_histogram = by_node.setdefault(row['node_id'], {})
+        node_histogram[row['le_ms']] = node_histogram.get(row['le_ms'], 0) + row['count']
+
+    totals = {'succeeded': 0, 'failed': 0, 'bytes_in': 0, 'bytes_out': 0, 'processing_time_ms': 0}
+    histogram = {}
+    first_at = last_at = None
+    nodes = []
+
+    for row in sorted(node_rows, key=lambda row: row['node_id']):
+        for name in totals:
+            totals[name] += int(row[name] or 0)
+        node_histogram = by_node.get(row['node_id'], {})
+        for le_ms, count in node_histogram.items():
+            histogram[le_ms] = histogram.get(le_ms, 0) + count
+
+        if row['first_result_at'] and (first_at is None or row['first_result_at'] < first_at):
+            first_at = row['first_result_at']
+        if row['last_result_at'] and (last_at is None or row['last_result_at'] > last_at):
+            last_at = row['last_result_at']
+
+        results = row['succeeded'] + row['failed']
+        nodes.append({
+            'node_id': row['node_id'],
+            'node_name': row['node_name'],
+            'succeeded': row['succeeded'],
+            'failed': row['failed'],
+            'bytes_in': int(row['bytes_in']),
+            'bytes_out': int(row['bytes_out']),
+            'processing_time_ms': int(row['processing_time_ms']),
+            'latency': _latency_summary(node_histogram),
+            'throughput': _throughput(results, int(row['bytes_out']),
+                                      row['first_result_at'], row['last_result_at'])
+        })
+
+    return {
+        **totals,
+        'latency': _latency_summary(histogram),
+        'throughput': _throughput(totals['succeeded'] + totals['failed'], totals['bytes_out'],
+                                  first_at, last_at),
+        'first_result_at': first_at.isoformat() if first_at else None,
+        'last_result_at': last_at.isoformat() if last_at else None,
+        'nodes': nodes
+    }
@@ -18,6 +18,26 @@ class Config:
     REST_PORT = int(os.getenv('REST_PORT', 5000))
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     
+    # SERVIDOR DE PRODUCCIÓN (gunicorn -c gunicorn.conf.py wsgi:app)
+    #
+    # Cada worker es un proceso con su propio estado en memoria:
+    #   - pool de MySQL (ver DB_MAX_CONNECTIONS)
+    #   - caché de login: cada worker verifica con bcrypt una vez por TTL; la
+    #     clave incluye el password_hash, así un cambio de contraseña vale en
+    #     todos los workers sin invalidar nada
+    #   - catálogo de transformaciones: invalidate() solo limpia el worker que
+    #     lo llama, los demás recargan al vencer el TTL o ante un nombre nuevo
+    #   - heartbeats: cada worker junta y escribe los suyos (el upsert nunca
+    #     retrocede last_heartbeat)
+    #   - /stats y /metrics muestran los contadores del worker que atiende
+    # Con WORKERS=1 (más THREADS) todo eso vuelve a ser un único estado.
+    WORKERS = int(os.getenv('WORKERS', 0)) or (os.cpu_count() or 1) * 2 + 1
+    THREADS = int(os.getenv('THREADS', 8))                      # Threads por worker
+    KEEPALIVE = int(os.getenv('KEEPALIVE', 5))                  # Segundos de keep-alive HTTP
+    WORKER_TIMEOUT = int(os.getenv('WORKER_TIMEOUT', 120))      # Descargas de lotes grandes
+    GRACEFUL_TIMEOUT = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+    MAX_REQUESTS = int(os.getenv('MAX_REQUESTS', 0))            # Reciclar workers (0 = nunca)
+    
     # CONFIGURACIÓN DE LA BASE DE DATOS MYSQL
     DB_HOST = os.getenv('DB_HOST', 'localhost')
     DB_PORT = int(os.getenv('DB_PORT', 3306))
@@ -26,9 +46,56 @@ class Config:
     DB_NAME = os.getenv('DB_NAME', 'image_processing_system')
     
     # CONFIGURACIÓN DE POOL DE CONEXIONES
-    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 30))  # Aumentado para soportar procesamiento paralelo
+    # Cada proceso tiene su propio pool: conexiones totales =
+    # procesos * (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW). Si no se fijan, el
+    # tamaño y el overflow salen de repartir DB_MAX_CONNECTIONS entre los
+    # procesos (3/4 fijas, 1/4 de overflow, ver size_pool): con python app.py
+    # el único proceso recibe todo el presupuesto y gunicorn.conf.py lo
+    # reparte entre los WORKERS. Sin WORKERS explícito tampoco se lanzan más
+    # workers de los que entran con 2 conexiones cada uno. gunicorn.conf.py no
+    # arranca si el total supera DB_MAX_CONNECTIONS o el max_connections del
+    # servidor MySQL (151 por defecto).
+    DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 120))      # Presupuesto de todo el servicio
+    DB_MIN_CONNECTIONS_PER_WORKER = 2
+    if not int(os.getenv('WORKERS', 0)):
+        WORKERS = max(1, min(WORKERS, DB_MAX_CONNECTIONS // DB_MIN_CONNECTIONS_PER_WORKER))
     DB_POOL_NAME = 'image_processing_pool'
-    
+    DB_POOL_SIZE = 0                                                    # Ver size_pool
+    DB_POOL_MAX_OVERFLOW = 0                                            # Conexiones extra en picos
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))           # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))           # Vida máxima de una conexión (< wait_timeout)
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_POOL_PRE_PING_IDLE = float(os.getenv('DB_POOL_PRE_PING_IDLE', 5))  # Sin ping si se usó hace menos (s)
+
+    # CACHÉ DEL CATÁLOGO DE TRANSFORMACIONES (segundos)
+    TRANSFORMATION_CACHE_TTL = int(os.getenv('TRANSFORMATION_CACHE_TTL', 300))
+
+    # CONFIGURACIÓN DE ARCHIVOS DE DESCARGA
+    ARCHIVE_WORKERS = int(os.getenv('ARCHIVE_WORKERS', 0)) or None          # 0 = un thread por core
+    ARCHIVE_COMPRESSION_LEVEL = int(os.getenv('ARCHIVE_COMPRESSION_LEVEL', 6))
+    ARCHIVE_TAR_CODEC = os.getenv('ARCHIVE_TAR_CODEC', 'gzip')              # 'gzip' o 'zstd'
+
+    # DIRECTORIO DE RESULTADOS (server/output, compartido con el servidor SOAP)
+    RESULTS_DIR = os.getenv('RESULTS_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server', 'output'
+    ))
+    RESULT_CACHE_MAX_AGE = int(os.getenv('RESULT_CACHE_MAX_AGE', 86400))    # Cache-Control de imágenes
+
+    # LOGIN: CACHÉ DE CREDENCIALES VERIFICADAS Y POOL DE BCRYPT
+    AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 300))                  # Segundos (0 = sin caché)
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000))
+    BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', 2))                    # bcrypt simultáneos
+    BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', 64))           # En espera antes de responder 503
+    LAST_LOGIN_FLUSH_INTERVAL = float(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', 5))
+
+    # HEARTBEATS DE NODOS (se juntan en memoria y se escriben en bloque)
+    HEARTBEAT_FLUSH_INTERVAL = float(os.getenv('HEARTBEAT_FLUSH_INTERVAL', 2))   # Segundos entre escrituras
+    HEARTBEAT_MAX_PENDING = int(os.getenv('HEARTBEAT_MAX_PENDING', 10000))      # Nodos pendientes que fuerzan un flush
+
+    # RETENCIÓN DE execution_logs (particiones mensuales, ver migrate.py)
+    LOG_RETENTION_MONTHS = int(os.getenv('LOG_RETENTION_MONTHS', 6))        # Meses completos que se conservan
+    LOG_PARTITIONS_AHEAD = int(os.getenv('LOG_PARTITIONS_AHEAD', 3))        # Particiones futuras creadas por adelantado
+
     @classmethod
     def get_db_config(cls):
         """Retorna diccionario con configuración de DB"""
@@ -37,7 +104,38 @@ class Config:
             'port': cls.DB_PORT,
             'user': cls.DB_USER,
             'password': cls.DB_PASSWORD,
-            'database': cls.DB_NAME,
-            'pool_name': cls.DB_POOL_NAME,
-            'pool_size': cls.DB_POOL_SIZE
-        }
\ No newline at end of file
+            'database': cls.DB_NAME
+        }
+    
+    @classmethod
+    def size_pool(cls, processes):
+        """
+        Repartir DB_MAX_CONNECTIONS entre processes pools
+
+        DB_POOL_SIZE y DB_POOL_MAX_OVERFLOW fijados por entorno se respetan.
+        """
+        per_process = max(cls.DB_MIN_CONNECTIONS_PER_WORKER, cls.DB_MAX_CONNECTIONS // max(1, processes))
+        cls.DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0)) or max(1, per_process * 3 // 4)
+        cls.DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', -1))
+        if cls.DB_POOL_MAX_OVERFLOW < 0:
+            cls.DB_POOL_MAX_OVERFLOW = max(0, per_process - cls.DB_POOL_SIZE)
+    
+    @classmethod
+    def total_db_connections(cls):
+        """Máximo de conexiones a MySQL que puede abrir el servicio completo"""
+        return cls.WORKERS * (cls.DB_POOL_SIZE + cls.DB_POOL_MAX_OVERFLOW)
+    
+    @classmethod
+    def get_pool_config(cls):
+        """Retorna diccionario con configuración del pool de conexiones"""
+        return {
+            'size': cls.DB_POOL_SIZE,
+            'max_overflow': cls.DB_POOL_MAX_OVERFLOW,
+            'timeout': cls.DB_POOL_TIMEOUT,
+            'recycle': cls.DB_POOL_RECYCLE,
+            'pre_ping': cls.DB_POOL_PRE_PING,
+            'pre_ping_idle': cls.DB_POOL_PRE_PING_IDLE
+        }
+
+# Un solo proceso (python app.py): todo el presupuesto para su pool
+Config.size_pool(1)
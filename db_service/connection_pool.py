@@ -0,0 +1,249 @@
+# Archivo: db_service/connection_pool.py
+# POOL DE CONEXIONES MYSQL CON ESPERA, PRE-PING, RECICLADO, OVERFLOW Y MÉTRICAS
+
+import bisect
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+from metrics import histogram
+
+POOL_WAIT_SECONDS = histogram('db_pool_wait_seconds', 'Espera para obtener una conexión del pool')
+
+# Límites superiores (ms) del histograma de espera al pedir una conexión
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class PoolTimeoutError(Error):
+    """No se liberó ninguna conexión dentro del timeout"""
+
+class _Slot:
+    """Una conexión abierta con su fecha de creación y de último uso"""
+
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+class PooledConnection:
+    """
+    Conexión prestada por el pool
+
+    Delega todo en la conexión MySQL real; close() la devuelve al pool en
+    lugar de cerrarla (mismo contrato que PooledMySQLConnection, así el
+    código existente sigue llamando connection.close()).
+    """
+
+    def __init__(self, pool, slot):
+        self._pool = pool
+        self._slot = slot
+
+    def __getattr__(self, name):
+        return getattr(self._slot.connection, name)
+
+    def close(self):
+        if self._slot is not None:
+            slot, self._slot = self._slot, None
+            self._pool._release(slot)
+
+    def discard(self):
+        """Cerrar la conexión en lugar de devolverla (resultado a medio leer)"""
+        if self._slot is not None:
+            slot, self._slot = self._slot, None
+            self._pool._release(slot, keep=False)
+
+class ConnectionPool:
+    """
+    Pool de conexiones MySQL
+
+    - size conexiones permanentes más hasta max_overflow temporales; las
+      de overflow se cierran al devolverse si ya hay size ociosas.
+    - get_connection() espera hasta timeout segundos a que se libere una
+      conexión (en lugar de fallar apenas se agota el pool) y recién
+      entonces lanza PoolTimeoutError.
+    - Antes de prestar una conexión que estuvo ociosa más de pre_ping_idle
+      segundos se verifica con ping (pre_ping) y se reemplaza si el servidor
+      la cerró; una devuelta hace instantes no paga ese round-trip. Las
+      conexiones con más de recycle segundos de vida se reemplazan siempre.
+    - stats() expone conexiones en uso, ociosas, threads esperando y un
+      histograma del tiempo de espera.
+    """
+
+    def __init__(self, size=30, max_overflow=10, timeout=10.0, recycle=1800,
+                 pre_ping=True, pre_ping_idle=5.0, **connect_args):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.pre_ping_idle = pre_ping_idle
+        self.connect_args = connect_args
+
+        self._idle = deque()            # _Slot ociosos, el más reciente a la derecha
+        self._total = 0                 # Abiertas: prestadas + ociosas + abriéndose
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+        self.created = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+        self._wait_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_sum_ms = 0.0
+        self._wait_total = 0
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.connect_args)
+        with self._cond:
+            self.created += 1
+        return _Slot(connection)
+
+    def _is_usable(self, slot):
+        if self.recycle and time.monotonic() - slot.created_at > self.recycle:
+            with self._cond:
+                self.recycled += 1
+            return False
+        if self.pre_ping and time.monotonic() - slot.released_at >= self.pre_ping_idle:
+            try:
+                slot.connection.ping(reconnect=False)
+            except Error:
+                with self._cond:
+                    self.ping_failures += 1
+                return False
+        return True
+
+    def get_connection(self):
+        """
+        Pedir una conexión (espera hasta timeout si están todas en uso)
+
+        Returns:
+            PooledConnection: close() la devuelve al pool
+
+        Raises:
+            PoolTimeoutError: Si no se liberó ninguna a tiempo
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        with self._cond:
+            if not self._idle and self._total >= self.size + self.max_overflow:
+                # Solo cuenta como esperando quien realmente se bloquea
+                self._waiting += 1
+                try:
+                    while not self._idle and self._total >= self.size + self.max_overflow:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeoutError(
+                                msg=f'Pool agotado: {self._in_use} conexiones en uso, '
+                                    f'sin liberar en {self.timeout:.1f} s'
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if self._idle:
+                slot = self._idle.pop()
+            else:
+                slot = None
+                self._total += 1
+
+            self._in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use)
+            wait = time.monotonic() - start
+            self._record_wait(wait * 1000)
+        POOL_WAIT_SECONDS.observe(wait)
+
+        try:
+            if slot is not None and not self._is_usable(slot):
+                self._close_quietly(slot.connection)
+                slot = None
+            if slot is None:
+                slot = self._connect()
+        except Exception:
+            # No se pudo abrir la conexión: liberar el cupo
+            with self._cond:
+                self._total -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, slot)
+
+    def _release(self, slot, keep=True):
+        """Devolver una conexión (la llama PooledConnection.close)"""
+        if keep:
+            try:
+                # Nunca devolver una transacción abierta
+                if slot.connection.in_transaction:
+                    slot.connection.rollback()
+            except Error:
+                keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            if keep and len(self._idle) < self.size:
+                slot.released_at = time.monotonic()
+                self._idle.append(slot)
+                slot = None
+            else:
+                self._total -= 1    # Overflow (o rota): se cierra
+            self._cond.notify()
+
+        if slot is not None:
+            self._close_quietly(slot.connection)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _record_wait(self, wait_ms):
+        """Se llama con el lock tomado"""
+        self._wait_counts[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        self._wait_sum_ms += wait_ms
+        self._wait_total += 1
+
+    def close_all(self):
+        """Cerrar las conexiones ociosas (las prestadas se cierran al devolverse)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._total -= len(idle)
+        for slot in idle:
+            self._close_quietly(slot.connection)
+
+    def stats(self):
+        with self._cond:
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(WAIT_BUCKETS_MS, self._wait_counts):
+                cumulative += count
+                histogram[f'le_{bound}ms'] = cumulative
+            histogram['le_inf'] = cumulative + self._wait_counts[-1]
+
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'peak_in_use': self.peak_in_use,
+                'created': self.created,
+                'recycled': self.recycled,
+                'ping_failures': self.ping_failures,
+                'timeouts': self.timeouts,
+                'wait_ms': {
+                    'count': self._wait_total,
+                    'sum': round(self._wait_sum_ms, 3),
+                    'histogram': histogram
+                }
+            }
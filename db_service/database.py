@@ -1,10 +1,50 @@
 # Archivo: db_service/database.py
 # GESTOR DE CONEXIONES A LA BASE DE DATOS MYSQL
 
-import mysql.connector
-from mysql.connector import pooling, Error
+from mysql.connector import Error
 from config import Config
+from connection_pool import ConnectionPool
+from metrics import gauge, histogram
+from logger import get_logger
+import tracing
+import functools
+import os
 import threading
+import time
+
+QUERY_SECONDS = histogram(
+    'db_query_seconds', 'Duración de las consultas (incluye espera del pool)', ['operation', 'status']
+)
+
+log = get_logger('DB')
+
+def _statement(query):
+    """SQL compacto para el atributo db.statement de un span"""
+    if not isinstance(query, str):
+        return f'{len(query or ())} sentencias'
+    return ' '.join(query.split())[:200]
+
+def _timed(operation):
+    """
+    Medir cada llamada del método en db_query_seconds{operation, status}
+    y, dentro de un request trazado, registrarla como span db.<operation>
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, query, *args, **kwargs):
+            start = time.perf_counter()
+            status = 'error'
+            with tracing.span(f'db.{operation}', kind='client') as span:
+                if span is not tracing.NOOP_SPAN:
+                    span.set_attribute('db.statement', _statement(query))
+                try:
+                    result = method(self, query, *args, **kwargs)
+                    status = 'ok'
+                    return result
+                finally:
+                    QUERY_SECONDS.labels(operation, status).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
 
 class Database:
     """
@@ -17,6 +57,7 @@ class Database:
     _instance = None
     _lock = threading.Lock()
     _pool = None
+    _pool_pid = None    # Proceso que creó el pool
     
     def __new__(cls):
         """Implementación del patrón Singleton"""
@@ -33,26 +74,43 @@ class Database:
         Crea un pool de conexiones que se reutilizan
         """
         try:
-            print("[DB] Inicializando pool de conexiones...")
-            self._pool = pooling.MySQLConnectionPool(**Config.get_db_config())
-            print(f"[DB] Pool creado exitosamente con {Config.DB_POOL_SIZE} conexiones")
+            self._pool = ConnectionPool(**Config.get_pool_config(), **Config.get_db_config())
+            self._pool_pid = os.getpid()
+            
+            # Abrir la primera conexión ya: si MySQL no responde se falla al iniciar
+            self._pool.get_connection().close()
+            log.info("Pool creado: %d conexiones (+%d overflow, espera máx. %.0f s)",
+                     Config.DB_POOL_SIZE, Config.DB_POOL_MAX_OVERFLOW, Config.DB_POOL_TIMEOUT)
         except Error as e:
-            print(f"[DB] ERROR al crear pool: {e}")
+            log.error("ERROR al crear pool: %s", e)
             raise
     
     def get_connection(self):
         """
         OBTENER CONEXIÓN DEL POOL
+        Si están todas en uso espera hasta DB_POOL_TIMEOUT segundos
         
         Returns:
             connection: Conexión MySQL del pool
         """
+        # Después de un fork (workers de gunicorn con preload) cada proceso
+        # crea su propio pool: los sockets heredados no se pueden compartir
+        if self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool_pid != os.getpid():
+                    self._initialize_pool()
+        
         try:
             return self._pool.get_connection()
         except Error as e:
-            print(f"[DB] ERROR al obtener conexión: {e}")
+            log.error("ERROR al obtener conexión: %s", e)
             raise
     
+    def pool_stats(self):
+        """Métricas del pool (en uso, esperando, histograma de espera)"""
+        return self._pool.stats()
+    
+    @_timed('query')
     def execute_query(self, query, params=None, fetch=True): #leer datos
         """
         EJECUTAR QUERY SQL (SELECT)
@@ -83,8 +141,7 @@ class Database:
             return None
             
         except Error as e:
-            print(f"[DB] ERROR en query: {e}")
-            print(f"[DB] Query: {query}")
+            log.error("ERROR en query: %s | Query: %s", e, _statement(query))
             raise
         finally:
             if cursor:
@@ -92,6 +149,52 @@ class Database:
             if connection:
                 connection.close()
     
+    def iter_query(self, query, params=None, batch_size=500):
+        """
+        RECORRER UN SELECT SIN CARGARLO ENTERO EN MEMORIA
+        
+        Usa un cursor sin buffer: las filas se leen del socket a medida que
+        se consumen (de a batch_size), con memoria constante sin importar
+        el tamaño del resultado. La conexión queda tomada hasta agotar o
+        cerrar el generador; si se abandona a medio leer se descarta.
+        
+        Yields:
+            dict: Una fila por iteración
+        """
+        start = time.perf_counter()
+        start_ns = time.time_ns()
+        connection = self.get_connection()
+        cursor = None
+        exhausted = False
+        try:
+            cursor = connection.cursor(dictionary=True, buffered=False)
+            cursor.execute(query, params or ())
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            
+            exhausted = True
+            
+        except Error as e:
+            log.error("ERROR en query: %s | Query: %s", e, _statement(query))
+            raise
+        finally:
+            if exhausted:
+                cursor.close()
+                connection.close()
+            else:
+                # Quedaron filas sin leer en el socket: la conexión no se reutiliza
+                connection.discard()
+            # Hasta agotar o abandonar el generador (incluye el consumo de filas)
+            QUERY_SECONDS.labels('iter', 'ok' if exhausted else 'error').observe(time.perf_counter() - start)
+            if tracing.current_context() is not None:
+                tracing.record_span('db.iter', start_ns, time.time_ns(),
+                                    attributes={'db.statement': _statement(query)})
+    
+    @_timed('update')
     def execute_update(self, query, params=None):
         """
         EJECUTAR QUERY SQL (INSERT/UPDATE/DELETE)
@@ -122,8 +225,7 @@ class Database:
         except Error as e:
             if connection:
                 connection.rollback()
-            print(f"[DB] ERROR en update: {e}")
-            print(f"[DB] Query: {query}")
+            log.error("ERROR en update: %s | Query: %s", e, _statement(query))
             raise
         finally:
             if cursor:
@@ -131,6 +233,7 @@ class Database:
             if connection:
                 connection.close()
     
+    @_timed('transaction')
     def execute_transaction(self, queries_with_params):
         """
         EJECUTAR MÚLTIPLES QUERIES EN UNA TRANSACCIÓN
@@ -162,10 +265,22 @@ class Database:
         except Error as e:
             if connection:
                 connection.rollback()
-            print(f"[DB] ERROR en transacción: {e}")
+            log.error("ERROR en transacción: %s", e)
             raise
         finally:
             if cursor:
                 cursor.close()
             if connection:
-                connection.close()
\ No newline at end of file
+                connection.close()
+
+def _pool_value(field):
+    """Valor de pool_stats() sin crear el pool si todavía no existe"""
+    instance = Database._instance
+    if instance is None or instance._pool is None:
+        return None
+    return instance._pool.stats()[field]
+
+# Estado del pool al momento del scrape
+DB_POOL_CONNECTIONS = gauge('db_pool_connections', 'Conexiones del pool por estado', ['state'])
+for _state in ('open', 'in_use', 'idle', 'waiting'):
+    DB_POOL_CONNECTIONS.labels(_state).set_function(functools.partial(_pool_value, _state))
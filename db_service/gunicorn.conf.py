@@ -0,0 +1,81 @@
+# Archivo: db_service/gunicorn.conf.py
+# CONFIGURACIÓN DE GUNICORN PARA EL DB SERVICE (PRODUCCIÓN)
+#
+# Uso:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Recarga sin cortar conexiones (código nuevo, workers nuevos):
+#   kill -HUP <pid del master>
+
+from config import Config
+
+bind = f'{Config.REST_HOST}:{Config.REST_PORT}'
+
+# Workers (procesos) con threads: bcrypt, Pillow y zlib sueltan el GIL
+worker_class = 'gthread'
+workers = Config.WORKERS
+
+# Los workers heredan Config del master: repartir el presupuesto entre ellos
+Config.size_pool(workers)
+threads = Config.THREADS
+
+keepalive = Config.KEEPALIVE
+timeout = Config.WORKER_TIMEOUT
+graceful_timeout = Config.GRACEFUL_TIMEOUT
+max_requests = Config.MAX_REQUESTS
+max_requests_jitter = Config.MAX_REQUESTS // 10
+
+# Sin preload: cada worker importa la app después del fork, así el pool de
+# MySQL, la caché de credenciales y sus threads se crean dentro del worker
+# y un HUP recarga el código.
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+def on_starting(server):
+    # Cada worker abre su propio pool: no arrancar si entre todos superan lo que MySQL acepta.
+    # Tampoco con migraciones pendientes: el código usa columnas y tablas que solo crean ellas
+    total = Config.total_db_connections()
+    server.log.info(f"[REST API] {Config.WORKERS} workers x ({Config.DB_POOL_SIZE} + "
+                    f"{Config.DB_POOL_MAX_OVERFLOW} overflow) = hasta {total} conexiones a MySQL")
+    if total > Config.DB_MAX_CONNECTIONS:
+        raise SystemExit(f"[REST API] {total} conexiones superan DB_MAX_CONNECTIONS={Config.DB_MAX_CONNECTIONS}: "
+                         f"bajar WORKERS, DB_POOL_SIZE o DB_POOL_MAX_OVERFLOW")
+
+    import mysql.connector
+    from migrate import pending_migrations
+
+    try:
+        conn = mysql.connector.connect(**Config.get_db_config())
+    except mysql.connector.Error as e:
+        server.log.warning(f"[REST API] No se pudo conectar a MySQL para verificar el esquema: {e}")
+        return
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT @@max_connections")
+        server_max = cursor.fetchone()[0]
+        cursor.close()
+        pending = pending_migrations(conn)
+    finally:
+        conn.close()
+
+    if total >= server_max:
+        raise SystemExit(f"[REST API] {total} conexiones no entran en max_connections={server_max} de MySQL")
+    if pending:
+        raise SystemExit(f"[REST API] Migraciones pendientes ({', '.join(version for version, _ in pending)}): "
+                         f"correr 'python migrate.py up'")
+
+def post_fork(server, worker):
+    server.log.info(f"[REST API] Worker {worker.pid} iniciado")
+
+def worker_exit(server, worker):
+    # Escribir lo pendiente en memoria (last_login diferido, heartbeats) antes de salir
+    try:
+        from auth_cache import auth_cache
+        from heartbeat_aggregator import heartbeat_aggregator
+        auth_cache.close()
+        heartbeat_aggregator.close()
+    except Exception as e:
+        server.log.warning(f"[REST API] Worker {worker.pid}: error al cerrar: {e}")
@@ -0,0 +1,250 @@
+# Archivo: db_service/heartbeat_aggregator.py
+# HEARTBEATS DE NODOS: COALESCENCIA EN MEMORIA Y UPSERT MULTI-FILA PERIÓDICO
+
+import atexit
+import json
+import threading
+from datetime import datetime
+
+from config import Config
+from database import Database
+from logger import get_logger
+
+log = get_logger('HEARTBEAT')
+
+NODE_STATUSES = ('active', 'inactive', 'error')
+
+# Campos opcionales de un heartbeat (columnas de processing_nodes)
+HEARTBEAT_FIELDS = ('ip_address', 'port', 'cpu_cores', 'ram_gb', 'current_load',
+                    'max_concurrent_jobs', 'telemetry')
+
+# Nodos por sentencia INSERT ... ON DUPLICATE KEY UPDATE
+UPSERT_CHUNK = 500
+
+class HeartbeatAggregator:
+    """
+    Junta los heartbeats de los nodos y los escribe en bloque
+
+    record() solo actualiza un dict en memoria: si un nodo manda varios
+    heartbeats entre dos flush, queda el último (por campo). Cada
+    flush_interval segundos se escriben todos con un INSERT ... ON DUPLICATE
+    KEY UPDATE multi-fila, que además registra los nodos nuevos (en lugar
+    de SELECT + INSERT/UPDATE por heartbeat). Los heartbeats se agrupan por
+    campos presentes: un campo que el nodo no mandó no pisa el guardado.
+
+    Con varios workers de gunicorn cada uno junta los suyos: un heartbeat
+    viejo escrito tarde no retrocede last_heartbeat ni pisa los campos de
+    uno más nuevo. Un nodo nuevo cuyo nombre Node-{id} ya usa otro nodo se
+    rechaza (el upsert sobre node_name pisaría la fila del otro).
+    """
+
+    def __init__(self, flush_interval=2.0, max_pending=10000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = {}          # node_id -> {campo: valor, 'received_at': datetime}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._run_flusher, name='heartbeats', daemon=True)
+        self._flusher.start()
+
+        self.received = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.statements = 0
+        self.errors = 0
+        self.rejected = 0
+
+    def record(self, node_id, data=None):
+        """
+        Anotar un heartbeat (no hace I/O)
+
+        Raises:
+            ValueError: Si node_id o status no son válidos
+        """
+        node_id = int(node_id)
+        if node_id < 1:
+            raise ValueError('node_id debe ser mayor que 0')
+
+        data = data or {}
+        status = data.get('status') or 'active'
+        if status not in NODE_STATUSES:
+            raise ValueError(f'status inválido: {status}')
+
+        fields = {name: data[name] for name in HEARTBEAT_FIELDS if data.get(name) is not None}
+        if 'telemetry' in fields:
+            if not isinstance(fields['telemetry'], dict):
+                raise ValueError('telemetry debe ser un objeto')
+            fields['telemetry'] = json.dumps(fields['telemetry'], separators=(',', ':'))
+
+        with self._lock:
+            entry = self._pending.get(node_id)
+            if entry is None:
+                entry = self._pending[node_id] = {}
+            else:
+                self.coalesced += 1
+            entry.update(fields)
+            entry['status'] = status
+            entry['received_at'] = datetime.now()
+            self.received += 1
+            size = len(self._pending)
+
+        if size >= self.max_pending:
+            self._wakeup.set()
+
+    def _upsert(self, cursor, fields, chunk):
+        """Un INSERT ... ON DUPLICATE KEY UPDATE para nodos con los mismos campos"""
+        params = []
+        for node_id, entry in chunk:
+            params.extend((
+                node_id,
+                entry['node_name'],
+                entry.get('ip_address', 'localhost'),
+                entry.get('port', 50050 + node_id),
+                entry.get('cpu_cores'),
+                entry.get('ram_gb'),
+                entry.get('current_load', 0),
+                entry.get('max_concurrent_jobs', 5),
+                entry.get('telemetry'),
+                entry['status'],
+                entry['received_at']
+            ))
+
+        # MySQL evalúa las asignaciones en orden: last_heartbeat va al final
+        # para que las anteriores comparen contra el valor guardado
+        newer = '(last_heartbeat IS NULL OR VALUES(last_heartbeat) >= last_heartbeat)'
+        updates = [f'{name} = IF({newer}, VALUES({name}), {name})' for name in ('status',) + fields]
+        updates.append('last_heartbeat = GREATEST(COALESCE(last_heartbeat, VALUES(last_heartbeat)), '
+                       'VALUES(last_heartbeat))')
+
+        cursor.execute(f"""
+            INSERT INTO processing_nodes
+            (node_id, node_name, ip_address, port, cpu_cores, ram_gb, current_load,
+             max_concurrent_jobs, telemetry, status, last_heartbeat)
+            VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(chunk))}
+            ON DUPLICATE KEY UPDATE {', '.join(updates)}
+        """, tuple(params))
+
+    def flush(self):
+        """Escribir los heartbeats pendientes. Retorna la cantidad de nodos escritos"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            db = Database()
+            connection = db.get_connection()
+            cursor = connection.cursor()
+            statements = 0
+            rejected = 0
+            try:
+                connection.start_transaction()
+                entries_by_node = self._resolve_names(cursor, pending)
+                rejected = len(pending) - len(entries_by_node)
+
+                groups = {}
+                for node_id, entry in sorted(entries_by_node.items()):
+                    fields = tuple(name for name in HEARTBEAT_FIELDS if name in entry)
+                    groups.setdefault(fields, []).append((node_id, entry))
+
+                for fields, entries in groups.items():
+                    for offset in range(0, len(entries), UPSERT_CHUNK):
+                        self._upsert(cursor, fields, entries[offset:offset + UPSERT_CHUNK])
+                        statements += 1
+                connection.commit()
+            except Exception as e:
+                connection.rollback()
+                log.warning("⚠ Error escribiendo %d heartbeats: %s", len(pending), e)
+                # Reencolar sin pisar heartbeats más nuevos
+                with self._lock:
+                    self.errors += 1
+                    for node_id, entry in pending.items():
+                        newer = self._pending.get(node_id)
+                        if newer is not None:
+                            entry.update(newer)
+                        self._pending[node_id] = entry
+                return 0
+            finally:
+                cursor.close()
+                connection.close()
+
+            with self._lock:
+                self.flushed += len(pending) - rejected
+                self.statements += statements
+                self.rejected += rejected
+            return len(pending) - rejected
+
+    def _resolve_names(self, cursor, pending):
+        """
+        Nombre de cada nodo para el upsert (una consulta para todos)
+
+        Un nodo existente conserva su node_name; uno nuevo recibe Node-{id}
+        salvo que ese nombre ya sea de otro nodo, y en ese caso se descarta.
+
+        Returns:
+            dict: node_id -> entry con 'node_name'
+        """
+        node_ids = sorted(pending)
+        generated = [f'Node-{node_id}' for node_id in node_ids]
+        cursor.execute(f"""
+            SELECT node_id, node_name FROM processing_nodes
+            WHERE node_id IN ({', '.join(['%s'] * len(node_ids))})
+               OR node_name IN ({', '.join(['%s'] * len(generated))})
+        """, tuple(node_ids) + tuple(generated))
+
+        names = {}
+        owners = {}
+        for node_id, node_name in cursor.fetchall():
+            names[node_id] = node_name
+            owners[node_name] = node_id
+
+        resolved = {}
+        for node_id in node_ids:
+            entry = pending[node_id]
+            name = names.get(node_id, f'Node-{node_id}')
+            owner = owners.get(name)
+            if owner is not None and owner != node_id:
+                log.warning("⚠ Heartbeat de nodo %s rechazado: el nombre %s ya es del nodo %s",
+                            node_id, name, owner)
+                continue
+            entry['node_name'] = name
+            resolved[node_id] = entry
+        return resolved
+
+    def _run_flusher(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.warning("⚠ Error en flush: %s", e)
+
+    def close(self):
+        """Detener el flusher y escribir lo pendiente"""
+        self._stop.set()
+        self._wakeup.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_nodes': len(self._pending),
+                'received': self.received,
+                'coalesced': self.coalesced,
+                'flushed': self.flushed,
+                'statements': self.statements,
+                'errors': self.errors,
+                'rejected': self.rejected
+            }
+
+# Instancia compartida por las rutas del proceso
+heartbeat_aggregator = HeartbeatAggregator(
+    flush_interval=Config.HEARTBEAT_FLUSH_INTERVAL,
+    max_pending=Config.HEARTBEAT_MAX_PENDING
+)
+atexit.register(heartbeat_aggregator.close)
@@ -0,0 +1,306 @@
+# Archivo: db_service/migrate.py
+# MIGRACIONES VERSIONADAS DEL ESQUEMA Y MANTENIMIENTO DE PARTICIONES DE LOGS
+#
+# schema.sql crea el esquema base; los cambios posteriores viven en
+# migrations/NNN_nombre.sql y se aplican una sola vez, en orden. Las
+# versiones aplicadas se registran en la tabla schema_migrations junto con
+# un checksum del archivo (se avisa si un archivo ya aplicado cambió).
+#
+# El servicio no arranca con migraciones pendientes (el código usa columnas
+# y tablas que solo crean ellas): el Dockerfile corre "up" antes de gunicorn.
+#
+# Comandos:
+#   python migrate.py status        Versiones aplicadas y pendientes
+#   python migrate.py up            Aplicar las pendientes
+#   python migrate.py check         Salir con código 1 si hay pendientes
+#   python migrate.py partitions    Crear particiones mensuales de execution_logs
+#                                   y borrar las vencidas (programar 1 vez por día)
+#
+# Las sentencias DDL de MySQL hacen commit implícito: si una migración
+# falla a mitad, no queda registrada y hay que revisar a mano lo aplicado.
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+from datetime import date
+
+import mysql.connector
+from mysql.connector import Error
+
+from config import Config
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+LOGS_TABLE = 'execution_logs'
+FUTURE_PARTITION = 'p_future'
+
+_MIGRATION_FILE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+# Lock con nombre de MySQL: varias réplicas arrancando a la vez aplican de a una
+MIGRATION_LOCK = 'image_processing_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 300
+_MONTH_PARTITION = re.compile(r'^p(\d{4})(\d{2})$')
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """
+    Leer los archivos de migración ordenados por versión
+
+    Returns:
+        list: [(version, nombre, sql, checksum)]
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), 'rb') as f:
+            content = f.read()
+        migrations.append((
+            match.group(1),
+            match.group(2),
+            content.decode('utf-8'),
+            hashlib.sha256(content.replace(b'\r\n', b'\n')).hexdigest()
+        ))
+    return sorted(migrations, key=lambda migration: int(migration[0]))
+
+def split_statements(sql):
+    """Separar un archivo en sentencias (sin comentarios '--' de línea completa)"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(16) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def applied_versions(cursor):
+    """Retorna {version: checksum} de las migraciones ya aplicadas"""
+    ensure_migrations_table(cursor)
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return {version: checksum for version, checksum in cursor.fetchall()}
+
+def apply_pending(connection, directory=MIGRATIONS_DIR, verbose=True):
+    """
+    Aplicar en orden las migraciones que falten
+
+    Returns:
+        list: Versiones aplicadas en esta llamada
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError(f'No se obtuvo el lock {MIGRATION_LOCK} en {MIGRATION_LOCK_TIMEOUT} s')
+    except Exception:
+        cursor.close()
+        raise
+
+    try:
+        # Leer lo aplicado recién con el lock tomado (otra réplica pudo terminar antes)
+        applied = applied_versions(cursor)
+        done = []
+
+        for version, name, sql, checksum in load_migrations(directory):
+            if version in applied:
+                if applied[version] != checksum and verbose:
+                    print(f"[MIGRATE] ⚠ {version}_{name} cambió después de aplicarse")
+                continue
+
+            if verbose:
+                print(f"[MIGRATE] Aplicando {version}_{name}...")
+            for statement in split_statements(sql):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (version, name, checksum)
+            )
+            connection.commit()
+            done.append(version)
+
+        return done
+    finally:
+        try:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+def pending_migrations(connection, directory=MIGRATIONS_DIR):
+    """
+    Migraciones que todavía no se aplicaron
+
+    Returns:
+        list: [(version, nombre)]
+    """
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+    finally:
+        cursor.close()
+    return [(version, name) for version, name, _, _ in load_migrations(directory) if version not in applied]
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _partition_name(month):
+    return f'p{month.year:04d}{month.month:02d}'
+
+def log_partitions(cursor):
+    """
+    Particiones actuales de execution_logs
+
+    Returns:
+        list: [(nombre, primer día del mes)] de las particiones mensuales,
+              o None si la tabla todavía no está particionada
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (LOGS_TABLE,))
+    names = [row[0] for row in cursor.fetchall()]
+
+    if not names or names[0] is None:
+        return None
+
+    months = []
+    for name in names:
+        match = _MONTH_PARTITION.match(name)
+        if match:
+            months.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return months
+
+def maintain_partitions(connection, retention_months=None, months_ahead=None,
+                        today=None, verbose=True):
+    """
+    Crear las particiones mensuales que falten y borrar las vencidas
+
+    La partición pYYYYMM guarda los logs de ese mes. Las nuevas se sacan
+    de p_future (REORGANIZE, instantáneo mientras p_future esté vacía);
+    las vencidas se eliminan con DROP PARTITION, que libera el espacio de
+    una vez en lugar de un DELETE fila por fila.
+
+    Args:
+        retention_months: Meses completos a conservar además del actual
+        months_ahead: Meses futuros a tener creados
+
+    Returns:
+        dict: {'created': [...], 'dropped': [...]}
+    """
+    retention_months = Config.LOG_RETENTION_MONTHS if retention_months is None else retention_months
+    months_ahead = Config.LOG_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    current = (today or date.today()).replace(day=1)
+
+    cursor = connection.cursor()
+    try:
+        partitions = log_partitions(cursor)
+        if partitions is None:
+            raise RuntimeError(f'{LOGS_TABLE} no está particionada: ejecutar "python migrate.py up"')
+
+        # Crear desde el mes siguiente a la última partición (o el actual)
+        start = _add_months(partitions[-1][1], 1) if partitions else current
+        last = _add_months(current, months_ahead)
+
+        created = []
+        month = start
+        while month <= last:
+            created.append(month)
+            month = _add_months(month, 1)
+
+        if created:
+            definitions = ', '.join(
+                f"PARTITION {_partition_name(month)} VALUES LESS THAN "
+                f"(UNIX_TIMESTAMP('{_add_months(month, 1).isoformat()} 00:00:00'))"
+                for month in created
+            )
+            cursor.execute(
+                f"ALTER TABLE {LOGS_TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO "
+                f"({definitions}, PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE)"
+            )
+
+        # Vencidas: meses anteriores a (actual - retention_months)
+        oldest_kept = _add_months(current, -retention_months)
+        dropped = [name for name, month in partitions if month < oldest_kept]
+        if dropped:
+            cursor.execute(f"ALTER TABLE {LOGS_TABLE} DROP PARTITION {', '.join(dropped)}")
+
+        created = [_partition_name(month) for month in created]
+        if verbose:
+            print(f"[MIGRATE] Particiones de {LOGS_TABLE}: "
+                  f"{len(created)} creadas {created}, {len(dropped)} borradas {dropped}")
+        return {'created': created, 'dropped': dropped}
+    finally:
+        cursor.close()
+
+def print_status(connection):
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+        for version, name, _, checksum in load_migrations():
+            if version not in applied:
+                state = 'pendiente'
+            elif applied[version] != checksum:
+                state = 'aplicada (archivo modificado)'
+            else:
+                state = 'aplicada'
+            print(f"  {version}_{name:<40} {state}")
+
+        partitions = log_partitions(cursor)
+        if partitions is None:
+            print(f"\n  {LOGS_TABLE}: sin particionar")
+        else:
+            print(f"\n  {LOGS_TABLE}: {len(partitions)} particiones mensuales "
+                  f"{[name for name, _ in partitions]}")
+    finally:
+        cursor.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Migraciones del esquema y particiones de logs')
+    parser.add_argument('command', choices=['status', 'up', 'check', 'partitions'])
+    parser.add_argument('--retention-months', type=int, default=Config.LOG_RETENTION_MONTHS)
+    parser.add_argument('--months-ahead', type=int, default=Config.LOG_PARTITIONS_AHEAD)
+    args = parser.parse_args()
+
+    try:
+        connection = mysql.connector.connect(**Config.get_db_config())
+    except Error as e:
+        print(f"[MIGRATE] ✗ No se pudo conectar a MySQL: {e}")
+        sys.exit(1)
+
+    try:
+        if args.command == 'status':
+            print_status(connection)
+        elif args.command == 'check':
+            pending = pending_migrations(connection)
+            if pending:
+                print(f"[MIGRATE] ✗ Migraciones pendientes: "
+                      f"{', '.join(f'{version}_{name}' for version, name in pending)}")
+                sys.exit(1)
+            print("[MIGRATE] ✓ Esquema al día")
+        elif args.command == 'up':
+            done = apply_pending(connection)
+            print(f"[MIGRATE] ✓ {len(done)} migraciones aplicadas")
+            # Dejar las particiones listas apenas se particiona la tabla
+            cursor = connection.cursor()
+            partitioned = log_partitions(cursor) is not None
+            cursor.close()
+            if partitioned:
+                maintain_partitions(connection, args.retention_months, args.months_ahead)
+        else:
+            maintain_partitions(connection, args.retention_months, args.months_ahead)
+    except (Error, RuntimeError) as e:
+        print(f"[MIGRATE] ✗ {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
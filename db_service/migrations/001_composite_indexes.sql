@@ -0,0 +1,31 @@
+-- Archivo: db_service/migrations/001_composite_indexes.sql
+-- ÍNDICES COMPUESTOS PARA LOS CAMINOS DE ACCESO CALIENTES
+--
+-- Cada índice nuevo cubre el filtro y el orden de una consulta, así MySQL
+-- lee las filas ya ordenadas en lugar de hacer filesort. Los índices de una
+-- sola columna que quedan cubiertos por un compuesto (misma primera
+-- columna) se eliminan.
+
+-- GET /api/logs/batch/<id>: WHERE batch_id = ? ORDER BY timestamp DESC
+-- (idx_log_batch se mantiene: sirve la paginación por log_id dentro del lote)
+CREATE INDEX idx_log_batch_time ON execution_logs (batch_id, timestamp);
+
+-- GET /api/logs/recent: ORDER BY timestamp DESC LIMIT n sobre toda la tabla
+CREATE INDEX idx_log_time ON execution_logs (timestamp);
+
+-- GET /api/logs/image/<id> y /node/<id>: filtro + ORDER BY timestamp DESC
+CREATE INDEX idx_log_image_time ON execution_logs (image_id, timestamp);
+CREATE INDEX idx_log_node_time ON execution_logs (node_id, timestamp);
+DROP INDEX idx_log_image ON execution_logs;
+DROP INDEX idx_log_node ON execution_logs;
+
+-- Descargas, /info, /result/file y métricas de lote:
+-- JOIN por image_id con status = 'success' (el result_id del PK va implícito
+-- al final, sirve el ORDER BY result_id DESC LIMIT 1); processing_time_ms
+-- incluido para que los promedios de tiempo no lean la fila
+CREATE INDEX idx_result_image_status ON processed_results (image_id, status, processing_time_ms);
+DROP INDEX idx_result_image ON processed_results;
+
+-- GET /api/batches/user/<id>: WHERE user_id = ? ORDER BY created_at DESC
+CREATE INDEX idx_batch_user_created ON batch_requests (user_id, created_at);
+DROP INDEX idx_batch_user ON batch_requests;
@@ -0,0 +1,28 @@
+-- Archivo: db_service/migrations/002_partition_execution_logs.sql
+-- PARTICIONADO MENSUAL DE execution_logs (RETENCIÓN POR DROP PARTITION)
+--
+-- MySQL no permite foreign keys en tablas particionadas y exige que la
+-- columna de partición forme parte de toda clave única, por eso:
+--   1. Se quitan las FK de execution_logs hacia nodos, lotes e imágenes.
+--      Los logs pasan a guardar la referencia tal cual llega; las lecturas
+--      ya usan LEFT JOIN / filtros por id, así que no cambia ninguna consulta.
+--   2. La clave primaria pasa a ser (log_id, timestamp).
+--
+-- La tabla queda con una sola partición p_future; las mensuales (pYYYYMM)
+-- y el borrado de las vencidas los hace "python migrate.py partitions",
+-- que conviene programar una vez por día.
+
+ALTER TABLE execution_logs
+    DROP FOREIGN KEY execution_logs_ibfk_1,
+    DROP FOREIGN KEY execution_logs_ibfk_2,
+    DROP FOREIGN KEY execution_logs_ibfk_3;
+
+ALTER TABLE execution_logs
+    MODIFY COLUMN timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (log_id, timestamp);
+
+ALTER TABLE execution_logs
+    PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
@@ -0,0 +1,29 @@
+-- Archivo: db_service/migrations/003_batch_counters.sql
+-- CONTADORES DE PROGRESO DENORMALIZADOS EN batch_requests
+--
+-- processed_images pasa a ser el contador de resultados exitosos y se
+-- suman fallidos, bytes producidos y tiempo de procesamiento acumulado.
+-- Se actualizan con incrementos atómicos al registrar resultados
+-- (batch_counters.py) y se leen con una sola fila por clave primaria.
+
+ALTER TABLE batch_requests
+    ADD COLUMN failed_images INT NOT NULL DEFAULT 0 AFTER processed_images,
+    ADD COLUMN processed_bytes BIGINT NOT NULL DEFAULT 0 AFTER failed_images,
+    ADD COLUMN processing_time_ms_total BIGINT NOT NULL DEFAULT 0 AFTER processed_bytes;
+
+-- Recalcular los lotes existentes desde processed_results
+UPDATE batch_requests b
+JOIN (
+    SELECT i.batch_id,
+           SUM(pr.status = 'success') AS succeeded,
+           SUM(pr.status = 'failed') AS failed,
+           COALESCE(SUM(CASE WHEN pr.status = 'success' THEN pr.file_size END), 0) AS bytes,
+           COALESCE(SUM(pr.processing_time_ms), 0) AS processing_ms
+    FROM processed_results pr
+    JOIN images i ON i.image_id = pr.image_id
+    GROUP BY i.batch_id
+) totals ON totals.batch_id = b.batch_id
+SET b.processed_images = totals.succeeded,
+    b.failed_images = totals.failed,
+    b.processed_bytes = totals.bytes,
+    b.processing_time_ms_total = totals.processing_ms;
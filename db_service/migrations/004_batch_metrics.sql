@@ -0,0 +1,56 @@
+-- Archivo: db_service/migrations/004_batch_metrics.sql
+-- MÉTRICAS DE LOTE MATERIALIZADAS (POR NODO + HISTOGRAMA DE LATENCIA)
+--
+-- Se actualizan con upserts incrementales en la misma transacción que
+-- registra los resultados (batch_metrics.py); GetBatchMetrics solo lee
+-- estas filas (nodos del lote x buckets), nunca processed_results.
+
+CREATE TABLE batch_node_metrics (
+    batch_id INT NOT NULL,
+    node_id INT NOT NULL,
+    succeeded INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    bytes_in BIGINT NOT NULL DEFAULT 0,
+    bytes_out BIGINT NOT NULL DEFAULT 0,
+    processing_time_ms BIGINT NOT NULL DEFAULT 0,
+    first_result_at TIMESTAMP(3) NULL,
+    last_result_at TIMESTAMP(3) NULL,
+    PRIMARY KEY (batch_id, node_id)
+);
+
+-- le_ms: límite superior del bucket (2147483647 = +Inf).
+-- Los límites son LATENCY_BUCKETS_MS de batch_metrics.py
+CREATE TABLE batch_latency_histogram (
+    batch_id INT NOT NULL,
+    node_id INT NOT NULL,
+    le_ms INT NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (batch_id, node_id, le_ms)
+);
+
+-- Materializar los lotes existentes
+INSERT INTO batch_node_metrics
+    (batch_id, node_id, succeeded, failed, bytes_in, bytes_out,
+     processing_time_ms, first_result_at, last_result_at)
+SELECT i.batch_id, pr.node_id,
+       SUM(pr.status = 'success'),
+       SUM(pr.status = 'failed'),
+       COALESCE(SUM(i.file_size), 0),
+       COALESCE(SUM(CASE WHEN pr.status = 'success' THEN pr.file_size END), 0),
+       COALESCE(SUM(pr.processing_time_ms), 0),
+       MIN(pr.created_at),
+       MAX(pr.created_at)
+FROM processed_results pr
+JOIN images i ON i.image_id = pr.image_id
+GROUP BY i.batch_id, pr.node_id;
+
+-- INTERVAL(ms - 1, límites...) = cantidad de límites menores que ms = índice del bucket
+INSERT INTO batch_latency_histogram (batch_id, node_id, le_ms, count)
+SELECT i.batch_id, pr.node_id,
+       ELT(INTERVAL(COALESCE(pr.processing_time_ms, 0) - 1,
+                    10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000) + 1,
+           10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 2147483647) AS le_ms,
+       COUNT(*)
+FROM processed_results pr
+JOIN images i ON i.image_id = pr.image_id
+GROUP BY i.batch_id, pr.node_id, le_ms;
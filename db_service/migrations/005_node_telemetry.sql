@@ -0,0 +1,10 @@
+-- Archivo: db_service/migrations/005_node_telemetry.sql
+-- TELEMETRÍA DE NODOS EN processing_nodes
+--
+-- Cada heartbeat trae la última medición del nodo (CPU por core, RSS,
+-- trabajos en curso y en cola, latencias p50/p95/p99, píxeles por segundo,
+-- tasas de acierto) y se guarda completa en una columna JSON junto a
+-- current_load y max_concurrent_jobs, que ya existían.
+
+ALTER TABLE processing_nodes
+    ADD COLUMN telemetry JSON NULL AFTER max_concurrent_jobs;
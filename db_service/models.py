@@ -1,6 +1,7 @@
 # Archivo: db_service/models.py
 # MODELOS DE DATOS Y VALIDACIONES
 
+import json
 from datetime import datetime
 from typing import List, Dict, Optional
 
@@ -22,6 +23,9 @@ class BatchRequest:
             'completed_at': row['completed_at'].isoformat() if row['completed_at'] else None,
             'total_images': row['total_images'],
             'processed_images': row['processed_images'],
+            'failed_images': row.get('failed_images', 0),
+            'processed_bytes': row.get('processed_bytes', 0),
+            'processing_time_ms_total': row.get('processing_time_ms_total', 0),
             'output_format': row['output_format'],
             'compression_type': row['compression_type']
         }
@@ -90,9 +94,19 @@ class ProcessingNode:
             'current_load': row.get('current_load', 0),
             'max_concurrent_jobs': row.get('max_concurrent_jobs', 5),
             'weight': row.get('weight', 1),
+            'telemetry': ProcessingNode._telemetry(row.get('telemetry')),
             'created_at': row['created_at'].isoformat() if row['created_at'] else None,
             'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None
         }
+    
+    @staticmethod
+    def _telemetry(value):
+        """La columna JSON llega como str (o bytes) según el cursor"""
+        if not value:
+            return None
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode('utf-8')
+        return json.loads(value) if isinstance(value, str) else value
 
 class Transformation:
     """Modelo para transformaciones"""
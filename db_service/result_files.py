@@ -0,0 +1,67 @@
+# Archivo: db_service/result_files.py
+# RESOLUCIÓN DE ARCHIVOS DE RESULTADOS Y ETAGS POR CONTENIDO
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from config import Config
+from object_store import get_store
+
+class ResultFiles:
+    """
+    Ubica en disco los archivos de processed_results.storage_path y
+    calcula su ETag a partir del hash SHA-256 del contenido
+
+    Con un almacenamiento sin disco local (S3) resolve() retorna None y
+    la ruta de descarga redirige a una URL firmada.
+
+    El hash se calcula una sola vez por archivo y se recuerda en un LRU
+    indexado por (ruta, mtime, tamaño): si el archivo cambia, cambia la
+    clave y se vuelve a calcular.
+    """
+
+    def __init__(self, storage, max_entries=10000):
+        self.storage = storage
+        self.max_entries = max_entries
+        self._hashes = OrderedDict()    # (ruta, mtime_ns, tamaño) -> sha256 hex
+        self._lock = threading.Lock()
+
+    def resolve(self, storage_path):
+        """
+        Ruta en disco de un storage_path
+
+        Returns:
+            str: Ruta del archivo, o None si el almacenamiento no es local
+
+        Raises:
+            ValueError: Si la clave sale del directorio de salida
+        """
+        return self.storage.local_path(storage_path)
+
+    def content_hash(self, path, stat=None):
+        """SHA-256 del archivo (cacheado mientras no cambie)"""
+        stat = stat or os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            digest = self._hashes.get(key)
+            if digest is not None:
+                self._hashes.move_to_end(key)
+                return digest
+
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+
+        with self._lock:
+            self._hashes[key] = digest
+            if len(self._hashes) > self.max_entries:
+                self._hashes.popitem(last=False)
+
+        return digest
+
+# Instancia compartida por las rutas del proceso
+result_files = ResultFiles(get_store(Config.RESULTS_DIR))
@@ -1,4 +1,7 @@
 from flask import Blueprint
+from logger import get_logger
+
+log = get_logger('API')
 
 def register_routes(app):
     """Registrar todos los blueprints de rutas"""
@@ -20,4 +23,4 @@ def register_routes(app):
     app.register_blueprint(image_transformations_bp, url_prefix='/api/image-transformations')
     app.register_blueprint(downloads_bp, url_prefix='/api/batches')  # ← NUEVO
     
-    print("[API] Rutas registradas exitosamente")
\ No newline at end of file
+    log.info("Rutas registradas exitosamente")
\ No newline at end of file
@@ -3,7 +3,10 @@
 
 from flask import Blueprint, request, jsonify
 from database import Database
+from streaming import stream_rows, keyset_select
 from models import BatchRequest
+from batch_counters import PROGRESS_QUERY, progress_dict
+from batch_metrics import NODE_METRICS_QUERY, HISTOGRAM_QUERY, metrics_dict
 
 batches_bp = Blueprint('batches', __name__)
 db = Database()
@@ -71,6 +74,62 @@ def get_batch(batch_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@batches_bp.route('/<int:batch_id>/progress', methods=['GET'])
+def get_batch_progress(batch_id):
+    """
+    GET /api/batches/{batch_id}/progress
+    Progreso del lote desde los contadores (una fila por clave primaria)
+    
+    Returns:
+        {
+            "batch_id": int, "batch_name": str, "status": str, "created_at": str,
+            "total": int, "succeeded": int, "failed": int, "pending": int,
+            "bytes": int, "processing_time_ms": int,
+            "avg_processing_time_ms": float, "percent": float
+        }
+    """
+    try:
+        rows = db.execute_query(PROGRESS_QUERY, (batch_id,))
+        
+        if not rows:
+            return jsonify({'error': 'Lote no encontrado'}), 404
+        
+        return jsonify(progress_dict(rows[0])), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@batches_bp.route('/<int:batch_id>/metrics', methods=['GET'])
+def get_batch_metrics(batch_id):
+    """
+    GET /api/batches/{batch_id}/metrics
+    Progreso y métricas materializadas del lote (sin agregar resultados)
+    
+    Returns:
+        Campos de /progress más "metrics": {
+            succeeded, failed, bytes_in, bytes_out, processing_time_ms,
+            latency: {count, p50_ms, p95_ms, p99_ms, histogram},
+            throughput: {window_seconds, images_per_second, bytes_out_per_second},
+            first_result_at, last_result_at,
+            nodes: [{node_id, node_name, ..., latency, throughput}]
+        }
+    """
+    try:
+        rows = db.execute_query(PROGRESS_QUERY, (batch_id,))
+        
+        if not rows:
+            return jsonify({'error': 'Lote no encontrado'}), 404
+        
+        result = progress_dict(rows[0])
+        result['metrics'] = metrics_dict(
+            db.execute_query(NODE_METRICS_QUERY, (batch_id,)),
+            db.execute_query(HISTOGRAM_QUERY, (batch_id,))
+        )
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @batches_bp.route('/<int:batch_id>/status', methods=['PUT'])
 def update_batch_status(batch_id):
     """
@@ -80,7 +139,7 @@ def update_batch_status(batch_id):
     Body:
         {
             "status": str ("pending"|"processing"|"completed"|"failed"),
-            "processed_images": int (opcional),
+            "processed_images": int (opcional, reemplaza el contador),
             "started_at": datetime (opcional),
             "completed_at": datetime (opcional)
         }
@@ -128,19 +187,19 @@ def update_batch_status(batch_id):
 @batches_bp.route('/user/<int:user_id>', methods=['GET'])
 def get_user_batches(user_id):
     """
-    GET /api/batches/user/{user_id}
+    GET /api/batches/user/{user_id}[?after_id=&limit=&format=ndjson]
     Obtener todos los lotes de un usuario
     """
     try:
-        query = """
-            SELECT * FROM batch_requests 
-            WHERE user_id = %s 
-            ORDER BY created_at DESC
-        """
-        rows = db.execute_query(query, (user_id,))
-        
-        batches = [BatchRequest.to_dict(row) for row in rows]
-        return jsonify(batches), 200
+        query, params = keyset_select(
+            "SELECT * FROM batch_requests",
+            ["user_id = %s"], (user_id,),
+            id_column='batch_id',
+            order_by='created_at DESC'
+        )
+        return stream_rows(db.iter_query(query, params), BatchRequest.to_dict)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
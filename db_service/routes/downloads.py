@@ -1,21 +1,68 @@
 # Archivo: db_service/routes/downloads.py
-# ENDPOINT PARA DESCARGAR LOTES EN ZIP
+# ENDPOINT PARA DESCARGAR LOTES (ZIP / TAR SEGÚN compression_type)
 
 import os
+import threading
 import zipfile
-from io import BytesIO
-from flask import Blueprint, send_file, jsonify
+from collections import OrderedDict
+from flask import Blueprint, Response, jsonify, send_file, stream_with_context, redirect
+from config import Config
 from database import Database
+from archive_engine import archive_engine, OUTPUT_FORMATS, FORMAT_ALIASES
+from object_store import get_store
+from batch_counters import PROGRESS_QUERY, progress_dict
+from logger import get_logger
 
 downloads_bp = Blueprint('downloads', __name__)
 db = Database()
+log = get_logger('DOWNLOAD')
+
+# Almacenamiento donde el servidor SOAP guarda resultados y ZIPs pre-armados
+storage = get_store(Config.RESULTS_DIR)
+
+# ¿El ZIP pre-armado ya está en output_format? LRU {clave: (mtime, output_format, bool)}
+PREBUILT_CHECKS_MAX = 10000
+_prebuilt_checks = OrderedDict()
+_prebuilt_lock = threading.Lock()
 
 @downloads_bp.route('/<int:batch_id>/download', methods=['GET'])
 def download_batch(batch_id):
-    """Descargar todas las imágenes procesadas de un lote en ZIP"""
+    """
+    Descargar todas las imágenes procesadas de un lote
+    
+    El formato del archivo sale de batch_requests.compression_type
+    ('zip', 'tar' o 'none' = ZIP sin compresión) y las imágenes se
+    entregan en batch_requests.output_format.
+    """
     try:
-        print(f"\n[DOWNLOAD] Solicitud de descarga para batch_id={batch_id}")
-        
+        batch_rows = db.execute_query(
+            "SELECT compression_type, output_format FROM batch_requests WHERE batch_id = %s",
+            (batch_id,)
+        )
+        if not batch_rows:
+            return jsonify({'error': f'Lote {batch_id} no encontrado'}), 404
+        
+        compression_type = batch_rows[0]['compression_type'] or 'zip'
+        output_format = batch_rows[0]['output_format']
+        
+        # ZIP PRE-ARMADO POR EL SERVIDOR: sendfile con ETag y Range (o URL firmada en S3)
+        archive_key = f'batch_{batch_id}.zip'
+        if compression_type == 'zip' and _prebuilt_matches(archive_key, output_format):
+            archive_path = storage.local_path(archive_key)
+            if archive_path is None:
+                return redirect(storage.presigned_url(archive_key))
+            
+            log.info("Lote %s: enviando ZIP pre-armado %s", batch_id, archive_path)
+            return send_file(
+                archive_path,
+                mimetype='application/zip',
+                as_attachment=True,
+                download_name=f'batch_{batch_id}.zip',
+                conditional=True,
+                etag=True
+            )
+        
+        # SIN ZIP PRE-ARMADO: armarlo al vuelo desde la DB
         # CONSULTAR IMÁGENES DEL LOTE EN DB
         query = """
             SELECT 
@@ -32,70 +79,82 @@ def download_batch(batch_id):
         rows = db.execute_query(query, (batch_id,))
         
         if not rows:
-            print(f"[DOWNLOAD] No se encontraron imágenes para batch {batch_id}")
+            log.info("Lote %s: no hay imágenes procesadas", batch_id)
             return jsonify({
                 'error': f'No hay imágenes procesadas para el lote {batch_id}'
             }), 404
         
-        print(f"[DOWNLOAD] Encontradas {len(rows)} imágenes procesadas")
-        
-        # CREAR ZIP EN MEMORIA
-        zip_buffer = BytesIO()
-        files_added = 0
+        # VERIFICAR ARCHIVOS ANTES DE EMPEZAR (después ya no se puede responder 404)
+        entries = []
         files_missing = 0
         
-        # Ruta absoluta al directorio raíz del proyecto
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for row in rows:
-                # Construir ruta completa
-                file_path = os.path.join(
-                    project_root,
-                    'server',
-                    'output',
-                    row['storage_path']
-                )
-                
-                print(f"[DOWNLOAD] Buscando: {file_path}")
-                print(f"[DOWNLOAD] ¿Existe? {os.path.exists(file_path)}")
-                
-                if os.path.exists(file_path):
-                    # Agregar al ZIP
-                    zip_file.write(file_path, row['result_filename'])
-                    files_added += 1
-                    print(f"[DOWNLOAD] ✓ Agregado: {row['result_filename']}")
-                else:
-                    files_missing += 1
-                    print(f"[DOWNLOAD] ✗ Archivo no encontrado: {file_path}")
-        
-        print(f"[DOWNLOAD] Resumen: {files_added} agregados, {files_missing} faltantes")
-        
-        if files_added == 0:
+        for row in rows:
+            if storage.exists(row['storage_path']):
+                entries.append((row['storage_path'], row['result_filename']))
+            else:
+                files_missing += 1
+                log.debug("✗ Archivo no encontrado: %s", row['storage_path'])
+        
+        if files_missing:
+            log.warning("Lote %s: %d archivos faltantes de %d", batch_id, files_missing, len(rows))
+        
+        if not entries:
             return jsonify({
                 'error': 'No se encontraron archivos físicos para este lote',
                 'details': f'Se esperaban {len(rows)} archivos pero no se encontraron en el disco'
             }), 404
         
-        # POSICIONAR AL INICIO DEL BUFFER
-        zip_buffer.seek(0)
-        
-        # ENVIAR ZIP
-        print(f"[DOWNLOAD] Enviando ZIP al cliente: batch_{batch_id}.zip")
-        
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=f'batch_{batch_id}.zip'
+        # ENVIAR ARCHIVO EN STREAMING (chunked, se comprime en paralelo mientras se lee)
+        mimetype, extension = archive_engine.describe(compression_type)
+        download_name = f'batch_{batch_id}{extension}'
+        log.info("Lote %s: enviando %s, %d imágenes (compression_type=%s, output_format=%s)",
+                 batch_id, download_name, len(entries), compression_type, output_format)
+        
+        return Response(
+            stream_with_context(archive_engine.build(entries, compression_type, output_format)),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename={download_name}'
+            }
         )
         
     except Exception as e:
-        print(f"[DOWNLOAD] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error descargando lote %s: %s", batch_id, e)
         return jsonify({'error': str(e)}), 500
 
+def _prebuilt_matches(archive_key, output_format):
+    """
+    Verificar que el ZIP pre-armado existe y sus entradas ya están en output_format
+    
+    Solo lee el directorio central, y el resultado se recuerda por mtime.
+    """
+    head = storage.head(archive_key)
+    if head is None:
+        return False
+    
+    with _prebuilt_lock:
+        cached = _prebuilt_checks.get(archive_key)
+        if cached is not None and cached[:2] == (head['mtime'], output_format):
+            _prebuilt_checks.move_to_end(archive_key)
+            return cached[2]
+    
+    target = OUTPUT_FORMATS.get(output_format)
+    with storage.open(archive_key) as f, zipfile.ZipFile(f) as archive:
+        extensions = {
+            FORMAT_ALIASES.get(ext, ext)
+            for ext in (os.path.splitext(name)[1].lower() for name in archive.namelist())
+        }
+    matches = target is None or extensions <= {target[1]}
+    
+    # Un ZIP rearmado (mtime nuevo) reemplaza la entrada anterior
+    with _prebuilt_lock:
+        _prebuilt_checks[archive_key] = (head['mtime'], output_format, matches)
+        _prebuilt_checks.move_to_end(archive_key)
+        if len(_prebuilt_checks) > PREBUILT_CHECKS_MAX:
+            _prebuilt_checks.popitem(last=False)
+    
+    return matches
+
 @downloads_bp.route('/<int:batch_id>/info', methods=['GET'])
 def batch_download_info(batch_id):
     """
@@ -130,33 +189,23 @@ def batch_download_info(batch_id):
                 'error': f'No se encontraron imágenes para el lote {batch_id}'
             }), 404
         
-        images_info = []
-        total_success = 0
-        total_failed = 0
-        total_time = 0
+        images_info = [{
+            'image_id': row['image_id'],
+            'original_filename': row['original_filename'],
+            'result_filename': row['result_filename'],
+            'status': row['status'],
+            'processing_time_ms': row['processing_time_ms']
+        } for row in rows]
         
-        for row in rows:
-            images_info.append({
-                'image_id': row['image_id'],
-                'original_filename': row['original_filename'],
-                'result_filename': row['result_filename'],
-                'status': row['status'],
-                'processing_time_ms': row['processing_time_ms']
-            })
-            
-            if row['status'] == 'success':
-                total_success += 1
-            else:
-                total_failed += 1
-            
-            total_time += row['processing_time_ms'] or 0
+        # Totales desde los contadores materializados del lote
+        progress = progress_dict(db.execute_query(PROGRESS_QUERY, (batch_id,))[0])
         
         return jsonify({
             'batch_id': batch_id,
             'total_images': len(rows),
-            'successful': total_success,
-            'failed': total_failed,
-            'total_processing_time_ms': total_time,
+            'successful': progress['succeeded'],
+            'failed': progress['failed'],
+            'total_processing_time_ms': progress['processing_time_ms'],
             'images': images_info
         }), 200
         
@@ -8,7 +8,10 @@ image_transformations_bp = Blueprint('image_transformations', __name__)
 
 # Importar Database
 from database import Database
+from transformation_cache import transformation_cache
+from logger import get_logger
 db = Database()
+log = get_logger('IMAGE_TRANSFORMATIONS')
 
 @image_transformations_bp.route('', methods=['POST'])
 def add_transformation():
@@ -35,30 +38,19 @@ def add_transformation():
         if not image_id or not transformation_name:
             return jsonify({'error': 'Faltan campos requeridos'}), 400
         
-        print(f"[IMAGE_TRANSFORMATIONS] Registrando {transformation_name} para imagen {image_id}")
-        
         # Convertir parameters a JSON string
         if isinstance(parameters, dict):
             parameters_json = json.dumps(parameters)
         else:
             parameters_json = str(parameters)
         
-        # ⭐ BUSCAR transformation_id A PARTIR DEL NOMBRE
-        lookup_query = """
-            SELECT transformation_id 
-            FROM transformations 
-            WHERE name = %s AND is_active = 1
-        """
-        
-        rows = db.execute_query(lookup_query, (transformation_name,))
+        # ⭐ BUSCAR transformation_id A PARTIR DEL NOMBRE (catálogo en caché)
+        transformation_id = transformation_cache.get_id(transformation_name, active_only=True)
         
-        if not rows:
-            print(f"[IMAGE_TRANSFORMATIONS] ✗ Transformación '{transformation_name}' no encontrada")
+        if not transformation_id:
+            log.warning("✗ Transformación '%s' no encontrada (imagen %s)", transformation_name, image_id)
             return jsonify({'error': f'Transformación {transformation_name} no existe'}), 400
         
-        transformation_id = rows[0]['transformation_id']
-        print(f"[IMAGE_TRANSFORMATIONS] → Mapeado: {transformation_name} → ID {transformation_id}")
-        
         # INSERCIÓN CON transformation_id
         query = """
             INSERT INTO image_transformations 
@@ -72,19 +64,17 @@ def add_transformation():
         )
         
         if result:
-            print(f"[IMAGE_TRANSFORMATIONS] ✓ Transformación registrada: ID {result}")
+            log.debug("✓ %s registrada para imagen %s: ID %s", transformation_name, image_id, result)
             return jsonify({
                 'success': True,
                 'image_transformation_id': result
             }), 201
         else:
-            print(f"[IMAGE_TRANSFORMATIONS] ✗ Error al insertar")
+            log.error("✗ Error al insertar %s para imagen %s", transformation_name, image_id)
             return jsonify({'error': 'Error al registrar transformación'}), 500
             
     except Exception as e:
-        print(f"[IMAGE_TRANSFORMATIONS] ✗ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("✗ Error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @image_transformations_bp.route('/image/<int:image_id>', methods=['GET'])
@@ -131,9 +121,7 @@ def get_image_transformations(image_id):
         return jsonify(transformations), 200
         
     except Exception as e:
-        print(f"[IMAGE_TRANSFORMATIONS] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @image_transformations_bp.route('/batch/<int:batch_id>', methods=['GET'])
@@ -181,7 +169,5 @@ def get_batch_transformations(batch_id):
         return jsonify(transformations), 200
         
     except Exception as e:
-        print(f"[IMAGE_TRANSFORMATIONS] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error: %s", e)
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
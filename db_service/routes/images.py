@@ -1,13 +1,25 @@
 # Archivo: db_service/routes/images.py
 # ENDPOINTS REST PARA GESTIÓN DE IMÁGENES
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file, redirect
+from config import Config
 from database import Database
 from models import Image, ProcessedResult
+from transformation_cache import transformation_cache
+from result_files import result_files
+from streaming import stream_rows, keyset_select
+from batch_counters import CounterDeltas
+from batch_metrics import MetricsDeltas
+from logger import get_logger
 import json
+import os
 
 images_bp = Blueprint('images', __name__)
 db = Database()
+log = get_logger('IMAGES')
+
+# Filas por sentencia INSERT en los endpoints de ingesta en bloque
+RESULTS_INSERT_CHUNK = 500
 
 @images_bp.route('', methods=['POST'])
 def create_image():
@@ -46,13 +58,10 @@ def create_image():
         
         image_id = db.execute_update(query, params)
         
-        # Actualizar contador de imágenes en el lote
-        update_query = """
-            UPDATE batch_requests 
-            SET total_images = total_images + 1 
-            WHERE batch_id = %s
-        """
-        db.execute_update(update_query, (data['batch_id'],))
+        # Actualizar contador de imágenes en el lote (incremento atómico)
+        counters = CounterDeltas()
+        counters.add(data['batch_id'], total=1)
+        db.execute_transaction(counters.statements())
         
         return jsonify({
             'success': True,
@@ -130,7 +139,7 @@ def add_transformations(image_id):
 @images_bp.route('', methods=['GET'])
 def get_images():
     """
-    GET /api/images?batch_id={batch_id}
+    GET /api/images?batch_id={batch_id}[&after_id=&limit=&format=ndjson]
     Obtener imágenes de un lote con sus tiempos de procesamiento
     """
     try:
@@ -139,7 +148,8 @@ def get_images():
         if not batch_id:
             return jsonify({'error': 'batch_id es requerido'}), 400
         
-        query = """
+        query, params = keyset_select(
+            """
             SELECT 
                 i.image_id,
                 i.original_filename,
@@ -148,24 +158,23 @@ def get_images():
                 pr.result_filename
             FROM images i
             LEFT JOIN processed_results pr ON i.image_id = pr.image_id
-            WHERE i.batch_id = %s
-            ORDER BY i.image_id
-        """
-        
-        rows = db.execute_query(query, (batch_id,))
-        
-        images = []
-        for row in rows:
-            images.append({
-                'image_id': row['image_id'],
-                'original_filename': row['original_filename'],
-                'status': row['status'],
-                'processing_time_ms': row.get('processing_time_ms', 0),
-                'result_filename': row.get('result_filename', '')
-            })
-        
-        return jsonify(images), 200
+            """,
+            ["i.batch_id = %s"], (batch_id,),
+            id_column='i.image_id',
+            order_by='i.image_id'
+        )
         
+        # Lotes grandes: las filas se leen y se envían de a bloques
+        return stream_rows(db.iter_query(query, params), lambda row: {
+            'image_id': row['image_id'],
+            'original_filename': row['original_filename'],
+            'status': row['status'],
+            'processing_time_ms': row.get('processing_time_ms', 0),
+            'result_filename': row.get('result_filename', '')
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -202,10 +211,11 @@ def add_result(image_id):
         if missing_fields:
             return jsonify({'error': f'Faltan campos requeridos: {", ".join(missing_fields)}'}), 400
         
-        # Validar que image_id existe
-        image_check = "SELECT image_id FROM images WHERE image_id = %s"
-        image_exists = db.execute_query(image_check, (image_id,))
-        if not image_exists:
+        # Validar que image_id existe (y obtener lote y tamaño para las métricas)
+        image_rows = db.execute_query(
+            "SELECT batch_id, file_size FROM images WHERE image_id = %s", (image_id,)
+        )
+        if not image_rows:
             return jsonify({'error': f'image_id {image_id} no existe'}), 404
         
         # Validar que node_id existe
@@ -234,21 +244,38 @@ def add_result(image_id):
             data.get('error_message', '')
         )
         
-        result_id = db.execute_update(query, params)
-        
-        # Actualizar contador de imágenes procesadas en el lote
-        if data.get('status') == 'success':
-            # Obtener batch_id de la imagen
-            batch_query = "SELECT batch_id FROM images WHERE image_id = %s"
-            batch_rows = db.execute_query(batch_query, (image_id,))
-            if batch_rows:
-                batch_id = batch_rows[0]['batch_id']
-                update_query = """
-                    UPDATE batch_requests 
-                    SET processed_images = processed_images + 1 
-                    WHERE batch_id = %s
-                """
-                db.execute_update(update_query, (batch_id,))
+        # Resultado, contadores y métricas del lote en la misma transacción
+        batch_id = image_rows[0]['batch_id']
+        status = data.get('status', 'success')
+        counters = CounterDeltas()
+        counters.add_result(
+            batch_id, status,
+            file_size=data.get('file_size'),
+            processing_time_ms=data.get('processing_time_ms', 0)
+        )
+        metrics = MetricsDeltas()
+        metrics.add_result(
+            batch_id, data['node_id'], status,
+            processing_time_ms=data.get('processing_time_ms', 0),
+            bytes_in=image_rows[0]['file_size'],
+            bytes_out=data.get('file_size')
+        )
+        
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        try:
+            conn.start_transaction()
+            cursor.execute(query, params)
+            result_id = cursor.lastrowid
+            counters.apply(cursor)
+            metrics.apply(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
         
         return jsonify({
             'success': True,
@@ -256,14 +283,10 @@ def add_result(image_id):
         }), 201
         
     except KeyError as e:
-        print(f"[IMAGES] Error: Campo faltante - {e}")
-        import traceback
-        traceback.print_exc()
+        log.warning("Registro de resultado: campo faltante %s", e)
         return jsonify({'error': f'Campo requerido faltante: {str(e)}'}), 400
     except Exception as e:
-        print(f"[IMAGES] Error al registrar resultado: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error al registrar resultado: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @images_bp.route('/batch/<int:batch_id>', methods=['GET'])
@@ -282,6 +305,59 @@ def get_batch_images(batch_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@images_bp.route('/<int:image_id>/result/file', methods=['GET'])
+def get_result_file(image_id):
+    """
+    GET /api/images/{image_id}/result/file[?download=1]
+    Descargar la imagen procesada de una sola imagen
+    
+    Soporta GET condicional (ETag = SHA-256 del contenido, If-None-Match)
+    y rangos de bytes (Range / If-Range). La ruta sale de una sola
+    consulta por índice sobre processed_results(image_id, status).
+    """
+    try:
+        rows = db.execute_query("""
+            SELECT result_filename, storage_path
+            FROM processed_results
+            WHERE image_id = %s AND status = 'success'
+            ORDER BY result_id DESC
+            LIMIT 1
+        """, (image_id,))
+        
+        if not rows:
+            return jsonify({'error': 'La imagen no tiene resultado procesado'}), 404
+        
+        try:
+            file_path = result_files.resolve(rows[0]['storage_path'])
+        except ValueError:
+            return jsonify({'error': 'storage_path inválido'}), 400
+        
+        # Almacenamiento remoto (S3): el cliente descarga directo con URL firmada
+        if file_path is None:
+            return redirect(result_files.storage.presigned_url(rows[0]['storage_path']))
+        
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return jsonify({'error': 'Archivo de resultado no encontrado en disco'}), 404
+        
+        response = send_file(
+            file_path,
+            as_attachment=request.args.get('download') == '1',
+            download_name=rows[0]['result_filename'],
+            conditional=True,
+            etag=result_files.content_hash(file_path, stat),
+            max_age=Config.RESULT_CACHE_MAX_AGE
+        )
+        # El resultado de una imagen no cambia una vez escrito
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Archivo: db_service/routes/images.py
 # Al final del archivo, agregar:
 
@@ -314,6 +390,10 @@ def create_images_batch():
     POST /api/images/batch
     Registrar múltiples imágenes con sus transformaciones en una sola llamada (OPTIMIZADO)
     
+    Imágenes y transformaciones se insertan con INSERT multi-fila y los nombres
+    de transformación se resuelven contra el catálogo en caché, así la cantidad
+    de sentencias no crece con el número de imágenes.
+    
     Body:
         {
             "batch_id": int,
@@ -346,66 +426,88 @@ def create_images_batch():
         batch_id = data['batch_id']
         images = data['images']
         
-        image_ids = []
-        total_transformations = 0
+        if not images:
+            return jsonify({
+                'success': True,
+                'images_created': 0,
+                'transformations_created': 0,
+                'image_ids': []
+            }), 201
+        
+        # Resolver todos los nombres de transformación contra el catálogo en caché
+        trans_ids = transformation_cache.get_ids(
+            trans['name']
+            for img in images
+            for trans in img.get('transformations', [])
+        )
         
         conn = db.get_connection()
         cursor = conn.cursor()
         
         try:
-            # Insertar cada imagen con sus transformaciones
-            for img in images:
-                # 1. Insertar imagen
-                img_query = """
+            conn.start_transaction()
+            
+            # 1. INSERT MULTI-FILA DE IMÁGENES
+            first_id = None
+            for offset in range(0, len(images), RESULTS_INSERT_CHUNK):
+                chunk = images[offset:offset + RESULTS_INSERT_CHUNK]
+                params = []
+                for img in chunk:
+                    params.extend((
+                        batch_id,
+                        img['original_filename'],
+                        img['storage_path'],
+                        img.get('file_size')
+                    ))
+                
+                cursor.execute(f"""
                     INSERT INTO images 
                     (batch_id, original_filename, storage_path, file_size)
-                    VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(img_query, (
-                    batch_id,
-                    img['original_filename'],
-                    img['storage_path'],
-                    img.get('file_size')
-                ))
-                
-                image_id = cursor.lastrowid
-                image_ids.append(image_id)
+                    VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))}
+                """, tuple(params))
                 
-                # 2. Insertar transformaciones de esta imagen
-                transformations = img.get('transformations', [])
-                for trans in transformations:
-                    # Buscar transformation_id por nombre
-                    trans_id_query = "SELECT transformation_id FROM transformations WHERE name = %s"
-                    cursor.execute(trans_id_query, (trans['name'],))
-                    trans_result = cursor.fetchone()
-                    
-                    if trans_result:
-                        trans_id = trans_result[0]
-                        
-                        # Insertar en image_transformations
-                        it_query = """
-                            INSERT INTO image_transformations
-                            (image_id, transformation_id, parameters, execution_order, status)
-                            VALUES (%s, %s, %s, %s, 'pending')
-                        """
-                        cursor.execute(it_query, (
+                if first_id is None:
+                    first_id = cursor.lastrowid
+            
+            # 2. RECUPERAR LOS image_id GENERADOS (1 query, mapeados por storage_path
+            #    para no depender de que el auto-increment sea consecutivo)
+            cursor.execute("""
+                SELECT image_id, storage_path FROM images
+                WHERE batch_id = %s AND image_id >= %s
+                ORDER BY image_id
+            """, (batch_id, first_id))
+            
+            ids_by_path = {}
+            for image_id, storage_path in cursor.fetchall():
+                ids_by_path.setdefault(storage_path, []).append(image_id)
+            
+            image_ids = [ids_by_path[img['storage_path']].pop(0) for img in images]
+            
+            # 3. INSERT MULTI-FILA DE TRANSFORMACIONES
+            trans_rows = []
+            for image_id, img in zip(image_ids, images):
+                for trans in img.get('transformations', []):
+                    trans_id = trans_ids.get(trans['name'])
+                    if trans_id:
+                        trans_rows.append((
                             image_id,
                             trans_id,
                             json.dumps(trans.get('parameters', {})),
                             trans.get('execution_order', 1)
                         ))
-                        total_transformations += 1
             
-            # 3. Actualizar contador en batch (sin usar +=)
-            # 3. Actualizar contador en batch_requests (sin usar +=)
-            cursor.execute("SELECT total_images FROM batch_requests WHERE batch_id = %s", (batch_id,))
-            current_total = cursor.fetchone()
-            new_total = (current_total[0] if current_total else 0) + len(images)
+            for offset in range(0, len(trans_rows), RESULTS_INSERT_CHUNK):
+                chunk = trans_rows[offset:offset + RESULTS_INSERT_CHUNK]
+                cursor.execute(f"""
+                    INSERT INTO image_transformations
+                    (image_id, transformation_id, parameters, execution_order, status)
+                    VALUES {', '.join(["(%s, %s, %s, %s, 'pending')"] * len(chunk))}
+                """, tuple(value for row in chunk for value in row))
             
-            cursor.execute(
-                "UPDATE batch_requests SET total_images = %s WHERE batch_id = %s",
-                (new_total, batch_id)
-            )
+            # 4. CONTADOR DEL LOTE (incremento atómico, sin leer antes)
+            counters = CounterDeltas()
+            counters.add(batch_id, total=len(images))
+            counters.apply(cursor)
             
             # Commit de toda la transacción
             conn.commit()
@@ -413,15 +515,13 @@ def create_images_batch():
             return jsonify({
                 'success': True,
                 'images_created': len(images),
-                'transformations_created': total_transformations,
+                'transformations_created': len(trans_rows),
                 'image_ids': image_ids
             }), 201
             
         except Exception as e:
             conn.rollback()
-            print(f"[DB] Error en batch insert: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error en batch insert: %s", e)
             raise e
             
         finally:
@@ -429,7 +529,191 @@ def create_images_batch():
             conn.close()
         
     except Exception as e:
-        print(f"[API] Error en create_images_batch: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        log.exception("Error en create_images_batch: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@images_bp.route('/results/batch', methods=['POST'])
+def add_results_batch():
+    """
+    POST /api/images/results/batch
+    Registrar N resultados procesados en una sola transacción (SET-BASED)
+    
+    En lugar de 5 queries por resultado (2 SELECT de validación, INSERT,
+    SELECT de batch_id y UPDATE del contador) se ejecutan:
+        1. Un SELECT que valida todos los image_id/node_id a la vez
+        2. Un INSERT multi-fila en processed_results
+        3. Un UPDATE de processed_at para las imágenes marcadas
+        4. Un UPDATE agrupado de los contadores por lote y dos upserts de
+           métricas (por nodo e histograma de latencia)
+    
+    Body:
+        {
+            "results": [
+                {
+                    "image_id": int,
+                    "node_id": int,
+                    "result_filename": str,
+                    "storage_path": str,
+                    "processing_time_ms": int,
+                    "status": str,
+                    "error_message": str,
+                    "mark_processed": bool
+                }
+            ]
+        }
+    
+    Returns:
+        {
+            "success": True,
+            "inserted": int,
+            "rejected": [{"index": int, "image_id": int, "error": str}]
+        }
+        
+        index es la posición del resultado en el body (el write-behind del
+        servidor reintenta solo esas filas).
+    """
+    try:
+        data = request.get_json()
+        results = (data or {}).get('results')
+        
+        if not isinstance(results, list):
+            return jsonify({'error': 'results debe ser un array'}), 400
+        
+        rejected = []
+        candidates = []  # (posición en el body, resultado)
+        for index, res in enumerate(results):
+            if not isinstance(res, dict) or not res.get('image_id') or not res.get('node_id'):
+                rejected.append({
+                    'index': index,
+                    'image_id': res.get('image_id') if isinstance(res, dict) else None,
+                    'error': 'image_id y node_id son requeridos'
+                })
+            else:
+                candidates.append((index, res))
+        
+        if not candidates:
+            return jsonify({'success': True, 'inserted': 0, 'rejected': rejected}), 201
+        
+        image_ids = sorted({res['image_id'] for _, res in candidates})
+        node_ids = sorted({res['node_id'] for _, res in candidates})
+        
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            conn.start_transaction()
+            
+            # 1. VALIDACIÓN SET-BASED: una sola query para imágenes y nodos
+            cursor.execute(f"""
+                SELECT 'image', image_id, batch_id, file_size FROM images
+                WHERE image_id IN ({_placeholders(len(image_ids))})
+                UNION ALL
+                SELECT 'node', node_id, NULL, NULL FROM processing_nodes
+                WHERE node_id IN ({_placeholders(len(node_ids))})
+            """, tuple(image_ids) + tuple(node_ids))
+            
+            image_batches = {}
+            image_sizes = {}
+            known_nodes = set()
+            for kind, ref_id, batch_id, file_size in cursor.fetchall():
+                if kind == 'image':
+                    image_batches[ref_id] = batch_id
+                    image_sizes[ref_id] = file_size
+                else:
+                    known_nodes.add(ref_id)
+            
+            valid = []
+            for index, res in candidates:
+                if res['image_id'] not in image_batches:
+                    rejected.append({'index': index, 'image_id': res['image_id'],
+                                     'error': f'image_id {res["image_id"]} no existe'})
+                elif res['node_id'] not in known_nodes:
+                    rejected.append({'index': index, 'image_id': res['image_id'],
+                                     'error': f'node_id {res["node_id"]} no existe'})
+                else:
+                    valid.append(res)
+            
+            if valid:
+                # 2. INSERT MULTI-FILA (en tramos para no exceder max_allowed_packet)
+                for offset in range(0, len(valid), RESULTS_INSERT_CHUNK):
+                    chunk = valid[offset:offset + RESULTS_INSERT_CHUNK]
+                    params = []
+                    for res in chunk:
+                        params.extend((
+                            res['image_id'],
+                            res['node_id'],
+                            res.get('result_filename', ''),
+                            res.get('storage_path', ''),
+                            res.get('file_size'),
+                            res.get('width'),
+                            res.get('height'),
+                            res.get('format'),
+                            res.get('processing_time_ms', 0),
+                            res.get('status', 'success'),
+                            res.get('error_message', '')
+                        ))
+                    
+                    values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(chunk))
+                    cursor.execute(f"""
+                        INSERT INTO processed_results 
+                        (image_id, node_id, result_filename, storage_path, file_size, 
+                         width, height, format, processing_time_ms, status, error_message)
+                        VALUES {values}
+                    """, tuple(params))
+                
+                # 3. MARCAR IMÁGENES PROCESADAS
+                processed_ids = sorted({res['image_id'] for res in valid if res.get('mark_processed')})
+                if processed_ids:
+                    cursor.execute(f"""
+                        UPDATE images SET processed_at = CURRENT_TIMESTAMP
+                        WHERE image_id IN ({_placeholders(len(processed_ids))})
+                    """, tuple(processed_ids))
+                
+                # 4. CONTADORES AGRUPADOS POR LOTE (exitosos, fallidos, bytes, tiempo)
+                #    Y MÉTRICAS POR NODO / HISTOGRAMA DE LATENCIA
+                counters = CounterDeltas()
+                metrics = MetricsDeltas()
+                for res in valid:
+                    batch_id = image_batches[res['image_id']]
+                    status = res.get('status', 'success')
+                    counters.add_result(
+                        batch_id, status,
+                        file_size=res.get('file_size'),
+                        processing_time_ms=res.get('processing_time_ms', 0)
+                    )
+                    metrics.add_result(
+                        batch_id, res['node_id'], status,
+                        processing_time_ms=res.get('processing_time_ms', 0),
+                        bytes_in=image_sizes[res['image_id']],
+                        bytes_out=res.get('file_size')
+                    )
+                counters.apply(cursor)
+                metrics.apply(cursor)
+            
+            conn.commit()
+            
+        except Exception:
+            conn.rollback()
+            raise
+            
+        finally:
+            cursor.close()
+            conn.close()
+        
+        if rejected:
+            log.warning("Bloque de resultados: %d rechazados", len(rejected))
+        
+        return jsonify({
+            'success': True,
+            'inserted': len(valid),
+            'rejected': rejected
+        }), 201
+        
+    except Exception as e:
+        log.exception("Error al registrar bloque de resultados: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+def _placeholders(count):
+    """Genera '%s, %s, ...' para cláusulas IN / VALUES"""
+    return ', '.join(['%s'] * count)
@@ -1,11 +1,64 @@
 # Archivo: db_service/routes/logs.py
 # ENDPOINTS REST PARA LOGS
 
+import threading
+from collections import OrderedDict
 from flask import Blueprint, request, jsonify
 from database import Database
+from streaming import stream_rows, keyset_select
+from logger import get_logger
 
 logs_bp = Blueprint('logs', __name__)
 db = Database()
+log = get_logger('LOGS')
+
+LOGS_INSERT_CHUNK = 500     # Filas por INSERT multi-fila
+
+# Referencias de un log: (posición en la fila, tabla, columna)
+LOG_REFS = (
+    (0, 'processing_nodes', 'node_id'),
+    (1, 'batch_requests', 'batch_id'),
+    (2, 'images', 'image_id')
+)
+
+class KnownRefs:
+    """
+    ids que ya se vieron existir, por tabla (LRU acotado)
+
+    execution_logs no tiene foreign keys desde que está particionada
+    (migración 002): las referencias se verifican al insertar y este LRU
+    evita repetir la consulta para los nodos, lotes e imágenes que siguen
+    mandando logs. Un id borrado después de verse puede quedar en un log
+    hasta que salga del LRU (las lecturas usan LEFT JOIN).
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._ids = {}              # tabla -> OrderedDict(id -> None)
+        self._lock = threading.Lock()
+
+    def unknown(self, table, ids):
+        """Los ids que todavía no se vieron existir"""
+        with self._lock:
+            known = self._ids.setdefault(table, OrderedDict())
+            missing = set()
+            for value in ids:
+                if value in known:
+                    known.move_to_end(value)
+                else:
+                    missing.add(value)
+            return missing
+
+    def add(self, table, ids):
+        with self._lock:
+            known = self._ids.setdefault(table, OrderedDict())
+            for value in ids:
+                known[value] = None
+                known.move_to_end(value)
+            while len(known) > self.max_entries:
+                known.popitem(last=False)
+
+known_refs = KnownRefs()
 
 @logs_bp.route('', methods=['POST'])
 def create_log():
@@ -29,84 +82,183 @@ def create_log():
         if not data or not data.get('message'):
             return jsonify({'error': 'message es requerido'}), 400
         
-        # Validar que node_id existe si se proporciona
-        if data.get('node_id'):
-            check_query = "SELECT node_id FROM processing_nodes WHERE node_id = %s"
-            node_exists = db.execute_query(check_query, (data.get('node_id'),))
-            if not node_exists:
-                print(f"[LOGS] ⚠️ node_id {data.get('node_id')} no existe, guardando como NULL")
-                data['node_id'] = None
-        
-        # Validar que batch_id existe si se proporciona
-        if data.get('batch_id'):
-            check_query = "SELECT batch_id FROM batch_requests WHERE batch_id = %s"
-            batch_exists = db.execute_query(check_query, (data.get('batch_id'),))
-            if not batch_exists:
-                print(f"[LOGS] ⚠️ batch_id {data.get('batch_id')} no existe, guardando como NULL")
-                data['batch_id'] = None
-        
-        # Validar que image_id existe si se proporciona
-        if data.get('image_id'):
-            check_query = "SELECT image_id FROM images WHERE image_id = %s"
-            image_exists = db.execute_query(check_query, (data.get('image_id'),))
-            if not image_exists:
-                print(f"[LOGS] ⚠️ image_id {data.get('image_id')} no existe, guardando como NULL")
-                data['image_id'] = None
+        _, log_id, nulled = _insert_logs([_log_row(data)])
         
-        query = """
-            INSERT INTO execution_logs 
-            (node_id, batch_id, image_id, log_level, message)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        params = (
-            data.get('node_id'),
-            data.get('batch_id'),
-            data.get('image_id'),
-            data.get('log_level', 'info'),
-            data['message']
-        )
+        return jsonify({
+            'success': True,
+            'log_id': log_id,
+            'nulled_refs': nulled
+        }), 201
         
-        log_id = db.execute_update(query, params)
+    except Exception as e:
+        log.exception("Error: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@logs_bp.route('/batch', methods=['POST'])
+def create_logs_batch():
+    """
+    POST /api/logs/batch
+    Crear varios logs con un INSERT multi-fila (sumidero de logs del servidor)
+    
+    Body:
+        {
+            "logs": [
+                {
+                    "batch_id": int (opcional),
+                    "image_id": int (opcional),
+                    "node_id": int (opcional),
+                    "log_level": str,
+                    "message": str
+                }
+            ]
+        }
+    """
+    try:
+        data = request.get_json()
+        logs = (data or {}).get('logs')
+        
+        if not isinstance(logs, list):
+            return jsonify({'error': 'logs debe ser un array'}), 400
+        
+        rows = [_log_row(log) for log in logs if isinstance(log, dict) and log.get('message')]
+        if not rows:
+            return jsonify({'success': True, 'inserted': 0}), 201
+        
+        inserted, _, nulled = _insert_logs(rows)
         
         return jsonify({
             'success': True,
-            'log_id': log_id
+            'inserted': inserted,
+            'nulled_refs': nulled
         }), 201
         
     except Exception as e:
-        print(f"[LOGS] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error en bloque de logs: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def _log_row(log):
+    """Convertir un log del body en la fila (node_id, batch_id, image_id, log_level, message)"""
+    return [
+        _ref_id(log.get('node_id')),
+        _ref_id(log.get('batch_id')),
+        _ref_id(log.get('image_id')),
+        log.get('log_level', 'info'),
+        log['message']
+    ]
+
+def _ref_id(value):
+    """id de una referencia como int (None si falta o no es un entero)"""
+    try:
+        return int(value) or None
+    except (TypeError, ValueError):
+        return None
+
+def _insert_logs(rows):
+    """
+    Insertar logs con INSERT multi-fila
+    
+    Antes se verifican las referencias a nodos, lotes e imágenes (una
+    consulta por tabla, solo para los ids que known_refs no conoce): las
+    inexistentes quedan en NULL, mismo criterio que antes de particionar.
+    
+    Returns:
+        tuple: (filas insertadas, log_id o None, referencias anuladas)
+        
+        El log_id solo se conoce cuando el último INSERT fue de una fila
+        (POST /api/logs): con innodb_autoinc_lock_mode=2 los ids de un INSERT
+        multi-fila pueden no ser consecutivos, así que no se derivan de
+        lastrowid.
+    """
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        nulled = _null_missing_refs(cursor, rows)
+        if nulled:
+            log.warning("⚠️ %d referencias inexistentes guardadas como NULL", nulled)
+        
+        inserted, last_id = _insert_rows(cursor, rows)
+        conn.commit()
+        return inserted, last_id, nulled
+        
+    except Exception:
+        conn.rollback()
+        raise
+        
+    finally:
+        cursor.close()
+        conn.close()
+
+def _insert_rows(cursor, rows):
+    """INSERT multi-fila por bloques; retorna (filas insertadas, log_id o None)"""
+    inserted = 0
+    last_id = None
+    for offset in range(0, len(rows), LOGS_INSERT_CHUNK):
+        chunk = rows[offset:offset + LOGS_INSERT_CHUNK]
+        values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(chunk))
+        cursor.execute(f"""
+            INSERT INTO execution_logs 
+            (node_id, batch_id, image_id, log_level, message)
+            VALUES {values}
+        """, [value for row in chunk for value in row])
+        inserted += len(chunk)
+        if len(chunk) == 1:
+            last_id = cursor.lastrowid
+    return inserted, last_id
+
+def _null_missing_refs(cursor, rows):
+    """Poner en NULL las referencias que no existen (una consulta por tabla con ids nuevos)"""
+    nulled = 0
+    for position, table, column in LOG_REFS:
+        wanted = known_refs.unknown(table, {row[position] for row in rows if row[position] is not None})
+        if not wanted:
+            continue
+        
+        cursor.execute(
+            f"SELECT {column} FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(wanted))})",
+            sorted(wanted)
+        )
+        existing = {found[0] for found in cursor.fetchall()}
+        known_refs.add(table, existing)
+        
+        for row in rows:
+            if row[position] in wanted and row[position] not in existing:
+                row[position] = None
+                nulled += 1
+    return nulled
+
+def _log_dict(row):
+    """Fila de execution_logs -> dict de respuesta"""
+    return {
+        'log_id': row['log_id'],
+        'node_id': row['node_id'],
+        'batch_id': row['batch_id'],
+        'image_id': row['image_id'],
+        'log_level': row['log_level'],
+        'message': row['message'],
+        'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None
+    }
+
 @logs_bp.route('/batch/<int:batch_id>', methods=['GET'])
 def get_batch_logs(batch_id):
     """
-    GET /api/logs/batch/{batch_id}
+    GET /api/logs/batch/{batch_id}[?after_id=&limit=&format=ndjson]
     Obtener logs de un lote
+    
+    Paginación por clave: ?after_id=0&limit=1000, luego after_id = último log_id
     """
     try:
-        query = """
-            SELECT * FROM execution_logs 
-            WHERE batch_id = %s 
-            ORDER BY timestamp DESC
-        """
-        rows = db.execute_query(query, (batch_id,))
-        
-        logs = []
-        for row in rows:
-            logs.append({
-                'log_id': row['log_id'],
-                'node_id': row['node_id'],
-                'batch_id': row['batch_id'],
-                'image_id': row['image_id'],
-                'log_level': row['log_level'],
-                'message': row['message'],
-                'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None
-            })
-        
-        return jsonify(logs), 200
+        query, params = keyset_select(
+            "SELECT * FROM execution_logs",
+            ["batch_id = %s"], (batch_id,),
+            id_column='log_id',
+            order_by='timestamp DESC'
+        )
+        # Un lote puede tener cientos de miles de logs: se envían en streaming
+        return stream_rows(db.iter_query(query, params), _log_dict)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -124,17 +276,7 @@ def get_image_logs(image_id):
         """
         rows = db.execute_query(query, (image_id,))
         
-        logs = []
-        for row in rows:
-            logs.append({
-                'log_id': row['log_id'],
-                'node_id': row['node_id'],
-                'batch_id': row['batch_id'],
-                'image_id': row['image_id'],
-                'log_level': row['log_level'],
-                'message': row['message'],
-                'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None
-            })
+        logs = [_log_dict(row) for row in rows]
         
         return jsonify(logs), 200
         
@@ -156,17 +298,7 @@ def get_node_logs(node_id):
         """
         rows = db.execute_query(query, (node_id,))
         
-        logs = []
-        for row in rows:
-            logs.append({
-                'log_id': row['log_id'],
-                'node_id': row['node_id'],
-                'batch_id': row['batch_id'],
-                'image_id': row['image_id'],
-                'log_level': row['log_level'],
-                'message': row['message'],
-                'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None
-            })
+        logs = [_log_dict(row) for row in rows]
         
         return jsonify(logs), 200
         
@@ -176,34 +308,23 @@ def get_node_logs(node_id):
 @logs_bp.route('/recent', methods=['GET'])
 def get_recent_logs():
     """
-    GET /api/logs/recent?limit=50
+    GET /api/logs/recent?limit=50[&after_id=&format=ndjson]
     Obtener logs recientes
+    
+    Con ?after_id retorna los logs posteriores a ese log_id (seguimiento en vivo)
     """
     try:
-        limit = int(request.args.get('limit', 50))
-        if limit > 500:
-            limit = 500
-        
-        query = """
-            SELECT * FROM execution_logs 
-            ORDER BY timestamp DESC
-            LIMIT %s
-        """
-        rows = db.execute_query(query, (limit,))
-        
-        logs = []
-        for row in rows:
-            logs.append({
-                'log_id': row['log_id'],
-                'node_id': row['node_id'],
-                'batch_id': row['batch_id'],
-                'image_id': row['image_id'],
-                'log_level': row['log_level'],
-                'message': row['message'],
-                'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None
-            })
-        
-        return jsonify(logs), 200
+        query, params = keyset_select(
+            "SELECT * FROM execution_logs",
+            [], (),
+            id_column='log_id',
+            order_by='timestamp DESC',
+            default_limit=50,
+            max_limit=500
+        )
+        return stream_rows(db.iter_query(query, params), _log_dict)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
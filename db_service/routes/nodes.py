@@ -4,23 +4,31 @@
 from flask import Blueprint, request, jsonify
 from database import Database
 from models import ProcessingNode
+from streaming import stream_rows, keyset_select
+from heartbeat_aggregator import heartbeat_aggregator
+from logger import get_logger
 
 nodes_bp = Blueprint('nodes', __name__)
 db = Database()
+log = get_logger('HEARTBEAT')
 
 @nodes_bp.route('', methods=['GET'])
 def get_all_nodes():
     """
-    GET /api/nodes
+    GET /api/nodes[?after_id=&limit=&format=ndjson]
     Obtener todos los nodos registrados
     """
     try:
-        query = "SELECT * FROM processing_nodes ORDER BY node_id"
-        rows = db.execute_query(query)
-        
-        nodes = [ProcessingNode.to_dict(row) for row in rows]
-        return jsonify(nodes), 200
+        query, params = keyset_select(
+            "SELECT * FROM processing_nodes",
+            [], (),
+            id_column='node_id',
+            order_by='node_id'
+        )
+        return stream_rows(db.iter_query(query, params), ProcessingNode.to_dict)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -46,93 +54,80 @@ def update_heartbeat(node_id):
     PUT /api/nodes/{node_id}/heartbeat
     Actualizar heartbeat de un nodo (con auto-registro)
     
+    El heartbeat se junta en memoria y se escribe en el próximo flush del
+    agregador (un upsert multi-fila para todos los nodos).
+    
     Body (opcional):
         {
             "ip_address": str,
             "port": int,
             "status": str,
             "cpu_cores": int,
-            "ram_gb": int
+            "ram_gb": int,
+            "current_load": int
         }
     """
     try:
         data = request.get_json() if request.is_json else {}
+        heartbeat_aggregator.record(node_id, data)
         
-        print(f"[HEARTBEAT] PUT recibido de nodo_id={node_id}")
+        return jsonify({
+            'success': True,
+            'message': 'Heartbeat registrado'
+        }), 202
         
-        # ⭐ VERIFICAR SI EL NODO EXISTE
-        check_query = "SELECT node_id FROM processing_nodes WHERE node_id = %s"
-        result = db.execute_query(check_query, (node_id,))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        log.error("Error: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@nodes_bp.route('/heartbeats', methods=['POST'])
+def record_heartbeats():
+    """
+    POST /api/nodes/heartbeats
+    Recibir uno o varios heartbeats en JSON compacto (sin SOAP)
+    
+    Body:
+        {"heartbeats": [{"node_id": int, "port": int, "cpu_cores": int, ...}]}
+        o un solo heartbeat {"node_id": int, ...}
+    
+    Returns:
+        {"success": True, "accepted": int, "rejected": [{"index": int, "node_id": ..., "error": str}]}
+    """
+    try:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict) and 'heartbeats' in data:
+            heartbeats = data['heartbeats']
+        else:
+            heartbeats = [data]
         
-        if not result or len(result) == 0:
-            # ⭐ NODO NO EXISTE - CREAR AUTOMÁTICAMENTE
-            print(f"[HEARTBEAT] Nodo {node_id} no existe, creando...")
-            
-            ip_address = data.get('ip_address', 'localhost')
-            port = data.get('port', 50050 + node_id)
-            cpu_cores = data.get('cpu_cores')
-            ram_gb = data.get('ram_gb')
-            
-            insert_query = """
-                INSERT INTO processing_nodes 
-                (node_id, node_name, ip_address, port, cpu_cores, ram_gb, status, last_heartbeat)
-                VALUES (%s, %s, %s, %s, %s, %s, 'active', NOW())
-            """
-            db.execute_update(
-                insert_query,
-                (node_id, f'Node-{node_id}', ip_address, port, cpu_cores, ram_gb)
-            )
-            
-            print(f"[HEARTBEAT] ✓ Nodo {node_id} creado exitosamente")
-            
-            return jsonify({
-                'success': True,
-                'message': 'Nodo registrado y heartbeat actualizado'
-            }), 201
+        if not isinstance(heartbeats, list):
+            return jsonify({'error': 'heartbeats debe ser un array'}), 400
         
-        else:
-            # ⭐ NODO EXISTE - ACTUALIZAR
-            print(f"[HEARTBEAT] Nodo {node_id} existe, actualizando heartbeat...")
-            
-            updates = ["last_heartbeat = NOW()", "status = 'active'"]
-            params = []
-            
-            if 'cpu_cores' in data:
-                updates.append("cpu_cores = %s")
-                params.append(data['cpu_cores'])
-            
-            if 'ram_gb' in data:
-                updates.append("ram_gb = %s")
-                params.append(data['ram_gb'])
-            
-            if 'current_load' in data:
-                updates.append("current_load = %s")
-                params.append(data['current_load'])
-            
-            if 'ip_address' in data:
-                updates.append("ip_address = %s")
-                params.append(data['ip_address'])
-            
-            if 'port' in data:
-                updates.append("port = %s")
-                params.append(data['port'])
-            
-            params.append(node_id)
-            
-            query = f"UPDATE processing_nodes SET {', '.join(updates)} WHERE node_id = %s"
-            db.execute_update(query, tuple(params))
-            
-            print(f"[HEARTBEAT] ✓ Nodo {node_id} actualizado")
-            
-            return jsonify({
-                'success': True,
-                'message': 'Heartbeat actualizado'
-            }), 200
+        accepted = 0
+        rejected = []
+        for index, heartbeat in enumerate(heartbeats):
+            try:
+                if not isinstance(heartbeat, dict) or heartbeat.get('node_id') is None:
+                    raise ValueError('node_id es requerido')
+                heartbeat_aggregator.record(heartbeat['node_id'], heartbeat)
+                accepted += 1
+            except (TypeError, ValueError) as e:
+                rejected.append({
+                    'index': index,
+                    'node_id': heartbeat.get('node_id') if isinstance(heartbeat, dict) else None,
+                    'error': str(e)
+                })
+        
+        return jsonify({
+            'success': True,
+            'accepted': accepted,
+            'rejected': rejected
+        }), 202
         
     except Exception as e:
-        print(f"[HEARTBEAT] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.error("Error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @nodes_bp.route('', methods=['POST'])
@@ -3,10 +3,12 @@
 
 from flask import Blueprint, request, jsonify
 from database import Database
-import bcrypt
+from auth_cache import auth_cache, AuthBusyError
+from logger import get_logger
 
 users_bp = Blueprint('users', __name__)
 db = Database()
+log = get_logger('USERS')
 
 @users_bp.route('/register', methods=['POST'])
 def register():
@@ -43,8 +45,8 @@ def register():
         if existing:
             return jsonify({'error': 'Usuario o email ya existe'}), 409
         
-        # Hashear contraseña con bcrypt
-        password_hash = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        # Hashear contraseña con bcrypt (pool acotado)
+        password_hash = auth_cache.hash_password(data['password'])
         
         # Insertar usuario
         insert_query = """
@@ -61,7 +63,7 @@ def register():
         
         user_id = db.execute_update(insert_query, params)
         
-        print(f"[USERS] Usuario registrado: {data['username']} (ID: {user_id})")
+        log.info("Usuario registrado: %s (ID: %s)", data['username'], user_id)
         
         return jsonify({
             'success': True,
@@ -69,8 +71,10 @@ def register():
             'message': 'Usuario registrado exitosamente'
         }), 201
         
+    except AuthBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
-        print(f"[USERS] Error en registro: {e}")
+        log.exception("Error en registro: %s", e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 @users_bp.route('/login', methods=['POST'])
@@ -116,15 +120,14 @@ def login():
         if not user['is_active']:
             return jsonify({'error': 'Usuario desactivado'}), 403
         
-        # Verificar contraseña
-        if not bcrypt.checkpw(data['password'].encode('utf-8'), user['password_hash'].encode('utf-8')):
+        # Verificar contraseña (caché de credenciales ya verificadas, si no bcrypt)
+        if not auth_cache.check_password(data['username'], data['password'], user['password_hash']):
             return jsonify({'error': 'Credenciales inválidas'}), 401
         
-        # Actualizar last_login
-        update_query = "UPDATE users SET last_login = NOW() WHERE user_id = %s"
-        db.execute_update(update_query, (user['user_id'],))
+        # Actualizar last_login (se escribe en bloque, en diferido)
+        auth_cache.record_login(user['user_id'])
         
-        print(f"[USERS] Login exitoso: {user['username']} (ID: {user['user_id']})")
+        log.info("Login exitoso: %s (ID: %s)", user['username'], user['user_id'])
         
         return jsonify({
             'success': True,
@@ -133,8 +136,10 @@ def login():
             'email': user['email']
         }), 200
         
+    except AuthBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
-        print(f"[USERS] Error en login: {e}")
+        log.exception("Error en login: %s", e)
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 @users_bp.route('/<int:user_id>', methods=['GET'])
@@ -1,3 +1,9 @@
+-- Esquema base. Las columnas y tablas posteriores (contadores de lote,
+-- métricas materializadas, telemetría de nodos, índices compuestos,
+-- particiones de logs) las agregan migrations/ con "python migrate.py up",
+-- que el Dockerfile del DB Service corre antes de arrancar; el servicio no
+-- arranca con migraciones pendientes.
+
 -- Crear la base de datos
 CREATE DATABASE IF NOT EXISTS image_processing_system CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
@@ -121,6 +127,8 @@ CREATE TABLE execution_logs (
 );
 
 -- Índices para mejorar el rendimiento
+-- (los compuestos y el particionado de execution_logs se aplican después con
+--  "python migrate.py up", ver migrations/)
 CREATE INDEX idx_batch_user ON batch_requests(user_id);
 CREATE INDEX idx_image_batch ON images(batch_id);
 CREATE INDEX idx_result_image ON processed_results(image_id);
@@ -0,0 +1,130 @@
+# Archivo: db_service/streaming.py
+# RESPUESTAS JSON / NDJSON EN STREAMING Y PAGINACIÓN POR CLAVE PARA LISTADOS GRANDES
+
+import json
+from flask import Response, request, stream_with_context
+
+# Bytes acumulados antes de enviar un bloque al cliente
+STREAM_CHUNK_SIZE = 64 * 1024
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Tope de filas por página con ?limit=
+MAX_PAGE_SIZE = 10000
+
+def _encode(item):
+    return json.dumps(item, separators=(',', ':'))
+
+def _stream(rows, to_dict, opening, separator, closing, empty, mimetype):
+    """
+    Serializar filas en bloques de ~STREAM_CHUNK_SIZE
+
+    La primera fila se lee y serializa antes de armar la respuesta, así un
+    error en la consulta todavía sale como 500 y no como un 200 cortado.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    first = _encode(to_dict(first)) if first is not None else None
+
+    def generate():
+        if first is None:
+            yield empty
+            return
+
+        parts = [opening, first]
+        size = 0
+        for row in rows:
+            item = _encode(to_dict(row))
+            parts.append(separator)
+            parts.append(item)
+            size += len(item) + len(separator)
+            if size >= STREAM_CHUNK_SIZE:
+                yield ''.join(parts)
+                parts = []
+                size = 0
+        parts.append(closing)
+        yield ''.join(parts)
+
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+def stream_json_array(rows, to_dict):
+    """
+    Responder un array JSON fila por fila (memoria constante)
+
+    Args:
+        rows: Iterable de filas (p. ej. Database.iter_query)
+        to_dict: Función fila -> dict serializable
+
+    Returns:
+        Response: application/json con transferencia por bloques
+    """
+    return _stream(rows, to_dict, '[', ',', ']', '[]', 'application/json')
+
+def stream_ndjson(rows, to_dict):
+    """Responder un objeto JSON por línea (application/x-ndjson)"""
+    return _stream(rows, to_dict, '', '\n', '\n', '', NDJSON_MIMETYPE)
+
+def wants_ndjson():
+    """El cliente pidió NDJSON (?format=ndjson o Accept: application/x-ndjson)"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+def stream_rows(rows, to_dict):
+    """Array JSON o NDJSON según lo que pida el cliente"""
+    if wants_ndjson():
+        return stream_ndjson(rows, to_dict)
+    return stream_json_array(rows, to_dict)
+
+def keyset_select(select_from, where, params, id_column, order_by,
+                  default_limit=None, max_limit=MAX_PAGE_SIZE):
+    """
+    Armar un SELECT con paginación por clave (?after_id=&limit=)
+
+    Sin ?after_id se mantiene el orden histórico del endpoint (order_by;
+    ?limit solo recorta). Con ?after_id se ordena por id_column ascendente
+    y se filtra id_column > after_id: cada página es un rango del índice,
+    sin OFFSET, igual de barata la primera que la última. Se empieza con
+    ?after_id=0 y se pide la siguiente página con el id de la última fila.
+
+    Args:
+        select_from: 'SELECT ... FROM ...'
+        where: Lista de condiciones (se unen con AND)
+        params: Parámetros de las condiciones
+        id_column: Columna de la clave (autoincremental)
+        order_by: Orden sin paginación (p. ej. 'timestamp DESC')
+        default_limit: LIMIT cuando no viene ?limit
+        max_limit: Tope de ?limit
+
+    Returns:
+        tuple: (query, params)
+
+    Raises:
+        ValueError: Si after_id o limit no son enteros válidos
+    """
+    after_id = request.args.get('after_id')
+    limit = request.args.get('limit')
+
+    after_id = int(after_id) if after_id is not None else None
+    limit = int(limit) if limit is not None else default_limit
+    if limit is not None and limit < 1:
+        raise ValueError('limit debe ser mayor que 0')
+
+    conditions = list(where)
+    params = list(params)
+
+    if after_id is not None:
+        conditions.append(f'{id_column} > %s')
+        params.append(after_id)
+
+    query = select_from
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += f' ORDER BY {id_column}' if after_id is not None else f' ORDER BY {order_by}'
+
+    if limit is not None:
+        query += ' LIMIT %s'
+        params.append(min(limit, max_limit))
+
+    return query, tuple(params)
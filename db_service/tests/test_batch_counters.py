@@ -0,0 +1,83 @@
+# Archivo: db_service/tests/test_batch_counters.py
+# PRUEBAS DE LOS INCREMENTOS DE CONTADORES POR LOTE (solo arman SQL, sin MySQL)
+#
+# Uso (desde db_service/):
+#   python -m pytest tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_counters
+from batch_counters import CounterDeltas
+
+class CounterDeltasTest(unittest.TestCase):
+
+    def test_empty_has_no_statements(self):
+        deltas = CounterDeltas()
+        deltas.add(7, total=0)
+
+        self.assertFalse(deltas)
+        self.assertEqual(deltas.statements(), [])
+
+    def test_unknown_counter_raises(self):
+        with self.assertRaises(KeyError):
+            CounterDeltas().add(7, nope=1)
+
+    def test_results_grouped_in_one_update(self):
+        deltas = CounterDeltas()
+        deltas.add_result(7, 'success', file_size=100, processing_time_ms=10)
+        deltas.add_result(7, 'success', file_size=50, processing_time_ms=5)
+        deltas.add_result(7, 'failed', processing_time_ms=3)
+        deltas.add_result(3, 'failed')
+
+        statements = deltas.statements()
+
+        self.assertEqual(len(statements), 1)
+        query, params = statements[0]
+        self.assertIn('processed_images = processed_images + CASE batch_id WHEN %s THEN %s ELSE 0 END', query)
+        self.assertIn('failed_images = failed_images + CASE batch_id WHEN %s THEN %s WHEN %s THEN %s ELSE 0 END',
+                      query)
+        self.assertNotIn('total_images', query)
+        self.assertTrue(query.endswith('WHERE batch_id IN (%s, %s)'))
+
+        # Pares (batch_id, incremento) en el orden de COUNTER_COLUMNS, lotes ordenados
+        self.assertEqual(params, (
+            7, 2,                   # processed_images
+            3, 1, 7, 1,             # failed_images
+            7, 150,                 # processed_bytes
+            7, 18,                  # processing_time_ms_total
+            3, 7                    # WHERE batch_id IN
+        ))
+        self.assertEqual(query.count('%s'), len(params))
+
+    def test_splits_large_updates(self):
+        deltas = CounterDeltas()
+        for batch_id in range(1, batch_counters.UPDATE_CHUNK + 3):
+            deltas.add(batch_id, total=1)
+
+        statements = deltas.statements()
+
+        self.assertEqual(len(statements), 2)
+        for query, params in statements:
+            self.assertEqual(query.count('%s'), len(params))
+        self.assertEqual(statements[1][1], (batch_counters.UPDATE_CHUNK + 1, 1, batch_counters.UPDATE_CHUNK + 2, 1,
+                                            batch_counters.UPDATE_CHUNK + 1, batch_counters.UPDATE_CHUNK + 2))
+
+    def test_apply_executes_every_statement(self):
+        executed = []
+
+        class Cursor:
+            def execute(self, query, params):
+                executed.append((query, params))
+
+        deltas = CounterDeltas()
+        deltas.add(1, total=5)
+        deltas.apply(Cursor())
+
+        self.assertEqual(executed, deltas.statements())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+# Archivo: db_service/tests/test_connection_pool.py
+# PRUEBAS DEL POOL DE CONEXIONES (sin MySQL: mysql.connector.connect se reemplaza)
+#
+# Uso (desde db_service/):
+#   python -m pytest tests
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector import Error
+
+import connection_pool
+from connection_pool import ConnectionPool, PoolTimeoutError
+
+class FakeConnection:
+    """Conexión MySQL mínima: ping, transacción abierta, rollback y close"""
+
+    def __init__(self):
+        self.closed = False
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.pings = 0
+        self.ping_error = False
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if self.ping_error:
+            raise Error(msg='MySQL server has gone away')
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connections = []
+
+        def connect(**kwargs):
+            connection = FakeConnection()
+            self.connections.append(connection)
+            return connection
+
+        patcher = mock.patch.object(connection_pool.mysql.connector, 'connect', side_effect=connect)
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_pool(self, **kwargs):
+        options = {'size': 2, 'max_overflow': 0, 'timeout': 1.0, 'recycle': 0, 'pre_ping': False}
+        options.update(kwargs)
+        return ConnectionPool(**options)
+
+    def test_reuses_idle_connection(self):
+        pool = self.make_pool()
+
+        first = pool.get_connection()
+        raw = first._slot.connection
+        first.close()
+        second = pool.get_connection()
+
+        self.assertIs(second._slot.connection, raw)
+        self.assertEqual(pool.created, 1)
+        second.close()
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_close_twice_returns_once(self):
+        pool = self.make_pool()
+        connection = pool.get_connection()
+        connection.close()
+        connection.close()
+
+        stats = pool.stats()
+        self.assertEqual(stats['in_use'], 0)
+        self.assertEqual(stats['idle'], 1)
+
+    def test_times_out_when_exhausted(self):
+        pool = self.make_pool(size=1, timeout=0.05)
+        held = pool.get_connection()
+
+        start = time.monotonic()
+        with self.assertRaises(PoolTimeoutError):
+            pool.get_connection()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(pool.stats()['waiting'], 0)
+        held.close()
+
+    def test_blocked_caller_gets_released_connection(self):
+        pool = self.make_pool(size=1, timeout=5.0)
+        held = pool.get_connection()
+        raw = held._slot.connection
+        got = []
+
+        waiter = threading.Thread(target=lambda: got.append(pool.get_connection()))
+        waiter.start()
+
+        # El segundo pedido queda esperando (y se cuenta como tal)
+        deadline = time.monotonic() + 2
+        while pool.stats()['waiting'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(pool.stats()['waiting'], 1)
+
+        held.close()
+        waiter.join(2)
+
+        self.assertFalse(waiter.is_alive())
+        self.assertIs(got[0]._slot.connection, raw)
+        self.assertEqual(pool.stats()['waiting'], 0)
+        self.assertEqual(pool.created, 1)
+        got[0].close()
+
+    def test_overflow_connections_closed_on_release(self):
+        pool = self.make_pool(size=1, max_overflow=1)
+
+        first = pool.get_connection()
+        second = pool.get_connection()
+        self.assertEqual(pool.stats()['open'], 2)
+
+        pool.timeout = 0.01
+        with self.assertRaises(PoolTimeoutError):
+            pool.get_connection()
+
+        first.close()
+        second.close()
+
+        stats = pool.stats()
+        self.assertEqual(stats['open'], 1)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(sum(connection.closed for connection in self.connections), 1)
+
+    def test_recycles_old_connections(self):
+        pool = self.make_pool(recycle=60)
+        connection = pool.get_connection()
+        old = connection._slot.connection
+        connection._slot.created_at -= 61
+        connection.close()
+
+        fresh = pool.get_connection()
+
+        self.assertIsNot(fresh._slot.connection, old)
+        self.assertTrue(old.closed)
+        self.assertEqual(pool.recycled, 1)
+        self.assertEqual(pool.stats()['open'], 1)
+        fresh.close()
+
+    def test_pre_ping_replaces_dead_connection(self):
+        pool = self.make_pool(pre_ping=True, pre_ping_idle=0)
+        connection = pool.get_connection()
+        dead = connection._slot.connection
+        connection.close()
+        dead.ping_error = True
+
+        fresh = pool.get_connection()
+
+        self.assertIsNot(fresh._slot.connection, dead)
+        self.assertTrue(dead.closed)
+        self.assertEqual(pool.ping_failures, 1)
+        fresh.close()
+
+    def test_pre_ping_skipped_for_recently_used(self):
+        pool = self.make_pool(pre_ping=True, pre_ping_idle=60)
+        connection = pool.get_connection()
+        raw = connection._slot.connection
+        connection.close()
+
+        pool.get_connection().close()
+        self.assertEqual(raw.pings, 0)
+
+        # Ociosa más de pre_ping_idle: se verifica antes de prestarla
+        pool._idle[-1].released_at -= 61
+        pool.get_connection().close()
+        self.assertEqual(raw.pings, 1)
+
+    def test_rolls_back_open_transaction_on_release(self):
+        pool = self.make_pool()
+        connection = pool.get_connection()
+        raw = connection._slot.connection
+        raw.in_transaction = True
+
+        connection.close()
+
+        self.assertEqual(raw.rollbacks, 1)
+        self.assertFalse(raw.closed)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_discard_closes_connection(self):
+        pool = self.make_pool()
+        connection = pool.get_connection()
+        raw = connection._slot.connection
+
+        connection.discard()
+
+        self.assertTrue(raw.closed)
+        self.assertEqual(pool.stats()['open'], 0)
+
+    def test_failed_connect_frees_slot(self):
+        pool = self.make_pool(size=1)
+        self.connect.side_effect = Error(msg="Can't connect to MySQL server")
+
+        with self.assertRaises(Error):
+            pool.get_connection()
+
+        stats = pool.stats()
+        self.assertEqual(stats['open'], 0)
+        self.assertEqual(stats['in_use'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
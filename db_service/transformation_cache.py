@@ -0,0 +1,82 @@
+# Archivo: db_service/transformation_cache.py
+# CACHÉ EN PROCESO DEL CATÁLOGO DE TRANSFORMACIONES
+
+import threading
+import time
+from config import Config
+from database import Database
+from logger import get_logger
+
+log = get_logger('CATALOG')
+
+class TransformationCache:
+    """
+    CACHÉ NOMBRE → transformation_id
+
+    El catálogo de transformaciones tiene pocas filas y casi nunca cambia,
+    así que se carga completo en memoria y se resuelve sin ir a MySQL.
+
+    Se recarga cuando:
+        - Vence el TTL
+        - Se pide un nombre que no está (el catálogo pudo haber cambiado)
+        - Alguien llama invalidate() después de modificar el catálogo
+    """
+
+    def __init__(self, ttl_seconds=300, miss_reload_interval=5):
+        self.ttl_seconds = ttl_seconds
+        self.miss_reload_interval = miss_reload_interval  # Evita recargar en cada nombre inválido
+        self._lock = threading.Lock()
+        self._by_name = {}      # name -> (transformation_id, is_active)
+        self._loaded_at = None
+
+    def _load(self):
+        """Carga el catálogo completo (se llama con el lock tomado)"""
+        rows = Database().execute_query(
+            "SELECT transformation_id, name, is_active FROM transformations"
+        )
+        self._by_name = {
+            row['name']: (row['transformation_id'], bool(row['is_active']))
+            for row in rows
+        }
+        self._loaded_at = time.time()
+        log.info("Catálogo de transformaciones cargado: %d entradas", len(self._by_name))
+
+    def get_ids(self, names, active_only=False):
+        """
+        Resolver varios nombres en una sola pasada
+
+        Args:
+            names: Iterable de nombres de transformación
+            active_only: Ignorar transformaciones desactivadas
+
+        Returns:
+            dict: {name: transformation_id} (los nombres desconocidos se omiten)
+        """
+        names = set(names)
+
+        with self._lock:
+            now = time.time()
+            if self._loaded_at is None or now - self._loaded_at > self.ttl_seconds:
+                self._load()
+            elif (any(name not in self._by_name for name in names) and
+                  now - self._loaded_at > self.miss_reload_interval):
+                self._load()
+
+            resolved = {}
+            for name in names:
+                entry = self._by_name.get(name)
+                if entry and (entry[1] or not active_only):
+                    resolved[name] = entry[0]
+            return resolved
+
+    def get_id(self, name, active_only=False):
+        """Resolver un nombre (None si no existe)"""
+        return self.get_ids([name], active_only=active_only).get(name)
+
+    def invalidate(self):
+        """Forzar recarga en la próxima consulta (llamar tras modificar el catálogo)"""
+        with self._lock:
+            self._loaded_at = None
+
+# Instancia compartida por todas las rutas del proceso
+transformation_cache = TransformationCache(ttl_seconds=Config.TRANSFORMATION_CACHE_TTL)
@@ -0,0 +1,6 @@
+# Archivo: db_service/wsgi.py
+# PUNTO DE ENTRADA WSGI (gunicorn -c gunicorn.conf.py wsgi:app)
+
+from app import create_app
+
+app = create_app()
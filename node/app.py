@@ -7,93 +7,139 @@ import threading
 import requests
 import psutil
 from grpc_server.server import serve
+from telemetry import telemetry
+from metrics import start_http_server
+from logger import get_logger, setup_logging
+import tracing
+
+log = get_logger('NODO')
 
 # Variables de entorno
 GRPC_PORT = int(os.getenv('GRPC_PORT', 50051))
 NODE_ID = int(os.getenv('NODE_ID', 1))
+NODE_HOST = os.getenv('NODE_HOST', 'localhost')      # Dirección con la que el servidor alcanza al nodo
 SOAP_SERVER_URL = os.getenv('SOAP_SERVER_URL', 'http://localhost:8000')  # ← Cambio a SOAP Server
+HEARTBEAT_PROTOCOL = os.getenv('HEARTBEAT_PROTOCOL', 'json').lower()   # 'json' (POST /heartbeat) o 'soap'
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', 30))         # Segundos entre heartbeats
+METRICS_PORT = int(os.getenv('METRICS_PORT', GRPC_PORT + 1000))         # GET /metrics (0 = deshabilitado)
 
 def get_system_metrics():
-    """Obtener métricas del sistema usando psutil"""
+    """Obtener métricas del sistema (psutil + telemetría continua del nodo)"""
     try:
-        cpu_count = psutil.cpu_count(logical=True)
-        ram_gb = round(psutil.virtual_memory().total / (1024**3), 1)
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        ram_percent = psutil.virtual_memory().percent
+        snapshot = telemetry.snapshot()
         
         return {
-            'cpu_cores': cpu_count,
-            'ram_gb': ram_gb,
-            'cpu_usage': cpu_percent,
-            'ram_usage': ram_percent
+            'cpu_cores': psutil.cpu_count(logical=True),
+            'ram_gb': round(psutil.virtual_memory().total / (1024**3), 1),
+            'cpu_usage': snapshot['cpu_usage'],
+            'ram_usage': snapshot['memory_usage'],
+            'current_load': snapshot['in_flight_jobs'] + snapshot['queue_depth'],
+            'max_concurrent_jobs': snapshot['max_concurrent_jobs'],
+            'telemetry': snapshot
         }
     except Exception as e:
-        print(f"[NODO {NODE_ID}] Error obteniendo métricas: {e}")
+        log.warning("Error obteniendo métricas: %s", e)
         return {
             'cpu_cores': None,
             'ram_gb': None,
             'cpu_usage': 0,
-            'ram_usage': 0
+            'ram_usage': 0,
+            'current_load': 0,
+            'max_concurrent_jobs': telemetry.max_concurrent_jobs,
+            'telemetry': None
         }
 
-def send_heartbeat():
-    """Envía heartbeat al SOAP Server (no directamente a DB Service)"""
-    while True:
-        try:
-            metrics = get_system_metrics()
-            
-            # Construir SOAP XML
-            soap_envelope = f'''<?xml version="1.0" encoding="UTF-8"?>
+def _soap_heartbeat(metrics):
+    """NodeHeartbeat en SOAP XML"""
+    soap_envelope = f'''<?xml version="1.0" encoding="UTF-8"?>
 <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
   <soap:Body>
     <NodeHeartbeatRequest xmlns="http://example.org/ImageProcessingService.wsdl">
       <node_id>{NODE_ID}</node_id>
-      <ip_address>localhost</ip_address>
+      <ip_address>{NODE_HOST}</ip_address>
       <port>{GRPC_PORT}</port>
       <cpu_cores>{metrics['cpu_cores']}</cpu_cores>
       <ram_gb>{metrics['ram_gb']}</ram_gb>
-      <current_load>0</current_load>
+      <current_load>{metrics['current_load']}</current_load>
       <status>active</status>
     </NodeHeartbeatRequest>
   </soap:Body>
 </soap:Envelope>'''
+    
+    return requests.post(
+        f'{SOAP_SERVER_URL}/soap',
+        data=soap_envelope,
+        headers={'Content-Type': 'text/xml'},
+        timeout=5
+    )
+
+def _json_heartbeat(metrics):
+    """Heartbeat en JSON compacto (POST /heartbeat, sin armar ni parsear XML)"""
+    return requests.post(
+        f'{SOAP_SERVER_URL}/heartbeat',
+        json={
+            'node_id': NODE_ID,
+            'ip_address': NODE_HOST,
+            'port': GRPC_PORT,
+            'cpu_cores': metrics['cpu_cores'],
+            'ram_gb': metrics['ram_gb'],
+            'current_load': metrics['current_load'],
+            'max_concurrent_jobs': metrics['max_concurrent_jobs'],
+            'telemetry': metrics['telemetry'],
+            'status': 'active'
+        },
+        timeout=5
+    )
+
+def send_heartbeat():
+    """Envía heartbeat al SOAP Server (no directamente a DB Service)"""
+    send = _soap_heartbeat if HEARTBEAT_PROTOCOL == 'soap' else _json_heartbeat
+    
+    while True:
+        try:
+            metrics = get_system_metrics()
+            response = send(metrics)
             
-            response = requests.post(
-                f'{SOAP_SERVER_URL}/soap',
-                data=soap_envelope,
-                headers={'Content-Type': 'text/xml'},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                print(f"[NODO {NODE_ID}] Heartbeat enviado ✓ (CPU: {metrics['cpu_usage']:.1f}%, RAM: {metrics['ram_usage']:.1f}%)")
+            if response.status_code in (200, 202):
+                log.debug("Heartbeat enviado ✓ (CPU: %.1f%%, RAM: %.1f%%, carga: %s)",
+                          metrics['cpu_usage'], metrics['ram_usage'], metrics['current_load'])
             else:
-                print(f"[NODO {NODE_ID}] Error en heartbeat: {response.status_code}")
+                log.warning("Error en heartbeat: %s", response.status_code)
         except Exception as e:
-            print(f"[NODO {NODE_ID}] Error enviando heartbeat: {e}")
+            log.warning("Error enviando heartbeat: %s", e)
         
-        time.sleep(30)  # Cada 30 segundos
+        time.sleep(HEARTBEAT_INTERVAL)
 
 def main():
     """Función principal del nodo"""
     
     # Crear directorio de salida
     os.makedirs('output', exist_ok=True)
+    setup_logging(f'node-{NODE_ID}')
     
     print("\n" + "="*60)
     print(f"NODO DE PROCESAMIENTO #{NODE_ID}")
     print("="*60)
     print(f"Puerto gRPC:   {GRPC_PORT}")
     print(f"SOAP Server:   {SOAP_SERVER_URL}")
+    print(f"Heartbeat:     {HEARTBEAT_PROTOCOL} cada {HEARTBEAT_INTERVAL:.0f} s")
+    print("Métricas:      " + (f"http://0.0.0.0:{METRICS_PORT}/metrics" if METRICS_PORT else "deshabilitadas"))
     print("="*60 + "\n")
     
+    # Exportar spans de ProcessImage (traceparent recibido del servidor)
+    tracing.init_tracing(f'node-{NODE_ID}')
+    
     # Iniciar servidor gRPC
     server = serve(port=GRPC_PORT)
     
+    # Exponer métricas Prometheus
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+    
     # Iniciar thread de heartbeat
     heartbeat_thread = threading.Thread(target=send_heartbeat, daemon=True)
     heartbeat_thread.start()
-    print(f"[NODO {NODE_ID}] Thread de heartbeat iniciado\n")
+    log.info("Nodo %s: thread de heartbeat iniciado", NODE_ID)
     
     try:
         while True:
@@ -24,23 +24,23 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16image_processing.proto\x12\x10image_processing\"q\n\x0eProcessRequest\x12\x10\n\x08image_id\x18\x01 \x01(\x05\x12\x12\n\nimage_path\x18\x02 \x01(\t\x12\x39\n\x0ftransformations\x18\x03 \x03(\x0b\x32 .image_processing.Transformation\"M\n\x0eTransformation\x12\x19\n\x11transformation_id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x12\n\nparameters\x18\x03 \x01(\t\"~\n\x0fProcessResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x13\n\x0bresult_path\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x05\x12\x12\n\nimage_data\x18\x05 \x01(\x0c\" \n\rStatusRequest\x12\x0f\n\x07node_id\x18\x01 \x01(\x05\"I\n\x0eStatusResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x11\n\tcpu_usage\x18\x02 \x01(\x02\x12\x14\n\x0cmemory_usage\x18\x03 \x01(\x02\x32\xbd\x01\n\x0eImageProcessor\x12U\n\x0cProcessImage\x12 .image_processing.ProcessRequest\x1a!.image_processing.ProcessResponse\"\x00\x12T\n\rGetNodeStatus\x12\x1f.image_processing.StatusRequest\x1a .image_processing.StatusResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16image_processing.proto\x12\x10image_processing\"\xbe\x01\n\x0eProcessRequest\x12\x10\n\x08image_id\x18\x01 \x01(\x05\x12\x12\n\nimage_path\x18\x02 \x01(\t\x12\x39\n\x0ftransformations\x18\x03 \x03(\x0b\x32 .image_processing.Transformation\x12\x12\n\nimage_data\x18\x04 \x01(\x0c\x12\x10\n\x08\x66ilename\x18\x05 \x01(\t\x12\x11\n\tinput_key\x18\x06 \x01(\t\x12\x12\n\noutput_key\x18\x07 \x01(\t\"M\n\x0eTransformation\x12\x19\n\x11transformation_id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x12\n\nparameters\x18\x03 \x01(\t\"\xbe\x01\n\x0fProcessResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x13\n\x0bresult_path\x18\x02 \x01(\t\x12\x15\n\rerror_message\x18\x03 \x01(\t\x12\x1a\n\x12processing_time_ms\x18\x04 \x01(\x05\x12\x12\n\nimage_data\x18\x05 \x01(\x0c\x12\x12\n\nresult_key\x18\x06 \x01(\t\x12\x13\n\x0bresult_size\x18\x07 \x01(\x03\x12\x15\n\rresult_sha256\x18\x08 \x01(\t\" \n\rStatusRequest\x12\x0f\n\x07node_id\x18\x01 \x01(\x05\"\xe7\x02\n\x0eStatusResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x11\n\tcpu_usage\x18\x02 \x01(\x02\x12\x14\n\x0cmemory_usage\x18\x03 \x01(\x02\x12\x14\n\x0c\x63pu_per_core\x18\x04 \x03(\x02\x12\x11\n\trss_bytes\x18\x05 \x01(\x03\x12\x16\n\x0ein_flight_jobs\x18\x06 \x01(\x05\x12\x13\n\x0bqueue_depth\x18\x07 \x01(\x05\x12\x1b\n\x13max_concurrent_jobs\x18\x08 \x01(\x05\x12\x16\n\x0ejobs_completed\x18\t \x01(\x03\x12\x13\n\x0bjobs_failed\x18\n \x01(\x03\x12\x16\n\x0elatency_p50_ms\x18\x0b \x01(\x02\x12\x16\n\x0elatency_p95_ms\x18\x0c \x01(\x02\x12\x16\n\x0elatency_p99_ms\x18\r \x01(\x02\x12\x19\n\x11pixels_per_second\x18\x0e \x01(\x02\x12\x19\n\x11local_input_ratio\x18\x0f \x01(\x02\x32\xbd\x01\n\x0eImageProcessor\x12U\n\x0cProcessImage\x12 .image_processing.ProcessRequest\x1a!.image_processing.ProcessResponse\"\x00\x12T\n\rGetNodeStatus\x12\x1f.image_processing.StatusRequest\x1a .image_processing.StatusResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'image_processing_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_PROCESSREQUEST']._serialized_start=44
-  _globals['_PROCESSREQUEST']._serialized_end=157
-  _globals['_TRANSFORMATION']._serialized_start=159
-  _globals['_TRANSFORMATION']._serialized_end=236
-  _globals['_PROCESSRESPONSE']._serialized_start=238
-  _globals['_PROCESSRESPONSE']._serialized_end=364
-  _globals['_STATUSREQUEST']._serialized_start=366
-  _globals['_STATUSREQUEST']._serialized_end=398
-  _globals['_STATUSRESPONSE']._serialized_start=400
-  _globals['_STATUSRESPONSE']._serialized_end=473
-  _globals['_IMAGEPROCESSOR']._serialized_start=476
-  _globals['_IMAGEPROCESSOR']._serialized_end=665
+  _globals['_PROCESSREQUEST']._serialized_start=45
+  _globals['_PROCESSREQUEST']._serialized_end=235
+  _globals['_TRANSFORMATION']._serialized_start=237
+  _globals['_TRANSFORMATION']._serialized_end=314
+  _globals['_PROCESSRESPONSE']._serialized_start=317
+  _globals['_PROCESSRESPONSE']._serialized_end=507
+  _globals['_STATUSREQUEST']._serialized_start=509
+  _globals['_STATUSREQUEST']._serialized_end=541
+  _globals['_STATUSRESPONSE']._serialized_start=544
+  _globals['_STATUSRESPONSE']._serialized_end=903
+  _globals['_IMAGEPROCESSOR']._serialized_start=906
+  _globals['_IMAGEPROCESSOR']._serialized_end=1095
 # @@protoc_insertion_point(module_scope)
@@ -4,10 +4,12 @@
 import grpc
 from concurrent import futures
 import json
+import logging
 import time
 import os
 import sys
-import psutil
+import shutil
+import hashlib
 import tempfile
 
 # ⭐ AGREGAR RUTA A PROTOS
@@ -18,125 +20,241 @@ import image_processing_pb2
 import image_processing_pb2_grpc
 
 from transformations.image_ops import ImageProcessor
+from object_store import get_store, content_key
+from telemetry import telemetry
+from metrics import counter, gauge, histogram
+from logger import get_logger
+import tracing
+
+log = get_logger('NODO')
+
+# Métricas Prometheus del nodo (GET /metrics en METRICS_PORT)
+PROCESS_IMAGE_SECONDS = histogram(
+    'node_process_image_seconds', 'Duración de ProcessImage, con espera de cupo', ['status']
+)
+PIXELS_PROCESSED = counter('node_pixels_processed_total', 'Píxeles de imágenes procesadas con éxito')
+gauge('node_in_flight_jobs', 'Trabajos en curso').set_function(lambda: telemetry.in_flight_jobs)
+gauge('node_queue_depth', 'Trabajos esperando un cupo').set_function(lambda: telemetry.queue_depth)
+gauge('node_max_concurrent_jobs', 'Cupos de trabajo').set(telemetry.max_concurrent_jobs)
+
+# Raíz del almacenamiento local compartido con el servidor (STORAGE_ROOT la sobrescribe)
+STORAGE_DEFAULT_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'server',
+    'output'
+)
 
 class ImageProcessorServicer(image_processing_pb2_grpc.ImageProcessorServicer):
     """CLASE PRINCIPAL DEL SERVICIO gRPC"""
     
     def ProcessImage(self, request, context):
         """Procesa una imagen según las transformaciones solicitadas"""
-        print("\n=== [NODO] NUEVA SOLICITUD DE PROCESAMIENTO RECIBIDA ===")
-        print(f"[NODO] ID de imagen: {request.image_id}")
-        print(f"[NODO] Filename: {request.filename}")
-        print(f"[NODO] Image data size: {len(request.image_data)} bytes")
-        print(f"[NODO] Número de transformaciones: {len(request.transformations)}")
+        # Continúa la traza del servidor (traceparent en la metadata gRPC)
+        metadata = context.invocation_metadata() if context is not None else None
+        with tracing.span('node.ProcessImage', parent=tracing.extract(metadata), kind='server',
+                          attributes={'image_id': request.image_id}) as span:
+            # Espera un cupo de MAX_CONCURRENT_JOBS y registra latencia/píxeles
+            start = time.perf_counter()
+            queued_ns = time.time_ns()
+            with telemetry.job() as job:
+                tracing.record_span('node.queue_wait', queued_ns, time.time_ns())
+                response = self._process_image(request, job)
+                job['success'] = response.success
+            span.set_attribute('success', response.success)
+        
+        PROCESS_IMAGE_SECONDS.labels('success' if response.success else 'failed').observe(
+            time.perf_counter() - start
+        )
+        if response.success:
+            PIXELS_PROCESSED.inc(job['pixels'])
+        return response
+    
+    def _process_image(self, request, job):
+        # MODO POR REFERENCIA: la imagen se lee y escribe en el almacenamiento compartido
+        by_reference = bool(request.input_key)
+        debug = log.isEnabledFor(logging.DEBUG)
+        if debug:
+            log.debug("Nueva solicitud: imagen %s (%s), entrada %s, %d transformaciones",
+                      request.image_id, request.filename,
+                      request.input_key if by_reference else f'{len(request.image_data)} bytes',
+                      len(request.transformations))
         
         # CONVERSIÓN DE DATOS
         transformations = []
         for i, t in enumerate(request.transformations):
-            print(f"[NODO] → Transformación {i+1}: {t.name} (ID: {t.transformation_id})")
+            if debug:
+                log.debug("→ Transformación %d: %s (ID: %s)", i + 1, t.name, t.transformation_id)
             transformations.append({
                 'transformation_id': t.transformation_id,
                 'name': t.name,
                 'parameters': t.parameters
             })
         
-        # GUARDAR IMAGEN TEMPORALMENTE DESDE BYTES
+        # GUARDAR IMAGEN TEMPORALMENTE DESDE BYTES (o tomarla del almacenamiento)
         temp_dir = tempfile.gettempdir()
         temp_image_path = os.path.join(temp_dir, f"grpc_{request.image_id}_{request.filename}")
+        output_dir = "output"
         
         try:
-            with open(temp_image_path, 'wb') as f:
-                f.write(request.image_data)
-            print(f"[NODO] Imagen temporal guardada en: {temp_image_path}")
+            fetch_span = tracing.start_span('node.fetch_input', attributes={'by_reference': by_reference})
+            if by_reference:
+                storage = get_store(STORAGE_DEFAULT_ROOT)
+                image_path = storage.local_path(request.input_key)
+                telemetry.record_input(local=image_path is not None)
+                
+                if image_path is None:
+                    # Almacenamiento remoto: descargar a un temporal
+                    with storage.open(request.input_key) as source, open(temp_image_path, 'wb') as f:
+                        shutil.copyfileobj(source, f)
+                    image_path = temp_image_path
+                    log.debug("Imagen descargada en: %s", temp_image_path)
+                else:
+                    temp_image_path = None
+                
+                # Directorio propio por imagen: el nombre del original puede repetirse entre lotes
+                output_dir = os.path.join("output", f"image_{request.image_id}")
+            else:
+                with open(temp_image_path, 'wb') as f:
+                    f.write(request.image_data)
+                image_path = temp_image_path
+                log.debug("Imagen temporal guardada en: %s", temp_image_path)
+            fetch_span.end()
         except Exception as e:
-            print(f"[NODO] Error guardando imagen temporal: {e}")
+            fetch_span.set_error(e)
+            fetch_span.end()
+            log.error("Error obteniendo imagen de entrada %s: %s", request.image_id, e)
+            self._cleanup(temp_image_path, None)
             return image_processing_pb2.ProcessResponse(
                 success=False,
                 result_path='',
-                error_message=f'Error guardando imagen temporal: {str(e)}',
+                error_message=f'Error obteniendo imagen de entrada: {str(e)}',
                 processing_time_ms=0,
                 image_data=b''
             )
         
-        # PROCESAMIENTO
-        print(f"[NODO] Iniciando procesamiento de imagen...")
-        start_time = time.time()
+        try:
+            # PROCESAMIENTO
+            start_time = time.time()
         
-   ##############################################################################################################################################
-        result = ImageProcessor.process_image(
-   ####################################################################################################################################################         
-            image_path=temp_image_path,
-            transformations=transformations
-        )
+       ##############################################################################################################################################
+            result = ImageProcessor.process_image(
+       ####################################################################################################################################################         
+                image_path=image_path,
+                transformations=transformations,
+                output_dir=output_dir
+            )
         
-        processing_time = time.time() - start_time
-        print(f"[NODO] Procesamiento completado en {processing_time*1000:.2f} ms")
-        print(f"[NODO] Resultado: {'Éxito' if result['success'] else 'Error'}")
+            processing_time = time.time() - start_time
+            job['pixels'] = result.get('pixels', 0)
+            log.info("Imagen %s procesada en %.2f ms: %s", request.image_id, processing_time * 1000,
+                     'éxito' if result['success'] else 'error')
         
-        # LEER IMAGEN PROCESADA
-        image_bytes = b''
+            # LEER IMAGEN PROCESADA (o publicarla en el almacenamiento)
+            image_bytes = b''
+            stored = {}
         
-        if result['success']:
-            print(f"[NODO] Imagen resultado guardada en: {result['result_path']}")
+            if result['success'] and by_reference:
+                try:
+                    with tracing.span('node.store_result'):
+                        stored = self._store_result(storage, result['result_path'], request.output_key)
+                    log.debug("✓ Resultado publicado: %s (%d bytes)", stored['result_key'], stored['result_size'])
+                except Exception as e:
+                    log.error("✗ Error publicando resultado de %s: %s", request.image_id, e)
+                    result['success'] = False
+                    result['error_message'] = f"Error publicando resultado: {str(e)}"
+            elif result['success']:
+                log.debug("Imagen resultado guardada en: %s", result['result_path'])
             
-            try:
-                with open(result['result_path'], 'rb') as f:
-                    image_bytes = f.read()
+                try:
+                    with open(result['result_path'], 'rb') as f:
+                        image_bytes = f.read()
                 
-                print(f"[NODO] ✓ Imagen leída: {len(image_bytes)} bytes ({len(image_bytes)/1024:.2f} KB)")
+                    log.debug("✓ Imagen leída: %d bytes", len(image_bytes))
                 
-            except Exception as e:
-                print(f"[NODO] ✗ Error al leer imagen: {e}")
-                result['success'] = False
-                result['error_message'] = f"Error al leer imagen procesada: {str(e)}"
-        else:
-            print(f"[NODO] Error: {result['error_message']}")
-        
-        # LIMPIAR ARCHIVO TEMPORAL
+                except Exception as e:
+                    log.error("✗ Error al leer imagen de %s: %s", request.image_id, e)
+                    result['success'] = False
+                    result['error_message'] = f"Error al leer imagen procesada: {str(e)}"
+            else:
+                log.warning("Imagen %s: %s", request.image_id, result['error_message'])
+        
+            # RESPUESTA
+            response = image_processing_pb2.ProcessResponse(
+                success=result['success'],
+                result_path=result['result_path'],
+                error_message=result['error_message'],
+                processing_time_ms=result['processing_time_ms'],
+                image_data=image_bytes,
+                **stored
+            )
+            return response
+        finally:
+            # LIMPIAR TEMPORALES (nunca el original del almacenamiento), también si falló
+            self._cleanup(temp_image_path, output_dir if by_reference else None)
+    
+    @staticmethod
+    def _cleanup(temp_image_path, output_dir):
+        """Borrar el temporal de entrada y el directorio de salida por imagen (si hay)"""
         try:
-            if os.path.exists(temp_image_path):
+            if temp_image_path and os.path.exists(temp_image_path):
                 os.remove(temp_image_path)
-                print(f"[NODO] Archivo temporal eliminado: {temp_image_path}")
+                log.debug("Archivo temporal eliminado: %s", temp_image_path)
         except Exception as e:
-            print(f"[NODO] Advertencia: No se pudo eliminar temp file: {e}")
-        
-        # RESPUESTA
-        response = image_processing_pb2.ProcessResponse(
-            success=result['success'],
-            result_path=result['result_path'],
-            error_message=result['error_message'],
-            processing_time_ms=result['processing_time_ms'],
-            image_data=image_bytes
-        )
+            log.warning("No se pudo eliminar temp file: %s", e)
         
-        print(f"[NODO] Enviando respuesta al servidor con imagen incluida")
-        return response
+        if output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    
+    @staticmethod
+    def _store_result(storage, result_path, output_key):
+        """
+        Publicar el resultado en el almacenamiento compartido
+        
+        Args:
+            output_key: Clave pedida por el servidor (vacía = clave por contenido)
+        
+        Returns:
+            dict: result_key, result_size y result_sha256 para ProcessResponse
+        """
+        sha256 = hashlib.sha256()
+        with open(result_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+        size = os.path.getsize(result_path)
+        
+        key = output_key or content_key(digest, 'results', os.path.splitext(result_path)[1])
+        storage.put_file(key, result_path, move=True)
+        
+        return {
+            'result_key': key,
+            'result_size': size,
+            'result_sha256': digest
+        }
     
     def GetNodeStatus(self, request, context):
         """Retorna el estado actual del nodo"""
-        print(f"[NODO] Solicitud de estado recibida para nodo ID: {request.node_id}")
-        
-        cpu_usage = psutil.cpu_percent()
-        memory = psutil.virtual_memory()
-        memory_usage = memory.percent
+        # Mediciones continuas del sampler (no una lectura instantánea de CPU)
+        metrics = telemetry.snapshot()
         
         status = 'active'
-        if cpu_usage > 90 or memory_usage > 90:
+        if metrics['cpu_usage'] > 90 or metrics['memory_usage'] > 90:
             status = 'error'
         
-        print(f"[NODO] Estado: {status}, CPU: {cpu_usage}%, Memoria: {memory_usage}%")
+        log.debug("Estado pedido (nodo %s): %s, CPU: %s%%, Memoria: %s%%, en curso: %s, en cola: %s",
+                  request.node_id, status, metrics['cpu_usage'], metrics['memory_usage'],
+                  metrics['in_flight_jobs'], metrics['queue_depth'])
         
-        response = image_processing_pb2.StatusResponse(
-            status=status,
-            cpu_usage=cpu_usage,
-            memory_usage=memory_usage
-        )
+        response = image_processing_pb2.StatusResponse(status=status, **metrics)
         
         return response
 
 def serve(port=50051):
     """Inicializa el servidor gRPC"""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Más threads que cupos de trabajo: los pedidos que esperan cupo cuentan
+    # como cola (queue_depth) y GetNodeStatus nunca queda bloqueado
+    max_workers = int(os.getenv('GRPC_WORKERS', 0)) or telemetry.max_concurrent_jobs * 2 + 2
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
     
     image_processing_pb2_grpc.add_ImageProcessorServicer_to_server(
         ImageProcessorServicer(),
@@ -146,5 +264,5 @@ def serve(port=50051):
     server.add_insecure_port(f'[::]:{port}')
     server.start()
     
-    print(f"Servidor gRPC iniciado en puerto {port}")
+    log.info("Servidor gRPC iniciado en puerto %s", port)
     return server
\ No newline at end of file
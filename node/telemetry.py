@@ -0,0 +1,177 @@
+# Archivo: node/telemetry.py
+# TELEMETRÍA DEL NODO: MEDICIONES CONTINUAS PARA HEARTBEATS Y GetNodeStatus
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psutil
+
+from logger import get_logger
+
+log = get_logger('TELEMETRÍA')
+
+class NodeTelemetry:
+    """
+    Mediciones del nodo mantenidas en segundo plano
+
+    - CPU por core y memoria: un thread muestrea cada sample_interval
+      segundos (psutil.cpu_percent sin intervalo mide desde la muestra
+      anterior, así que solo tiene sentido llamado periódicamente) y se
+      promedian las últimas cpu_window muestras.
+    - Trabajos: en curso, en cola (esperando un cupo de max_concurrent_jobs),
+      completados/fallidos, latencia p50/p95/p99 de los últimos
+      latency_window trabajos y píxeles por segundo en los últimos
+      throughput_window segundos.
+    - Entradas por referencia: cuántas se leyeron del almacenamiento local
+      sin descargarlas (record_input).
+    """
+
+    def __init__(self, max_concurrent_jobs=None, sample_interval=1.0, cpu_window=10,
+                 latency_window=256, throughput_window=60.0):
+        self.max_concurrent_jobs = max_concurrent_jobs or os.cpu_count() or 1
+        self.sample_interval = sample_interval
+        self.throughput_window = throughput_window
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrent_jobs)
+        self._process = psutil.Process()
+
+        self._cpu_samples = deque(maxlen=cpu_window)    # listas de % por core
+        self._memory_percent = 0.0
+        self._rss_bytes = 0
+
+        self._in_flight = 0
+        self._queued = 0
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self._latencies = deque(maxlen=latency_window)   # ms
+        self._pixels = deque()                          # (monotonic de fin, píxeles)
+        self._inputs = [0, 0]                           # [locales, descargadas]
+
+        psutil.cpu_percent(percpu=True)     # Primera llamada: fija la referencia
+        self._sample()
+        self._sampler = threading.Thread(target=self._run_sampler, name='telemetry', daemon=True)
+        self._sampler.start()
+
+    def _sample(self):
+        per_core = psutil.cpu_percent(percpu=True)
+        memory_percent = psutil.virtual_memory().percent
+        rss = self._process.memory_info().rss
+        with self._lock:
+            self._cpu_samples.append(per_core)
+            self._memory_percent = memory_percent
+            self._rss_bytes = rss
+
+    def _run_sampler(self):
+        while True:
+            time.sleep(self.sample_interval)
+            try:
+                self._sample()
+            except Exception as e:
+                log.warning("Error muestreando: %s", e)
+
+    @contextmanager
+    def job(self):
+        """
+        Envolver un trabajo: espera un cupo libre (cuenta como en cola),
+        cuenta en curso y al salir registra latencia y resultado
+
+        Uso:
+            with telemetry.job() as job:
+                ...
+                job['pixels'] = ancho * alto
+                job['success'] = True
+        """
+        with self._lock:
+            self._queued += 1
+        self._slots.acquire()
+        with self._lock:
+            self._queued -= 1
+            self._in_flight += 1
+
+        job = {'pixels': 0, 'success': False}
+        start = time.monotonic()
+        try:
+            yield job
+        finally:
+            end = time.monotonic()
+            self._slots.release()
+            with self._lock:
+                self._in_flight -= 1
+                if job['success']:
+                    self.jobs_completed += 1
+                    self._latencies.append((end - start) * 1000)
+                    if job['pixels']:
+                        self._pixels.append((end, job['pixels']))
+                else:
+                    self.jobs_failed += 1
+
+    @property
+    def in_flight_jobs(self):
+        return self._in_flight
+
+    @property
+    def queue_depth(self):
+        return self._queued
+
+    def record_input(self, local):
+        """Anotar una entrada leída del almacenamiento local (local=True) o descargada"""
+        with self._lock:
+            self._inputs[0 if local else 1] += 1
+
+    @staticmethod
+    def _percentile(sorted_values, fraction):
+        if not sorted_values:
+            return 0.0
+        index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+        return round(sorted_values[index], 1)
+
+    def snapshot(self):
+        """Estado actual (dict serializable a JSON)"""
+        now = time.monotonic()
+        with self._lock:
+            samples = list(self._cpu_samples)
+            while self._pixels and now - self._pixels[0][0] > self.throughput_window:
+                self._pixels.popleft()
+            pixels = sum(count for _, count in self._pixels)
+            latencies = sorted(self._latencies)
+            local_inputs, remote_inputs = self._inputs
+            in_flight = self._in_flight
+            queued = self._queued
+            memory_percent = self._memory_percent
+            rss = self._rss_bytes
+            completed = self.jobs_completed
+            failed = self.jobs_failed
+
+        cores = len(samples[0]) if samples else 0
+        cpu_per_core = [
+            round(sum(sample[core] for sample in samples) / len(samples), 1)
+            for core in range(cores)
+        ]
+
+        return {
+            'cpu_usage': round(sum(cpu_per_core) / cores, 1) if cores else 0.0,
+            'cpu_per_core': cpu_per_core,
+            'memory_usage': memory_percent,
+            'rss_bytes': rss,
+            'in_flight_jobs': in_flight,
+            'queue_depth': queued,
+            'max_concurrent_jobs': self.max_concurrent_jobs,
+            'jobs_completed': completed,
+            'jobs_failed': failed,
+            'latency_p50_ms': self._percentile(latencies, 0.50),
+            'latency_p95_ms': self._percentile(latencies, 0.95),
+            'latency_p99_ms': self._percentile(latencies, 0.99),
+            'pixels_per_second': round(pixels / self.throughput_window, 1),
+            'local_input_ratio': round(local_inputs / (local_inputs + remote_inputs), 4)
+                                 if local_inputs + remote_inputs else 0.0
+        }
+
+# Instancia compartida por el servidor gRPC y el thread de heartbeat
+telemetry = NodeTelemetry(
+    max_concurrent_jobs=int(os.getenv('MAX_CONCURRENT_JOBS', 0)) or None,
+    sample_interval=float(os.getenv('TELEMETRY_SAMPLE_INTERVAL', 1.0))
+)
@@ -6,6 +6,16 @@ import json
 import os
 import time
 
+from metrics import histogram
+from logger import get_logger
+import tracing
+
+log = get_logger('PROCESADOR')
+
+TRANSFORMATION_SECONDS = histogram(
+    'node_transformation_seconds', 'Duración de cada transformación aplicada', ['transformation']
+)
+
 class ImageProcessor:
     """Clase central del procesamiento de imágenes con todas las transformaciones"""
     
@@ -20,7 +30,7 @@ class ImageProcessor:
             output_dir: Directorio de salida
             
         Returns:
-            dict con success, result_path, error_message, processing_time_ms
+            dict con success, result_path, error_message, processing_time_ms, pixels
         """
         start_time = time.time()
         
@@ -38,10 +48,10 @@ class ImageProcessor:
             os.makedirs(output_dir, exist_ok=True)
             
             # Cargar imagen
-            print(f"[PROCESADOR] Cargando imagen: {image_path}")
             img = Image.open(image_path)
             original_format = img.format
-            print(f"[PROCESADOR] Imagen cargada: {img.width}x{img.height} ({original_format})")
+            pixels = img.width * img.height
+            log.debug("Imagen cargada: %s, %dx%d (%s)", image_path, img.width, img.height, original_format)
             
             # Preparar nombre de archivo
             original_filename = os.path.basename(image_path)
@@ -52,14 +62,17 @@ class ImageProcessor:
                 name = transform.get('name', '')
                 params = json.loads(transform.get('parameters', '{}')) if isinstance(transform.get('parameters'), str) else transform.get('parameters', {})
                 
-                print(f"[PROCESADOR] Aplicando transformación {i+1}/{len(transformations)}: {name}")
+                log.debug("Aplicando transformación %d/%d: %s", i + 1, len(transformations), name)
                 
                 try:
+                    step_start = time.perf_counter()
+                    with tracing.span(f'transform.{name}'):
 #######################################################################################################################################################################################################                    
-                    img = ImageProcessor._apply_transformation(img, name, params)
+                        img = ImageProcessor._apply_transformation(img, name, params)
 #################################################################################################################################################################################################################
+                    TRANSFORMATION_SECONDS.labels(name).observe(time.perf_counter() - step_start)
                 except Exception as e:
-                    print(f"[PROCESADOR] Error en transformación {name}: {e}")
+                    log.warning("Error en transformación %s: %s", name, e)
                     return {
                         'success': False,
                         'result_path': '',
@@ -73,7 +86,7 @@ class ImageProcessor:
             
             # IMPORTANTE: JPEG no soporta RGBA, convertir a RGB si es necesario
             if img.mode in ['RGBA', 'LA', 'P'] and (original_format == 'JPEG' or filename_parts[1].lower() in ['.jpg', '.jpeg']):
-                print(f"[PROCESADOR] Convirtiendo {img.mode} a RGB para JPEG")
+                log.debug("Convirtiendo %s a RGB para JPEG", img.mode)
                 # Crear fondo blanco
                 background = Image.new('RGB', img.size, (255, 255, 255))
                 if img.mode == 'RGBA':
@@ -83,28 +96,26 @@ class ImageProcessor:
                 img = background
             
             # Si hay conversión de formato, aplicarla al guardar
-            if img.format:
-                img.save(result_path)
-            else:
-                img.save(result_path, format=original_format)
-            
-            print(f"[PROCESADOR] Resultado guardado en: {result_path}")
+            with tracing.span('image.save'):
+                if img.format:
+                    img.save(result_path)
+                else:
+                    img.save(result_path, format=original_format)
             
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"[PROCESADOR] Procesamiento completado en {processing_time} ms")
+            log.debug("Resultado guardado en %s (%d ms)", result_path, processing_time)
             
             return {
                 'success': True,
                 'result_path': result_path,
                 'error_message': '',
-                'processing_time_ms': processing_time
+                'processing_time_ms': processing_time,
+                'pixels': pixels
             }
             
         except Exception as e:
             processing_time = int((time.time() - start_time) * 1000)
-            print(f"[PROCESADOR] ERROR: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error procesando %s: %s", image_path, e)
             
             return {
                 'success': False,
@@ -118,7 +129,7 @@ class ImageProcessor:
         """Aplica una transformación específica a la imagen"""
         
         if name == 'grayscale':
-            print(f"[PROCESADOR] → Convirtiendo a escala de grises")
+            log.debug("→ Convirtiendo a escala de grises")
             return ImageOps.grayscale(img)
         
         elif name == 'resize':
@@ -126,14 +137,14 @@ class ImageProcessor:
             height = params.get('height', img.height)
             keep_aspect = params.get('keep_aspect_ratio', True)
             
-            print(f"[PROCESADOR] → Redimensionando a {width}x{height} (mantener aspecto: {keep_aspect})")
+            log.debug("→ Redimensionando a %sx%s (mantener aspecto: %s)", width, height, keep_aspect)
             
             if keep_aspect:
                 img = ImageOps.contain(img, (width, height))
             else:
                 img = img.resize((width, height))
             
-            print(f"[PROCESADOR] → Nueva dimensión: {img.width}x{img.height}")
+            log.debug("→ Nueva dimensión: %dx%d", img.width, img.height)
             return img
         
         elif name == 'crop':
@@ -142,46 +153,46 @@ class ImageProcessor:
             width = params.get('width', img.width)
             height = params.get('height', img.height)
             
-            print(f"[PROCESADOR] → Recortando región: ({x},{y}) {width}x{height}")
+            log.debug("→ Recortando región: (%s,%s) %sx%s", x, y, width, height)
             return img.crop((x, y, x + width, y + height))
         
         elif name == 'rotate':
             angle = params.get('angle', 0)
             expand = params.get('expand', True)
             
-            print(f"[PROCESADOR] → Rotando {angle} grados")
+            log.debug("→ Rotando %s grados", angle)
             return img.rotate(angle, expand=expand)
         
         elif name == 'flip':
             direction = params.get('direction', 'horizontal').lower()
             
-            print(f"[PROCESADOR] → Reflejando ({direction})")
+            log.debug("→ Reflejando (%s)", direction)
             
             if direction == 'horizontal':
                 return ImageOps.mirror(img)
             elif direction == 'vertical':
                 return ImageOps.flip(img)
             else:
-                print(f"[PROCESADOR] ⚠ Dirección inválida, usando horizontal")
+                log.warning("⚠ Dirección inválida (%s), usando horizontal", direction)
                 return ImageOps.mirror(img)
         
         elif name == 'blur':
             radius = params.get('radius', 2)
             
-            print(f"[PROCESADOR] → Desenfocando (radio: {radius})")
+            log.debug("→ Desenfocando (radio: %s)", radius)
             return img.filter(ImageFilter.GaussianBlur(radius=radius))
         
         elif name == 'brightness':
             factor = params.get('factor', 1.0)
             
-            print(f"[PROCESADOR] → Ajustando brillo (factor: {factor})")
+            log.debug("→ Ajustando brillo (factor: %s)", factor)
             enhancer = ImageEnhance.Brightness(img)
             return enhancer.enhance(factor)
         
         elif name == 'contrast':
             factor = params.get('factor', 1.0)
             
-            print(f"[PROCESADOR] → Ajustando contraste (factor: {factor})")
+            log.debug("→ Ajustando contraste (factor: %s)", factor)
             enhancer = ImageEnhance.Contrast(img)
             return enhancer.enhance(factor)
         
@@ -190,7 +201,7 @@ class ImageProcessor:
             position = params.get('position', 'bottom-right').lower()
             opacity = params.get('opacity', 0.5)
             
-            print(f"[PROCESADOR] → Insertando marca de agua: '{text}' ({position})")
+            log.debug("→ Insertando marca de agua: '%s' (%s)", text, position)
             
             # Convertir a RGBA si no lo es
             if img.mode != 'RGBA':
@@ -232,16 +243,16 @@ class ImageProcessor:
         elif name == 'format_conversion':
             target_format = params.get('target_format', 'PNG').upper()
             
-            print(f"[PROCESADOR] → Convirtiendo formato a {target_format}")
+            log.debug("→ Convirtiendo formato a %s", target_format)
             
             # Validar formato
             if target_format not in ['JPEG', 'JPG', 'PNG', 'TIF', 'TIFF']:
-                print(f"[PROCESADOR] ⚠ Formato inválido, usando PNG")
+                log.warning("⚠ Formato inválido (%s), usando PNG", target_format)
                 target_format = 'PNG'
             
             # JPEG no soporta transparencia
             if target_format in ['JPEG', 'JPG'] and img.mode in ['RGBA', 'LA']:
-                print(f"[PROCESADOR] → Convirtiendo a RGB para JPEG")
+                log.debug("→ Convirtiendo a RGB para JPEG")
                 # Crear fondo blanco
                 background = Image.new('RGB', img.size, (255, 255, 255))
                 if img.mode == 'RGBA':
@@ -256,5 +267,5 @@ class ImageProcessor:
             return img
         
         else:
-            print(f"[PROCESADOR] ⚠ Transformación desconocida: {name}")
+            log.warning("⚠ Transformación desconocida: %s", name)
             return img
\ No newline at end of file
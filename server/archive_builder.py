@@ -0,0 +1,140 @@
+# Archivo: server/archive_builder.py
+# CONSTRUCCIÓN INCREMENTAL DEL ZIP DE CADA LOTE
+
+import os
+import threading
+import zipfile
+
+from logger import get_logger
+
+log = get_logger('ARCHIVE')
+
+# Formatos que ya vienen comprimidos: se guardan sin DEFLATE
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+class ArchiveBuilder:
+    """
+    Arma el ZIP de descarga de un lote a medida que llegan los resultados
+
+    Cada resultado se agrega a batch_{id}.zip.part (en staging_dir) apenas
+    se guarda. Al terminar el lote, finalize() escribe el directorio central
+    y publica el archivo en el almacenamiento como batch_{id}.zip (rename
+    atómico en disco local, subida multipart en S3), así el DB Service
+    nunca ve un ZIP a medio escribir y puede servirlo directo (ETag, Range,
+    descargas repetidas sin recomprimir).
+    """
+
+    def __init__(self, staging_dir, storage):
+        self.staging_dir = staging_dir
+        self.storage = storage
+        self._archives = {}             # batch_id -> {'zip', 'lock', 'names'}
+        self._lock = threading.Lock()   # Protege _archives
+
+    @staticmethod
+    def archive_key(batch_id):
+        """Clave del ZIP final de un lote en el almacenamiento"""
+        return f'batch_{batch_id}.zip'
+
+    def _part_path(self, batch_id):
+        return os.path.join(self.staging_dir, self.archive_key(batch_id) + '.part')
+
+    def _get_archive(self, batch_id):
+        with self._lock:
+            archive = self._archives.get(batch_id)
+            if archive is None:
+                os.makedirs(self.staging_dir, exist_ok=True)
+                archive = {
+                    'zip': zipfile.ZipFile(self._part_path(batch_id), 'w'),
+                    'lock': threading.Lock(),
+                    'names': set(),
+                    'broken': False     # Algún resultado no se pudo agregar
+                }
+                self._archives[batch_id] = archive
+            return archive
+
+    def add(self, batch_id, arcname, data):
+        """
+        Agregar un resultado al ZIP parcial del lote
+
+        Args:
+            batch_id: ID del lote
+            arcname: Nombre del archivo dentro del ZIP
+            data: Bytes de la imagen procesada
+        """
+        self._append(batch_id, arcname,
+                     lambda zip_file, compress_type: zip_file.writestr(arcname, data, compress_type=compress_type))
+
+    def add_file(self, batch_id, arcname, file_path):
+        """Agregar un resultado que ya está en disco (modo por referencia)"""
+        self._append(batch_id, arcname,
+                     lambda zip_file, compress_type: zip_file.write(file_path, arcname, compress_type=compress_type))
+
+    def _append(self, batch_id, arcname, write):
+        archive = self._get_archive(batch_id)
+
+        extension = os.path.splitext(arcname)[1].lower()
+        compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+        with archive['lock']:
+            if arcname in archive['names']:
+                log.warning("⚠ %s ya está en batch_%s.zip, se omite", arcname, batch_id)
+                return
+            try:
+                write(archive['zip'], compress_type)
+            except Exception:
+                archive['broken'] = True
+                raise
+            archive['names'].add(arcname)
+
+    def finalize(self, batch_id):
+        """
+        Cerrar el ZIP del lote y publicarlo con su nombre final
+
+        Un ZIP incompleto (algún add() falló) no se publica: la descarga
+        se arma al vuelo desde la DB.
+
+        Returns:
+            str: Clave del ZIP publicado, o None si no hay ZIP para publicar
+        """
+        with self._lock:
+            archive = self._archives.pop(batch_id, None)
+
+        if archive is None:
+            return None
+
+        with archive['lock']:
+            archive['zip'].close()
+
+        if archive['broken']:
+            log.warning("⚠ batch_%s.zip incompleto, se descarta", batch_id)
+            self._remove_part(batch_id)
+            return None
+
+        key = self.archive_key(batch_id)
+        try:
+            self.storage.put_file(key, self._part_path(batch_id), move=True)
+        except Exception:
+            self._remove_part(batch_id)
+            raise
+
+        log.info("✓ %s listo (%d archivos)", key, len(archive['names']))
+        return key
+
+    def discard(self, batch_id):
+        """Descartar el ZIP parcial de un lote (error antes de terminar)"""
+        with self._lock:
+            archive = self._archives.pop(batch_id, None)
+
+        if archive is None:
+            return
+
+        with archive['lock']:
+            archive['zip'].close()
+
+        self._remove_part(batch_id)
+
+    def _remove_part(self, batch_id):
+        try:
+            os.remove(self._part_path(batch_id))
+        except OSError:
+            pass
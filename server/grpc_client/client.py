@@ -3,6 +3,7 @@
 
 import grpc
 import json
+import logging
 import time
 import sys
 import os
@@ -13,6 +14,11 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'protos'))
 import image_processing_pb2
 import image_processing_pb2_grpc
 
+from logger import get_logger
+import tracing
+
+log = get_logger('CLIENTE gRPC')
+
 class NodeClient:
     """CLIENTE gRPC PARA COMUNICACIÓN CON NODOS"""
     
@@ -21,24 +27,32 @@ class NodeClient:
         self.channel = grpc.insecure_channel(node_address)
         self.stub = image_processing_pb2_grpc.ImageProcessorStub(self.channel)
     
-    def process_image(self, image_id, image_path, transformations):
+    def process_image(self, image_id, image_path, transformations, input_key='', output_key=''):
         """Envía una solicitud para procesar una imagen al nodo
         
         Args:
             image_id: ID de la imagen
             image_path: Ruta al archivo de imagen (se leerá y enviará como bytes)
             transformations: Lista de transformaciones a aplicar
+            input_key: Modo por referencia: clave del original en el almacenamiento
+                       compartido (no se envían bytes; image_path se ignora)
+            output_key: Modo por referencia: clave donde el nodo escribe el resultado
         """
-        filename = os.path.basename(image_path)
-        print(f"[CLIENTE gRPC] Preparando solicitud gRPC para imagen: {filename}")
+        filename = os.path.basename(input_key or image_path)
+        debug = log.isEnabledFor(logging.DEBUG)
         
-        # LEER IMAGEN COMO BYTES
+        # LEER IMAGEN COMO BYTES (salvo por referencia)
         try:
-            with open(image_path, 'rb') as f:
-                image_bytes = f.read()
-            print(f"[CLIENTE gRPC] Imagen cargada: {len(image_bytes)} bytes")
+            if input_key:
+                image_bytes = b''
+            else:
+                with open(image_path, 'rb') as f:
+                    image_bytes = f.read()
+            if debug:
+                log.debug("Solicitud para imagen %s (%s): %s", image_id, filename,
+                          f'por referencia {input_key}' if input_key else f'{len(image_bytes)} bytes')
         except Exception as e:
-            print(f"[CLIENTE gRPC] Error leyendo imagen: {e}")
+            log.error("Error leyendo imagen %s: %s", filename, e)
             return {
                 'success': False,
                 'result_path': '',
@@ -49,7 +63,6 @@ class NodeClient:
         
         # CONVERSIÓN DE TRANSFORMACIONES
         proto_transformations = []
-        print(f"[CLIENTE gRPC] Convirtiendo {len(transformations)} transformaciones")
         
         for t in transformations:
             try:
@@ -60,7 +73,8 @@ class NodeClient:
                 if isinstance(parameters, dict):
                     parameters = json.dumps(parameters)
                 
-                print(f"[CLIENTE gRPC] → Transformación: {name} (ID: {transformation_id})")
+                if debug:
+                    log.debug("→ Transformación: %s (ID: %s)", name, transformation_id)
                 
                 proto_t = image_processing_pb2.Transformation(
                     transformation_id=transformation_id,
@@ -69,30 +83,35 @@ class NodeClient:
                 )
                 proto_transformations.append(proto_t)
             except Exception as e:
-                print(f"[CLIENTE gRPC] Error al procesar transformación: {e}")
+                log.warning("Error al procesar transformación: %s", e)
                 continue
         
         # CREAR SOLICITUD CON BYTES
         request = image_processing_pb2.ProcessRequest(
             image_id=image_id,
-            image_path=image_path,  # mantener por compatibilidad
+            image_path=image_path or '',  # mantener por compatibilidad
             filename=filename,       # nuevo: nombre del archivo
             image_data=image_bytes,  # nuevo: bytes de la imagen
-            transformations=proto_transformations
+            transformations=proto_transformations,
+            input_key=input_key,
+            output_key=output_key
         )
         
         try:
-            print(f"[CLIENTE gRPC] Enviando solicitud al nodo...")
-            
-            # ENVIAR SOLICITUD
+            # ENVIAR SOLICITUD (traceparent viaja en la metadata gRPC)
+            with tracing.span('grpc ProcessImage', kind='client',
+                              attributes={'image_id': image_id, 'request_bytes': len(image_bytes)}) as span:
 ####################################################################################################################################
-            response = self.stub.ProcessImage(request)
-            
-            print(f"[CLIENTE gRPC] Respuesta recibida del nodo")
-            print(f"[CLIENTE gRPC] → Éxito: {response.success}")
+                response = self.stub.ProcessImage(request, metadata=tracing.inject_metadata())
+                span.set_attribute('success', response.success)
             
-            if response.success and response.image_data:
-                print(f"[CLIENTE gRPC] → Imagen recibida: {len(response.image_data)} bytes")
+            if debug:
+                if response.success and response.result_key:
+                    log.debug("Respuesta del nodo (imagen %s): resultado en %s (%d bytes)",
+                              image_id, response.result_key, response.result_size)
+                else:
+                    log.debug("Respuesta del nodo (imagen %s): éxito=%s, %d bytes",
+                              image_id, response.success, len(response.image_data))
             
             # RETORNAR RESULTADO
             return {
@@ -100,11 +119,14 @@ class NodeClient:
                 'result_path': response.result_path,
                 'error_message': response.error_message,
                 'processing_time_ms': response.processing_time_ms,
-                'image_data': response.image_data
+                'image_data': response.image_data,
+                'result_key': response.result_key,
+                'result_size': response.result_size,
+                'result_sha256': response.result_sha256
             }
             
         except grpc.RpcError as e:
-            print(f"[CLIENTE gRPC] Error RPC: {e.details()}")
+            log.error("Error RPC (imagen %s): %s", image_id, e.details())
             return {
                 'success': False,
                 'error_message': f"Error de comunicación: {e.details()}",
@@ -113,7 +135,7 @@ class NodeClient:
                 'image_data': b''
             }
         except Exception as e:
-            print(f"[CLIENTE gRPC] Error: {e}")
+            log.error("Error (imagen %s): %s", image_id, e)
             return {
                 'success': False,
                 'error_message': f"Error: {str(e)}",
@@ -133,17 +155,29 @@ class NodeClient:
             return {
                 'status': response.status,
                 'cpu_usage': response.cpu_usage,
-                'memory_usage': response.memory_usage
+                'memory_usage': response.memory_usage,
+                'cpu_per_core': list(response.cpu_per_core),
+                'rss_bytes': response.rss_bytes,
+                'in_flight_jobs': response.in_flight_jobs,
+                'queue_depth': response.queue_depth,
+                'max_concurrent_jobs': response.max_concurrent_jobs,
+                'jobs_completed': response.jobs_completed,
+                'jobs_failed': response.jobs_failed,
+                'latency_p50_ms': response.latency_p50_ms,
+                'latency_p95_ms': response.latency_p95_ms,
+                'latency_p99_ms': response.latency_p99_ms,
+                'pixels_per_second': response.pixels_per_second,
+                'local_input_ratio': response.local_input_ratio
             }
         except grpc.RpcError as e:
-            print(f"[CLIENTE gRPC] Error RPC: {e.details()}")
+            log.warning("Error RPC en GetNodeStatus (nodo %s): %s", node_id, e.details())
             return {
                 'status': 'error',
                 'cpu_usage': 0,
                 'memory_usage': 0
             }
         except Exception as e:
-            print(f"[CLIENTE gRPC] Error: {e}")
+            log.warning("Error en GetNodeStatus (nodo %s): %s", node_id, e)
             return {
                 'status': 'error',
                 'cpu_usage': 0,
@@ -1,9 +1,14 @@
 # Archivo: server/load_balancer.py
 # BALANCEADOR DE CARGA CON DISTRIBUCIÓN POR PESO Y HEALTH CHECK
 
+import logging
 import threading
 from datetime import datetime, timedelta
 
+from logger import get_logger
+
+log = get_logger('LOAD BALANCER')
+
 class LoadBalancer:
     """
     Distribuye trabajo entre nodos balanceando el PESO TOTAL
@@ -49,7 +54,7 @@ class LoadBalancer:
             
         except Exception as e:
             # Cualquier error = nodo no disponible
-            # print(f"[LOAD BALANCER]   Health check failed: {e}")
+            log.debug("Health check de %s falló: %s", node.get('node_name'), e)
             return False
     
     def get_available_nodes(self):
@@ -66,21 +71,19 @@ class LoadBalancer:
                 return self.nodes_cache
             
             # Refrescar caché
-            print("[LOAD BALANCER] Actualizando lista de nodos...")
+            log.debug("Actualizando lista de nodos...")
             
  ###########################################################################################################################
             success, all_nodes = self.rest_client.get_active_nodes()
 
             
             if not success or not all_nodes:
-                print(f"[LOAD BALANCER] ⚠ No se pudieron obtener nodos de la DB")
+                log.warning("⚠ No se pudieron obtener nodos de la DB")
                 return []
             
             # ⭐ NUEVO: Verificar conectividad de cada nodo
             verified_nodes = []
             
-            print(f"[LOAD BALANCER] Verificando {len(all_nodes)} nodos...")
-            
             for node in all_nodes:
                 node_address = f"{node['ip_address']}:{node['port']}"
 
@@ -89,9 +92,9 @@ class LoadBalancer:
                 if self._check_node_health(node):
                     verified_nodes.append(node)
 ####################################################################################################################################                    
-                    print(f"[LOAD BALANCER]   ✓ {node['node_name']} ({node_address}): ACTIVO")
+                    log.debug("✓ %s (%s): ACTIVO", node['node_name'], node_address)
                 else:
-                    print(f"[LOAD BALANCER]   ✗ {node['node_name']} ({node_address}): NO RESPONDE")
+                    log.warning("✗ %s (%s): NO RESPONDE", node['node_name'], node_address)
             
             # Eliminar duplicados por puerto (por si acaso)
             seen_ports = {}
@@ -113,20 +116,19 @@ class LoadBalancer:
                         unique_nodes.remove(existing)
                         unique_nodes.append(node)
                         seen_ports[port_key] = node
-                        print(f"[LOAD BALANCER]   ⚠ Puerto duplicado {port_key}: "
-                              f"Usando {node['node_name']} (más reciente)")
+                        log.warning("⚠ Puerto duplicado %s: usando %s (más reciente)", port_key, node['node_name'])
             
             # Actualizar caché
             self.nodes_cache = unique_nodes
             self.cache_time = datetime.now()
             
             if len(unique_nodes) == 0:
-                print(f"[LOAD BALANCER] ⚠ NO HAY NODOS ACTIVOS")
+                log.warning("⚠ NO HAY NODOS ACTIVOS")
             else:
-                print(f"[LOAD BALANCER] ✅ {len(unique_nodes)} nodos activos verificados:")
-                for node in unique_nodes:
-                    print(f"  - {node['node_name']}: {node['ip_address']}:{node['port']} "
-                          f"(weight: {node.get('weight', 1)})")
+                log.info("✅ %d nodos activos verificados: %s", len(unique_nodes), ', '.join(
+                    f"{node['node_name']} ({node['ip_address']}:{node['port']}, weight {node.get('weight', 1)})"
+                    for node in unique_nodes
+                ))
             
             return unique_nodes
     
@@ -161,8 +163,7 @@ class LoadBalancer:
         if not nodes:
             raise Exception("No hay nodos disponibles")
         
-        print(f"\n[LOAD BALANCER] Distribuyendo {len(jobs)} trabajos entre {len(nodes)} nodos")
-        print("[LOAD BALANCER] Algoritmo: Greedy Partition by Weight")
+        log.debug("Distribuyendo %d trabajos entre %d nodos (Greedy Partition by Weight)", len(jobs), len(nodes))
         
         # Inicializar bins (uno por nodo)
         bins = []
@@ -179,8 +180,6 @@ class LoadBalancer:
         sorted_jobs = sorted(jobs, key=lambda x: x.get('file_size', 0), reverse=True)
         
         total_size = sum(job.get('file_size', 0) for job in sorted_jobs)
-        print(f"[LOAD BALANCER] Peso total: {self._format_bytes(total_size)}")
-        
         # Algoritmo Greedy: Asignar cada trabajo al bin con menos peso acumulado
         for job in sorted_jobs:
             # Encontrar el bin con menor peso (considerando el weight_factor del nodo)
@@ -191,17 +190,14 @@ class LoadBalancer:
             min_bin['total_weight'] += job.get('file_size', 0)
         
         # Mostrar distribución
-        print("\n[LOAD BALANCER] Distribución resultante:")
-        for i, bin_info in enumerate(bins):
-            node = bin_info['node']
-            num_jobs = len(bin_info['jobs'])
-            total_weight = bin_info['total_weight']
-            percentage = (total_weight / total_size * 100) if total_size > 0 else 0
-            
-            print(f"  Nodo {i+1} ({node['node_name']}):")
-            print(f"    • Trabajos:    {num_jobs}")
-            print(f"    • Peso total:  {self._format_bytes(total_weight)} ({percentage:.1f}%)")
-            print(f"    • Weight:      {node.get('weight', 1)}")
+        if log.isEnabledFor(logging.DEBUG):
+            for i, bin_info in enumerate(bins):
+                node = bin_info['node']
+                total_weight = bin_info['total_weight']
+                percentage = (total_weight / total_size * 100) if total_size > 0 else 0
+                log.debug("Nodo %d (%s): %d trabajos, %s de %s (%.1f%%), weight %s",
+                          i + 1, node['node_name'], len(bin_info['jobs']), self._format_bytes(total_weight),
+                          self._format_bytes(total_size), percentage, node.get('weight', 1))
         
         # Convertir a lista de tuplas (job, node)
         assignments = []
@@ -209,10 +205,55 @@ class LoadBalancer:
             for job in bin_info['jobs']:
                 assignments.append((job, bin_info['node']))
         
-        print(f"\n[LOAD BALANCER] ✓ {len(assignments)} trabajos distribuidos")
-        
+        log.debug("✓ %d trabajos distribuidos", len(assignments))
+
         return assignments
-    
+
+    def start_distribution(self, nodes=None):
+        """
+        Inicia una distribución incremental (modo pipeline)
+
+        A diferencia de distribute_jobs, los trabajos no se conocen de antemano:
+        se asignan uno a uno con assign_job a medida que van llegando.
+
+        Args:
+            nodes: Lista de nodos a usar (por defecto get_available_nodes())
+
+        Returns:
+            Lista de bins con el peso acumulado por nodo
+        """
+        if nodes is None:
+            nodes = self.get_available_nodes()
+
+        if not nodes:
+            raise Exception("No hay nodos disponibles")
+
+        return [
+            {
+                'node': node,
+                'jobs': 0,
+                'total_weight': 0,
+                'weight_factor': node.get('weight', 1) or 1
+            }
+            for node in nodes
+        ]
+
+    def assign_job(self, bins, job):
+        """
+        Asigna un trabajo al nodo con menor peso acumulado (Greedy online)
+
+        Args:
+            bins: Estado devuelto por start_distribution
+            job: Trabajo con 'file_size'
+
+        Returns:
+            dict: Nodo asignado
+        """
+        min_bin = min(bins, key=lambda b: b['total_weight'] / b['weight_factor'])
+        min_bin['jobs'] += 1
+        min_bin['total_weight'] += job.get('file_size', 0)
+        return min_bin['node']
+
     def select_node(self):
         """
         Método legacy para compatibilidad
@@ -222,7 +263,7 @@ class LoadBalancer:
         nodes = self.get_available_nodes()
         
         if not nodes:
-            print("[LOAD BALANCER] ✗ No hay nodos disponibles")
+            log.warning("✗ No hay nodos disponibles")
             return None
         
         # Algoritmo de Weighted Least Connections
@@ -244,7 +285,7 @@ class LoadBalancer:
                 best_node = node
         
         if best_node:
-            print(f"[LOAD BALANCER] ✓ Nodo seleccionado: {best_node['node_name']}")
+            log.debug("✓ Nodo seleccionado: %s", best_node['node_name'])
         
         return best_node
     
@@ -261,7 +302,7 @@ class LoadBalancer:
         with self.cache_lock:
             self.cache_time = None
             self.nodes_cache = []
-            print("[LOAD BALANCER] Caché invalidado")
+            log.debug("Caché invalidado")
     
     @staticmethod
     def _format_bytes(bytes_size):
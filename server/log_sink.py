@@ -0,0 +1,155 @@
+# Archivo: server/log_sink.py
+# SUMIDERO ASÍNCRONO DE LOGS DE EJECUCIÓN (execution_logs)
+
+import queue
+import threading
+import time
+
+from logger import get_logger
+
+log = get_logger('LOG SINK')
+
+class LogSink:
+    """
+    Recibe logs sin bloquear y los envía en bloques al DB Service
+
+    submit() nunca hace I/O: encola el registro en una cola acotada y
+    retorna. Si la cola está llena el log se descarta y se cuenta en
+    'dropped' (el procesamiento de imágenes nunca espera por un log).
+    Un thread propio arma bloques de hasta batch_size registros o de lo
+    acumulado en flush_interval segundos y los envía con send_batch.
+    """
+
+    def __init__(self, send_batch, max_queue=10000, batch_size=200,
+                 flush_interval=0.5, max_retries=3):
+        """
+        Args:
+            send_batch: Función que recibe una lista de logs y retorna (success, result)
+            max_queue: Capacidad de la cola (backlog máximo)
+            batch_size: Logs por envío
+            flush_interval: Segundos máximos que un log espera antes de enviarse
+            max_retries: Reintentos de un bloque antes de descartarlo
+        """
+        self.send_batch = send_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._unfinished = 0
+        self._done = threading.Condition()
+        self._closed = False
+
+        self.submitted = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+        self._thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """
+        Encolar un log sin bloquear
+
+        Returns:
+            bool: False si se descartó por cola llena o sink cerrado
+        """
+        with self._done:
+            if self._closed:
+                self.dropped += 1
+                return False
+
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                return False
+
+            self._unfinished += 1
+            self.submitted += 1
+            return True
+
+    def flush(self, timeout=10):
+        """
+        Esperar a que todo lo encolado hasta ahora se haya enviado
+
+        Returns:
+            bool: True si el backlog quedó vacío dentro del timeout
+        """
+        deadline = time.time() + timeout
+        with self._done:
+            while self._unfinished > 0:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._done.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Enviar lo pendiente y detener el thread"""
+        self.flush(timeout)
+        self._closed = True
+        self._thread.join(timeout=self.flush_interval * 2 + 1)
+
+    def stats(self):
+        """Contadores del sink"""
+        return {
+            'backlog': self._queue.qsize(),
+            'submitted': self.submitted,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'failed_batches': self.failed_batches
+        }
+
+    def _task_done(self, count):
+        with self._done:
+            self._unfinished -= count
+            if self._unfinished <= 0:
+                self._done.notify_all()
+
+    def _next_batch(self):
+        """Armar un bloque: espera el primer log y junta lo que llegue hasta flush_interval"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Loop del thread de envío"""
+        while not (self._closed and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            for attempt in range(self.max_retries):
+                try:
+                    success, result = self.send_batch(batch)
+                except Exception as e:
+                    success, result = False, {'error': str(e)}
+
+                if success:
+                    self.sent += len(batch)
+                    break
+
+                self.failed_batches += 1
+                log.warning("Error enviando %d logs (intento %d/%d): %s",
+                            len(batch), attempt + 1, self.max_retries, result.get('error'))
+                time.sleep(self.flush_interval * (attempt + 1))
+            else:
+                with self._done:
+                    self.dropped += len(batch)
+
+            self._task_done(len(batch))
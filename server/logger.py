@@ -0,0 +1,197 @@
+# Archivo: server/logger.py
+# LOGS CON NIVELES, MUESTREO, FORMATO JSON Y ESCRITURA EN UN THREAD APARTE
+#
+# Mantener igual en backend_rest/, server/, db_service/ y node/: cada
+# servicio se despliega desde su propio directorio.
+#
+# Cada etiqueta de los logs ([NODO], [PROCESADOR], [CLIENTE gRPC], ...) es
+# un logger. Con el nivel apagado, log.debug(...) solo compara un entero:
+# no arma el mensaje ni toca stdout. Lo que se emite se encola y un thread
+# propio (QueueListener) lo formatea y escribe, así el thread que procesa
+# una imagen nunca espera a stdout. Si la cola se llena los registros se
+# descartan (log_records_dropped_total) en lugar de bloquear.
+#
+# Variables de entorno:
+#   LOG_LEVEL        DEBUG, INFO (por defecto), WARNING o ERROR
+#   LOG_LEVELS       Nivel por etiqueta: "PROCESADOR=WARNING,CLIENTE gRPC=DEBUG"
+#                    (las librerías de QUIET_LOGGERS quedan en WARNING salvo
+#                    que se nombren acá)
+#   LOG_FORMAT       text (por defecto) o json (un objeto por línea)
+#   LOG_SAMPLE_RATE  Fracción de los registros DEBUG/INFO que se emiten (1.0);
+#                    WARNING y superiores se emiten siempre
+#   LOG_QUEUE_SIZE   Registros en espera antes de descartar (10000)
+#
+# Uso:
+#   log = get_logger('NODO')
+#   log.debug("Transformación %s (ID: %s)", name, transformation_id)
+#   log.info("Completado en %.2f ms", ms, extra={'image_id': image_id})
+#
+# Pasar los valores como argumentos y no en un f-string: el mensaje se arma
+# recién en el thread de escritura y solo si el nivel está habilitado. Por
+# lo mismo los argumentos deben ser valores que no cambien después.
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from metrics import counter
+
+LOG_RECORDS_DROPPED = counter('log_records_dropped_total', 'Logs descartados con la cola llena')
+
+# Atributos propios de LogRecord; el resto viene de extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'taskName', 'trace_id', 'span_id'
+}
+
+# Librerías que con LOG_LEVEL=DEBUG taparían los logs propios
+QUIET_LOGGERS = ('PIL', 'urllib3', 'botocore', 'boto3', 's3transfer', 'grpc')
+
+_lock = threading.Lock()
+_service = os.getenv('SERVICE_NAME') or os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+_handler = None
+_listener = None
+
+def _extra_fields(record):
+    return {key: value for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_')}
+
+class TextFormatter(logging.Formatter):
+    """2026-01-01 12:00:00,000 INFO    [NODO] mensaje key=valor"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s [%(name)s] %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extra = _extra_fields(record)
+        if extra:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in extra.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea (ts, level, service, logger, msg, extra, trace)"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'service': _service,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName
+        }
+        trace_id = getattr(record, 'trace_id', None)
+        if trace_id is not None:
+            entry['trace_id'] = trace_id
+            entry['span_id'] = record.span_id
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _SampleFilter(logging.Filter):
+    """
+    Muestreo y contexto de traza, en el thread que loguea
+
+    Solo corre para registros que pasaron el nivel. Los de WARNING en
+    adelante no se muestrean.
+    """
+
+    def __init__(self, sample_rate):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING and self.sample_rate < 1.0:
+            if random.random() >= self.sample_rate:
+                return False
+
+        # tracing es opcional: si el servicio lo cargó, anotar la traza activa
+        tracing = sys.modules.get('tracing')
+        if tracing is not None:
+            context = tracing.current_context()
+            if context is not None:
+                record.trace_id = context.trace_id
+                record.span_id = context.span_id
+        return True
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Encola el registro sin formatearlo; con la cola llena lo descarta"""
+
+    def prepare(self, record):
+        # El formateo (getMessage, traceback) queda para el thread de escritura
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+def _parse_level(name, default=logging.INFO):
+    level = logging.getLevelName(str(name).strip().upper())
+    return level if isinstance(level, int) else default
+
+def _start_listener():
+    """Cola y thread de escritura nuevos (al configurar y en el hijo de un fork)"""
+    global _listener
+    _handler.queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if os.getenv('LOG_FORMAT', 'text').lower() == 'json' else TextFormatter())
+    _listener = QueueListener(_handler.queue, stream)
+    _listener.start()
+
+def _stop_listener():
+    """Escribir lo encolado antes de salir"""
+    if _listener is None or _listener._thread is None:
+        return
+    try:
+        _listener.stop()
+    except queue.Full:
+        pass
+
+def setup_logging(service=None):
+    """
+    Configurar los logs del proceso (idempotente)
+
+    Lo llama get_logger la primera vez; el punto de entrada del servicio
+    puede llamarlo antes para fijar el nombre (p. ej. 'node-1').
+    """
+    global _service, _handler
+    with _lock:
+        if service:
+            _service = service
+        if _handler is not None:
+            return
+
+        root = logging.getLogger()
+        root.setLevel(_parse_level(os.getenv('LOG_LEVEL', 'INFO')))
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+        for entry in os.getenv('LOG_LEVELS', '').split(','):
+            name, _, level = entry.rpartition('=')
+            if name.strip():
+                logging.getLogger(name.strip()).setLevel(_parse_level(level))
+
+        _handler = _NonBlockingQueueHandler(queue.Queue())
+        _handler.addFilter(_SampleFilter(float(os.getenv('LOG_SAMPLE_RATE', '1.0'))))
+        root.addHandler(_handler)
+
+        _start_listener()
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            # El thread de escritura no sobrevive al fork (workers de gunicorn)
+            os.register_at_fork(after_in_child=_start_listener)
+
+def get_logger(name):
+    """Logger de una etiqueta ('NODO', 'PROCESADOR', 'DOWNLOAD', ...)"""
+    if _handler is None:
+        setup_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,327 @@
+# Archivo: server/object_store.py
+# ALMACENAMIENTO DE OBJETOS: DISCO LOCAL O S3 COMPATIBLE (MinIO)
+#
+# Mantener igual en server/, db_service/ y node/: cada servicio se
+# despliega desde su propio directorio.
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+from logger import get_logger
+
+log = get_logger('STORAGE')
+
+CHUNK_SIZE = 1024 * 1024
+
+def content_key(digest, prefix='cas', extension=''):
+    """Clave direccionada por contenido: {prefix}/ab/abcdef....ext"""
+    return f'{prefix}/{digest[:2]}/{digest}{extension}'
+
+class LocalStore:
+    """
+    Objetos como archivos bajo un directorio raíz
+
+    Las claves son rutas relativas ('batch_7/foto_processed.jpg'), así las
+    filas existentes de processed_results.storage_path siguen siendo válidas.
+    Toda escritura va a un temporal y se publica con os.replace (atómico).
+    """
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def local_path(self, key):
+        """Ruta en disco de una clave (ValueError si sale de la raíz)"""
+        path = os.path.realpath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f'Clave fuera del almacenamiento: {key}')
+        return path
+
+    def _write(self, key, writer):
+        path = self.local_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer(f)
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return key
+
+    def put_bytes(self, key, data, metadata=None):
+        """Guardar bytes en una clave"""
+        return self._write(key, lambda f: f.write(data))
+
+    def put_stream(self, key, fileobj, metadata=None):
+        """Guardar el contenido de un file-like (copia por bloques)"""
+        return self._write(key, lambda f: shutil.copyfileobj(fileobj, f, CHUNK_SIZE))
+
+    def put_file(self, key, file_path, metadata=None, move=False):
+        """Guardar un archivo local (move=True lo mueve en lugar de copiarlo)"""
+        if move:
+            path = self.local_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.replace(file_path, path)
+                return key
+            except OSError:
+                pass    # Otro filesystem: copiar y borrar
+
+        with open(file_path, 'rb') as source:
+            self.put_stream(key, source)
+        if move:
+            os.remove(file_path)
+        return key
+
+    def open(self, key):
+        """Abrir para lectura (file-like posicionable)"""
+        return open(self.local_path(key), 'rb')
+
+    def iter_chunks(self, key, chunk_size=CHUNK_SIZE):
+        """Leer un objeto por bloques sin cargarlo entero"""
+        with self.open(key) as f:
+            for block in iter(lambda: f.read(chunk_size), b''):
+                yield block
+
+    def read_bytes(self, key):
+        with self.open(key) as f:
+            return f.read()
+
+    def head(self, key):
+        """Metadatos de un objeto ({'size', 'mtime'}) o None si no existe"""
+        try:
+            stat = os.stat(self.local_path(key))
+        except (OSError, ValueError):
+            return None
+        return {'size': stat.st_size, 'mtime': stat.st_mtime, 'metadata': {}}
+
+    def exists(self, key):
+        return self.head(key) is not None
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def presigned_url(self, key, expires=3600):
+        """Sin URLs firmadas en disco local: se sirve el archivo directamente"""
+        return None
+
+    def put_content(self, data, prefix='cas', extension=''):
+        """
+        Guardar bytes bajo una clave derivada de su SHA-256
+
+        Returns:
+            tuple: (clave, sha256, tamaño). Si el contenido ya existe no se reescribe.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        key = content_key(digest, prefix, extension)
+        if not self.exists(key):
+            self.put_bytes(key, data)
+        return key, digest, len(data)
+
+class _S3RangeReader(io.RawIOBase):
+    """File-like posicionable sobre un objeto S3 (cada read() es un GET con Range)"""
+
+    def __init__(self, client, bucket, key, size):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.size or len(buffer) == 0:
+            return 0
+        end = min(self.position + len(buffer), self.size) - 1
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self.key,
+            Range=f'bytes={self.position}-{end}'
+        )
+        data = response['Body'].read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+class S3Store:
+    """
+    Objetos en un bucket S3 compatible (AWS, MinIO, ...)
+
+    Usa boto3 (dependencia opcional: solo se importa con STORAGE_BACKEND=s3).
+    Direccionamiento path-style para que funcione con MinIO y similares.
+    Los archivos grandes se suben en multipart (TransferConfig).
+    """
+
+    def __init__(self, bucket, endpoint_url=None, access_key=None, secret_key=None,
+                 region='us-east-1', multipart_threshold=8 * 1024 * 1024,
+                 multipart_chunksize=8 * 1024 * 1024, create_bucket=True):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config as BotoConfig
+        except ImportError:
+            raise RuntimeError('STORAGE_BACKEND=s3 requiere el paquete boto3 (pip install boto3)')
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region,
+            config=BotoConfig(s3={'addressing_style': 'path'}, max_pool_connections=32)
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize
+        )
+        self._client_error = self.client.exceptions.ClientError
+
+        if create_bucket:
+            self._ensure_bucket()
+
+    def _is_not_found(self, error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NoSuchBucket', 'NotFound')
+
+    def _ensure_bucket(self):
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except self._client_error as e:
+            if not self._is_not_found(e):
+                raise
+            self.client.create_bucket(Bucket=self.bucket)
+            log.info("Bucket %s creado", self.bucket)
+
+    def local_path(self, key):
+        """Los objetos S3 no tienen ruta local"""
+        return None
+
+    def put_bytes(self, key, data, metadata=None):
+        return self.put_stream(key, io.BytesIO(data), metadata)
+
+    def put_stream(self, key, fileobj, metadata=None):
+        """Subir un file-like (multipart automático si supera el umbral)"""
+        self.client.upload_fileobj(
+            fileobj, self.bucket, key,
+            ExtraArgs={'Metadata': metadata or {}},
+            Config=self.transfer_config
+        )
+        return key
+
+    def put_file(self, key, file_path, metadata=None, move=False):
+        self.client.upload_file(
+            file_path, self.bucket, key,
+            ExtraArgs={'Metadata': metadata or {}},
+            Config=self.transfer_config
+        )
+        if move:
+            os.remove(file_path)
+        return key
+
+    def open(self, key):
+        head = self.head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return io.BufferedReader(
+            _S3RangeReader(self.client, self.bucket, key, head['size']),
+            buffer_size=CHUNK_SIZE
+        )
+
+    def iter_chunks(self, key, chunk_size=CHUNK_SIZE):
+        response = self.client.get_object(Bucket=self.bucket, Key=key)
+        for block in response['Body'].iter_chunks(chunk_size):
+            yield block
+
+    def read_bytes(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+
+    def head(self, key):
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except self._client_error as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return {
+            'size': response['ContentLength'],
+            'mtime': response['LastModified'].timestamp(),
+            'etag': response.get('ETag', '').strip('"'),
+            'metadata': response.get('Metadata', {})
+        }
+
+    def exists(self, key):
+        return self.head(key) is not None
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presigned_url(self, key, expires=3600):
+        """URL temporal de descarga directa (soporta Range y ETag del lado de S3)"""
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=expires
+        )
+
+    def put_content(self, data, prefix='cas', extension=''):
+        digest = hashlib.sha256(data).hexdigest()
+        key = content_key(digest, prefix, extension)
+        if not self.exists(key):
+            self.put_bytes(key, data, metadata={'sha256': digest})
+        return key, digest, len(data)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(default_root):
+    """
+    Crear (una vez por proceso) el almacenamiento según variables de entorno
+
+        STORAGE_BACKEND   'local' (por defecto) o 's3'
+        STORAGE_ROOT      Raíz del backend local (por defecto default_root)
+        S3_BUCKET, S3_ENDPOINT_URL, S3_ACCESS_KEY, S3_SECRET_KEY, S3_REGION
+    """
+    backend = os.getenv('STORAGE_BACKEND', 'local').lower()
+
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == 's3':
+                store = S3Store(
+                    bucket=os.getenv('S3_BUCKET', 'image-processing'),
+                    endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+                    access_key=os.getenv('S3_ACCESS_KEY') or None,
+                    secret_key=os.getenv('S3_SECRET_KEY') or None,
+                    region=os.getenv('S3_REGION', 'us-east-1')
+                )
+            else:
+                store = LocalStore(os.getenv('STORAGE_ROOT', default_root))
+            log.info("Backend: %s", type(store).__name__)
+            _stores[backend] = store
+        return _stores[backend]
@@ -1,38 +1,91 @@
 # Archivo: server/rest_client.py
 # ACTUALIZADO: Agregar métodos para usuarios
 
+import re
+import time
 import requests
 import json
 from typing import Dict, List, Optional
 
+from write_behind import WriteBehindBuffer
+from log_sink import LogSink
+from metrics import histogram
+from logger import get_logger
+import tracing
+
+log = get_logger('REST CLIENT')
+
+REQUEST_SECONDS = histogram(
+    'rest_client_request_seconds', 'Latencia de las llamadas al DB Service',
+    ['method', 'endpoint', 'status']
+)
+
+# Ids numéricos de la ruta -> :id (una serie por endpoint, no por recurso)
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
 class RestClient:
     """Cliente REST para interactuar con el servicio DB"""
     
-    def __init__(self, base_url='http://localhost:5000'):
+    def __init__(self, base_url='http://localhost:5000', flush_size=50, flush_interval=0.5,
+                 log_queue_size=10000, log_batch_size=200):
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
         self.session.headers.update({'Content-Type': 'application/json'})
+        
+        # Buffer write-behind: los resultados por imagen se envían en bloque
+        self.results_buffer = WriteBehindBuffer(
+            'results', self._send_results_batch,
+            max_items=flush_size, flush_interval=flush_interval
+        )
+        
+        # Heartbeats de nodos: se reenvían en bloque a /api/nodes/heartbeats
+        self.heartbeats_buffer = WriteBehindBuffer(
+            'heartbeats', self._send_heartbeats_batch,
+            max_items=flush_size, flush_interval=flush_interval, max_retries=1
+        )
+        
+        # Sumidero de logs: create_log nunca bloquea, los logs viajan en bloque
+        self.log_sink = LogSink(
+            self._send_logs_batch,
+            max_queue=log_queue_size, batch_size=log_batch_size,
+            flush_interval=flush_interval
+        )
     
     def _make_request(self, method, endpoint, data=None, params=None):
         """Método interno para hacer requests HTTP"""
         url = f"{self.base_url}{endpoint}"
+        route = _ID_SEGMENT.sub('/:id', endpoint)
+        start = time.perf_counter()
+        status = 'error'
         
-        try:
-            if method == 'GET':
-                response = self.session.get(url, params=params)
-            elif method == 'POST':
-                response = self.session.post(url, json=data)
-            elif method == 'PUT':
-                response = self.session.put(url, json=data)
-            elif method == 'DELETE':
-                response = self.session.delete(url)
-            
-            response.raise_for_status()
-            return True, response.json()
-            
-        except requests.exceptions.RequestException as e:
-            print(f"[REST CLIENT] Error: {e}")
-            return False, {'error': str(e)}
+        # Span de cliente; el DB Service continúa la traza con el header traceparent
+        with tracing.span(f'http {method} {route}', kind='client') as span:
+            headers = tracing.inject()
+            try:
+                if method == 'GET':
+                    response = self.session.get(url, params=params, headers=headers)
+                elif method == 'POST':
+                    response = self.session.post(url, json=data, headers=headers)
+                elif method == 'PUT':
+                    response = self.session.put(url, json=data, headers=headers)
+                elif method == 'DELETE':
+                    response = self.session.delete(url, headers=headers)
+                
+                status = response.status_code
+                span.set_attribute('http.status_code', status)
+                response.raise_for_status()
+                return True, response.json()
+                
+            except requests.exceptions.RequestException as e:
+                log.warning("%s %s: %s", method, endpoint, e)
+                span.set_error(e)
+                error = {'error': str(e)}
+                if isinstance(status, int):
+                    # El servidor respondió (4xx/5xx): distinto de no poder conectarse
+                    error['status_code'] = status
+                return False, error
+            finally:
+                REQUEST_SECONDS.labels(method, route, status).observe(time.perf_counter() - start)
     
     # ============= MÉTODOS PARA USUARIOS (NUEVO) =============
     
@@ -77,6 +130,14 @@ class RestClient:
         """Obtener información de lote"""
         return self._make_request('GET', f'/api/batches/{batch_id}')
     
+    def get_batch_progress(self, batch_id: int):
+        """Obtener contadores de progreso del lote (total, exitosas, fallidas, bytes, tiempo)"""
+        return self._make_request('GET', f'/api/batches/{batch_id}/progress')
+    
+    def get_batch_metrics(self, batch_id: int):
+        """Obtener progreso y métricas materializadas del lote (por nodo, latencia, throughput)"""
+        return self._make_request('GET', f'/api/batches/{batch_id}/metrics')
+    
     def update_batch_status(self, batch_id: int, status: str, 
                            processed_images: Optional[int] = None):
         """Actualizar estado de lote"""
@@ -131,8 +192,16 @@ class RestClient:
     def add_image_result(self, image_id: int, node_id: int, 
                         result_filename: str, storage_path: str,
                         processing_time_ms: int, status: str = 'success',
-                        error_message: str = '', **kwargs):
-        """Registrar resultado procesado"""
+                        error_message: str = '', deferred: bool = False,
+                        mark_processed: bool = False, **kwargs):
+        """
+        Registrar resultado procesado
+        
+        Con deferred=True el resultado se encola en el buffer write-behind y se
+        envía en bloque a /api/images/results/batch. mark_processed=True además
+        marca la imagen como procesada en la misma operación (reemplaza a
+        mark_image_processed).
+        """
         data = {
             'node_id': node_id,
             'result_filename': result_filename,
@@ -142,7 +211,23 @@ class RestClient:
             'error_message': error_message,
             **kwargs
         }
-        return self._make_request('POST', f'/api/images/{image_id}/result', data=data)
+        
+        if deferred:
+            self.results_buffer.add({
+                'image_id': image_id,
+                'mark_processed': mark_processed,
+                **data
+            })
+            return True, {'queued': True}
+        
+        success, result = self._make_request('POST', f'/api/images/{image_id}/result', data=data)
+        if success and mark_processed:
+            self.mark_image_processed(image_id)
+        return success, result
+    
+    def _send_results_batch(self, results: list):
+        """Enviar un bloque de resultados (usado por el buffer write-behind)"""
+        return self._make_request('POST', '/api/images/results/batch', data={'results': results})
     
     # ============= MÉTODOS PARA NODES =============
     
@@ -152,8 +237,15 @@ class RestClient:
     
     def update_node_heartbeat(self, node_id: int, ip_address: str = None, port: int = None, 
                             cpu_cores: int = None, ram_gb: float = None, 
-                            current_load: int = None, status: str = None):
-        """Actualizar heartbeat de nodo"""
+                            current_load: int = None, status: str = None,
+                            max_concurrent_jobs: int = None, telemetry: dict = None,
+                            deferred: bool = False):
+        """
+        Actualizar heartbeat de nodo
+        
+        Con deferred=True el heartbeat se encola y viaja en bloque (un POST
+        a /api/nodes/heartbeats por tanda) sin esperar al DB Service.
+        """
         data = {}
         if status:
             data['status'] = status
@@ -167,8 +259,21 @@ class RestClient:
             data['ram_gb'] = ram_gb
         if current_load is not None:
             data['current_load'] = current_load
+        if max_concurrent_jobs:
+            data['max_concurrent_jobs'] = max_concurrent_jobs
+        if telemetry:
+            data['telemetry'] = telemetry
+        
+        if deferred:
+            self.heartbeats_buffer.add({'node_id': node_id, **data})
+            return True, {'queued': True}
+        
         return self._make_request('PUT', f'/api/nodes/{node_id}/heartbeat', data=data)
     
+    def _send_heartbeats_batch(self, heartbeats: list):
+        """Enviar un bloque de heartbeats (usado por el buffer write-behind)"""
+        return self._make_request('POST', '/api/nodes/heartbeats', data={'heartbeats': heartbeats})
+    
     # ============= MÉTODOS PARA TRANSFORMATIONS =============
     
     def get_all_transformations(self):
@@ -183,7 +288,12 @@ class RestClient:
     
     def create_log(self, node_id=None, batch_id=None, image_id=None, 
                    log_level='info', message=''):
-        """Crear log en execution_logs"""
+        """
+        Crear log en execution_logs
+        
+        No hace I/O: el log se encola en el sumidero y se envía en bloque
+        a /api/logs/batch. Si la cola está llena el log se descarta.
+        """
         data = {
             'node_id': node_id,
             'batch_id': batch_id,
@@ -191,7 +301,15 @@ class RestClient:
             'log_level': log_level,  # 'info', 'warning', 'error', 'debug'
             'message': message
         }
-        return self._make_request('POST', '/api/logs', data=data)
+        
+        if self.log_sink.submit(data):
+            return True, {'queued': True}
+        
+        return False, {'error': 'Log descartado: cola de logs llena'}
+    
+    def _send_logs_batch(self, logs: list):
+        """Enviar un bloque de logs (usado por el sumidero de logs)"""
+        return self._make_request('POST', '/api/logs/batch', data={'logs': logs})
 
     def get_batch_logs(self, batch_id):
         """Obtener logs de un lote"""
@@ -212,4 +330,34 @@ class RestClient:
 
     def mark_image_processed(self, image_id: int):
         """Marcar imagen como procesada (actualiza processed_at)"""
-        return self._make_request('PUT', f'/api/images/{image_id}/processed')
\ No newline at end of file
+        return self._make_request('PUT', f'/api/images/{image_id}/processed')
+
+    # ============= WRITE-BEHIND =============
+    
+    def flush_pending(self):
+        """
+        Enviar todo lo que esté en el buffer de resultados y el sumidero de logs
+        
+        Se llama al terminar un lote para que resultados y logs estén en DB
+        antes de cerrar el estado del lote.
+        
+        Returns:
+            bool: True si ambos quedaron vacíos
+        """
+        results_ok = self.results_buffer.flush()
+        logs_ok = self.log_sink.flush()
+        return results_ok and logs_ok
+    
+    def write_behind_stats(self):
+        """Contadores de los buffers de resultados y heartbeats y del sumidero de logs"""
+        return {
+            'results': self.results_buffer.stats(),
+            'heartbeats': self.heartbeats_buffer.stats(),
+            'logs': self.log_sink.stats()
+        }
+    
+    def close(self):
+        """Vaciar buffers y detener sus threads (apagado del servidor)"""
+        self.results_buffer.close()
+        self.heartbeats_buffer.close()
+        self.log_sink.close()
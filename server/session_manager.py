@@ -1,21 +1,37 @@
 # Archivo: server/session_manager.py
 # Gestor de sesiones para el servidor SOAP
 
+import threading
 import uuid
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Optional
+
+from logger import get_logger
+from session_store import MemorySessionStore
+
+log = get_logger('SESSION')
 
 class SessionManager:
     """
-    Gestor de sesiones simple en memoria
+    Gestor de sesiones sobre un almacén intercambiable
     
-    En producción esto debería estar en Redis o base de datos,
-    pero para desarrollo esto funciona perfectamente.
+    Por defecto las sesiones viven en memoria (MemorySessionStore, con
+    expiración por heap y tope LRU); con RedisSessionStore varios
+    servidores SOAP comparten las mismas sesiones. Si el almacén no vence
+    claves solo, un thread de fondo barre las expiradas cada sweep_interval.
     """
     
-    def __init__(self, expiration_hours=24):
-        self.sessions: Dict[str, dict] = {}
+    def __init__(self, expiration_hours=24, store=None, sweep_interval=60):
+        self.store = store if store is not None else MemorySessionStore()
         self.expiration_hours = expiration_hours
+        self.ttl_seconds = expiration_hours * 3600
+        self.sweep_interval = sweep_interval
+        
+        self._stop = threading.Event()
+        self._sweeper = None
+        if getattr(self.store, 'needs_sweep', False):
+            self._sweeper = threading.Thread(target=self._sweep, name='session-sweeper', daemon=True)
+            self._sweeper.start()
     
     def create_session(self, user_id: int, username: str) -> str:
         """
@@ -29,16 +45,14 @@ class SessionManager:
             session_token: Token único de sesión
         """
         session_token = str(uuid.uuid4()) # Generar token único
-        expiration = datetime.now() + timedelta(hours=self.expiration_hours)
         
-        self.sessions[session_token] = { #guarda en servidor
+        self.store.set(session_token, { #guarda en el almacén (vence en ttl_seconds)
             'user_id': user_id,
             'username': username,
-            'created_at': datetime.now(),
-            'expires_at': expiration
-        }
+            'created_at': datetime.now().isoformat()
+        }, self.ttl_seconds)
         
-        print(f"[SESSION] Sesión creada para {username} (token: {session_token[:8]}...)")
+        log.info("Sesión creada para %s (token: %s...)", username, session_token[:8])
         return session_token
     
     def validate_session(self, session_token: str) -> Optional[dict]:
@@ -51,16 +65,10 @@ class SessionManager:
         Returns:
             dict con user_id y username si es válida, None si no
         """
-        if session_token not in self.sessions: #valida si token existe
-            print(f"[SESSION] Token inválido: {session_token[:8]}...")
-            return None
-        
-        session = self.sessions[session_token]
+        session = self.store.get(session_token) #None si no existe o ya expiró
         
-        # Verificar expiración
-        if datetime.now() > session['expires_at']:
-            print(f"[SESSION] Token expirado: {session_token[:8]}...")
-            del self.sessions[session_token]
+        if session is None:
+            log.debug("Token inválido o expirado: %s...", session_token[:8])
             return None
         
         return {
@@ -78,21 +86,34 @@ class SessionManager:
         Returns:
             True si se destruyó, False si no existía
         """
-        if session_token in self.sessions:
-            username = self.sessions[session_token]['username']
-            del self.sessions[session_token]
-            print(f"[SESSION] Sesión destruida para {username}")
+        session = self.store.get(session_token)
+        
+        if self.store.delete(session_token):
+            username = session['username'] if session else session_token[:8]
+            log.info("Sesión destruida para %s", username)
             return True
         return False
     
     def cleanup_expired(self):
-        """Limpiar sesiones expiradas"""
-        now = datetime.now()
-        expired = [token for token, data in self.sessions.items() 
-                  if now > data['expires_at']]
-        
-        for token in expired:
-            del self.sessions[token]
+        """Limpiar sesiones expiradas (solo mira las vencidas)"""
+        removed = self.store.purge_expired()
         
-        if expired:
-            print(f"[SESSION] {len(expired)} sesiones expiradas limpiadas")
\ No newline at end of file
+        if removed:
+            log.debug("%d sesiones expiradas limpiadas", removed)
+        return removed
+    
+    def _sweep(self):
+        """Barrido periódico de sesiones expiradas"""
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.cleanup_expired()
+            except Exception as e:
+                log.warning("⚠ Error limpiando sesiones: %s", e)
+    
+    def stats(self):
+        """Contadores del almacén de sesiones"""
+        return self.store.stats()
+    
+    def close(self):
+        """Detener el barrido de fondo"""
+        self._stop.set()
\ No newline at end of file
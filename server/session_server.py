@@ -0,0 +1,127 @@
+# Archivo: server/session_server.py
+# SERVIDOR DE SESIONES COMPARTIDAS (SUBCONJUNTO DEL PROTOCOLO REDIS)
+#
+# Reemplazo local de Redis para desarrollo: varios servidores SOAP con
+# SESSION_BACKEND=redis y SESSION_REDIS_URL=redis://host:6380/0 comparten
+# las sesiones guardadas aquí. En producción se puede usar Redis real
+# sin cambiar el cliente.
+#
+# Comandos: PING, GET, SET (EX/PX), DEL, EXISTS, DBSIZE, SELECT, QUIT
+#
+# Uso:
+#   python session_server.py --port 6380 --max-entries 100000
+
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+from session_store import MemorySessionStore
+
+class SessionServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, max_entries=100000, sweep_interval=1.0):
+        super().__init__(address, SessionRequestHandler)
+        self.store = MemorySessionStore(max_entries=max_entries)
+        self.sweep_interval = sweep_interval
+
+        self._sweeper = threading.Thread(target=self._sweep, name='session-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def _sweep(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.store.purge_expired()
+
+class SessionRequestHandler(socketserver.StreamRequestHandler):
+    """Atiende una conexión: lee comandos RESP y responde hasta QUIT o EOF"""
+
+    def handle(self):
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+
+            name = command[0].upper()
+            if name == b'QUIT':
+                self.wfile.write(b'+OK\r\n')
+                return
+
+            try:
+                reply = self._dispatch(name, command[1:])
+            except (ValueError, IndexError):
+                reply = b'-ERR syntax error\r\n'
+            self.wfile.write(reply)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()     # Comando inline (redis-cli, telnet)
+
+        args = []
+        for _ in range(int(line[1:-2])):
+            header = self.rfile.readline()
+            if not header.startswith(b'$'):
+                raise ValueError('Se esperaba un bulk string')
+            args.append(self.rfile.read(int(header[1:-2]) + 2)[:-2])
+        return args
+
+    def _dispatch(self, name, args):
+        store = self.server.store
+
+        if name == b'PING':
+            return b'+PONG\r\n'
+        if name == b'SELECT':
+            return b'+OK\r\n'   # Una sola base: el prefijo de clave separa usos
+        if name == b'GET':
+            return self._bulk(store.get(args[0]))
+        if name == b'SET':
+            ttl = 365 * 24 * 3600
+            options = [arg.upper() for arg in args[2:]]
+            if b'EX' in options:
+                ttl = int(args[2 + options.index(b'EX') + 1])
+            elif b'PX' in options:
+                ttl = int(args[2 + options.index(b'PX') + 1]) / 1000
+            store.set(args[0], args[1], ttl)
+            return b'+OK\r\n'
+        if name == b'DEL':
+            return b':%d\r\n' % sum(store.delete(key) for key in args)
+        if name == b'EXISTS':
+            return b':%d\r\n' % sum(store.get(key) is not None for key in args)
+        if name == b'DBSIZE':
+            return b':%d\r\n' % len(store)
+
+        return b'-ERR unknown command\r\n'
+
+    @staticmethod
+    def _bulk(value):
+        if value is None:
+            return b'$-1\r\n'
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de sesiones compartidas (protocolo Redis)')
+    parser.add_argument('--host', default=os.getenv('SESSION_SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SESSION_SERVER_PORT', 6380)))
+    parser.add_argument('--max-entries', type=int, default=int(os.getenv('SESSION_MAX_ENTRIES', 100000)))
+    args = parser.parse_args()
+
+    server = SessionServer((args.host, args.port), max_entries=args.max_entries)
+    print(f"[SESSION] Servidor de sesiones escuchando en {args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SESSION] Servidor detenido")
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+# Archivo: server/session_store.py
+# ALMACENES DE SESIONES: MEMORIA LOCAL O PROTOCOLO REDIS (RESP)
+
+import heapq
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from logger import get_logger
+
+log = get_logger('SESSION')
+
+class MemorySessionStore:
+    """
+    Sesiones en memoria del proceso, seguras entre threads
+
+    - get/set/delete en O(1) sobre un OrderedDict protegido por un lock.
+    - Expiración con un heap de (vence, token): purge_expired() solo mira
+      las entradas vencidas, O(k log n) en lugar de recorrer todo el dict.
+      Las entradas del heap que quedaron viejas (sesión borrada o renovada)
+      se descartan al salir.
+    - Tope de memoria: con más de max_entries sesiones se expulsa la
+      usada hace más tiempo (LRU).
+    """
+
+    # Sin expiración nativa: SessionManager corre un barrido periódico
+    needs_sweep = True
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # token -> (vence, datos)
+        self._heap = []                 # (vence, token)
+        self._lock = threading.Lock()
+
+        self.expired = 0
+        self.evicted = 0
+
+    def set(self, token, data, ttl):
+        """Guardar una sesión que vence en ttl segundos"""
+        expires_at = time.monotonic() + ttl
+
+        with self._lock:
+            self._entries[token] = (expires_at, data)
+            self._entries.move_to_end(token)
+            heapq.heappush(self._heap, (expires_at, token))
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+            # Compactar si el heap acumula demasiadas entradas viejas
+            if len(self._heap) > 2 * len(self._entries) + 1024:
+                self._heap = [(entry[0], key) for key, entry in self._entries.items()]
+                heapq.heapify(self._heap)
+
+    def get(self, token):
+        """Datos de la sesión, o None si no existe o ya venció"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+
+            if entry[0] <= time.monotonic():
+                del self._entries[token]
+                self.expired += 1
+                return None
+
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def delete(self, token):
+        """Borrar una sesión. Retorna True si existía"""
+        with self._lock:
+            return self._entries.pop(token, None) is not None
+
+    def purge_expired(self):
+        """Eliminar las sesiones vencidas. Retorna cuántas se eliminaron"""
+        now = time.monotonic()
+        removed = 0
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, token = heapq.heappop(self._heap)
+                entry = self._entries.get(token)
+                if entry is not None and entry[0] == expires_at:
+                    del self._entries[token]
+                    removed += 1
+            self.expired += removed
+
+        return removed
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self._entries),
+                'max_entries': self.max_entries,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+
+class RespError(Exception):
+    """Error devuelto por el servidor (respuesta '-ERR ...')"""
+
+class RespConnection:
+    """Conexión mínima con el protocolo de Redis (RESP2)"""
+
+    def __init__(self, host, port, db=0, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    @staticmethod
+    def encode(*args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Conexión cerrada por el servidor de sesiones')
+
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            raise RespError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(payload)
+            if count == -1:
+                return None
+            return [self.read_reply() for _ in range(count)]
+        raise ConnectionError(f'Respuesta RESP inválida: {line!r}')
+
+    def execute(self, *args):
+        self.sock.sendall(self.encode(*args))
+        return self.read_reply()
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+class RedisSessionStore:
+    """
+    Sesiones en Redis (o en session_server.py) compartidas entre varios
+    servidores SOAP
+
+    Cada sesión es una clave '{prefix}{token}' con el JSON de sus datos y
+    expiración nativa (SET ... EX), así no hace falta barrido. El tope de
+    memoria lo aplica el servidor (maxmemory-policy allkeys-lru en Redis,
+    max_entries en session_server.py).
+    Las conexiones se reutilizan desde un pool; una conexión que falla se
+    descarta y la operación se reintenta una vez con una nueva.
+    """
+
+    needs_sweep = False
+
+    def __init__(self, host='localhost', port=6379, db=0, prefix='session:',
+                 pool_size=16, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.prefix = prefix
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """redis://host:puerto/db"""
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379, db, **kwargs)
+
+    def _execute(self, *args):
+        for attempt in range(2):
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                connection = RespConnection(self.host, self.port, self.db, self.timeout)
+
+            try:
+                reply = connection.execute(*args)
+            except (OSError, ConnectionError):
+                connection.close()
+                if attempt == 1:
+                    raise
+                continue
+            except RespError:
+                self._release(connection)
+                raise
+
+            self._release(connection)
+            return reply
+
+    def _release(self, connection):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def set(self, token, data, ttl):
+        self._execute('SET', self.prefix + token, json.dumps(data), 'EX', max(1, int(ttl)))
+
+    def get(self, token):
+        value = self._execute('GET', self.prefix + token)
+        return json.loads(value) if value is not None else None
+
+    def delete(self, token):
+        return self._execute('DEL', self.prefix + token) > 0
+
+    def purge_expired(self):
+        """El servidor vence las claves solo"""
+        return 0
+
+    def stats(self):
+        try:
+            sessions = self._execute('DBSIZE')
+        except (OSError, ConnectionError, RespError):
+            sessions = None
+        return {
+            'backend': 'redis',
+            'address': f'{self.host}:{self.port}/{self.db}',
+            'sessions': sessions
+        }
+
+def get_session_store():
+    """
+    Crear el almacén de sesiones según variables de entorno
+
+        SESSION_BACKEND       'memory' (por defecto) o 'redis'
+        SESSION_REDIS_URL     redis://host:puerto/db (Redis o session_server.py)
+        SESSION_MAX_ENTRIES   Tope de sesiones en memoria (LRU)
+    """
+    backend = os.getenv('SESSION_BACKEND', 'memory').lower()
+
+    if backend == 'redis':
+        store = RedisSessionStore.from_url(os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+    else:
+        store = MemorySessionStore(max_entries=int(os.getenv('SESSION_MAX_ENTRIES', 100000)))
+
+    log.info("Backend: %s", type(store).__name__)
+    return store
@@ -8,10 +8,13 @@ import base64
 import json
 import time
 import gzip
+import atexit
+import logging
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from lxml import etree
 import xml.etree.ElementTree as ET
 import threading
+import queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Importar cliente REST
@@ -19,10 +22,29 @@ from rest_client import RestClient
 
 # Importar gestor de sesiones
 from session_manager import SessionManager
+from session_store import get_session_store
 
 # Importar load balancer
 from load_balancer import LoadBalancer
 
+# Importar constructor de ZIPs por lote
+from archive_builder import ArchiveBuilder
+
+# Importar almacenamiento de objetos (disco local o S3)
+from object_store import get_store
+
+# Métricas Prometheus (GET /metrics)
+import metrics
+
+# Trazas distribuidas (traceparent hacia DB Service y nodos)
+import tracing
+
+# Logs con niveles (LOG_LEVEL) escritos desde un thread aparte
+from logger import get_logger
+
+log = get_logger('SERVIDOR')
+access_log = get_logger('HTTP')
+
 # IMPORTACIÓN DEL CLIENTE gRPC
 try:
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -31,18 +53,31 @@ try:
         sys.path.insert(0, script_dir)
     
     from grpc_client.client import NodeClient
-    print("[SERVIDOR] ✓ NodeClient importado correctamente")
+    log.debug("✓ NodeClient importado correctamente")
     
 except ImportError as e:
-    print(f"[SERVIDOR] ✗ Error al importar NodeClient:")
-    print(f"    Error: {e}")
+    log.critical("✗ Error al importar NodeClient: %s", e)
     sys.exit(1)
 
 # Crear instancia del cliente REST
-rest_client = RestClient('http://localhost:5000')
+rest_client = RestClient(
+    'http://localhost:5000',
+    log_queue_size=int(os.getenv('LOG_SINK_QUEUE_SIZE', 10000)),  # Backlog máximo de logs en memoria
+    log_batch_size=int(os.getenv('LOG_SINK_BATCH_SIZE', 200))     # Logs por INSERT en el DB Service
+)
+
+# Vaciar buffers write-behind también si el proceso termina sin Ctrl+C
+atexit.register(rest_client.close)
+
+tracing.init_tracing('server')
 
 # Crear gestor de sesiones global
-session_manager = SessionManager(expiration_hours=24)
+# (SESSION_BACKEND=memory|redis: con redis varios servidores SOAP comparten sesiones)
+session_manager = SessionManager(
+    expiration_hours=24,
+    store=get_session_store(),
+    sweep_interval=int(os.getenv('SESSION_SWEEP_INTERVAL', 60))  # Segundos entre barridos de expiradas
+)
 
 # Crear load balancer
 load_balancer = LoadBalancer(rest_client)
@@ -50,6 +85,30 @@ load_balancer = LoadBalancer(rest_client)
 # Pool de threads para procesamiento paralelo
 thread_pool = ThreadPoolExecutor(max_workers=10)
 
+# Modo pipeline: decodificación, registro en DB y despacho solapados
+PIPELINE_ENABLED = os.getenv('PIPELINE_ENABLED', 'true').lower() == 'true'
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 32))        # Capacidad de cada cola entre etapas
+PIPELINE_REGISTER_BATCH = int(os.getenv('PIPELINE_REGISTER_BATCH', 8))  # Máximo de imágenes por micro-lote
+
+# Marca de fin de stream entre etapas del pipeline
+_PIPELINE_END = object()
+
+# Almacenamiento de originales, resultados y ZIPs (STORAGE_BACKEND=local|s3)
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+storage = get_store(OUTPUT_DIR)
+
+# Modo por referencia: los nodos leen el original y escriben el resultado en el
+# almacenamiento compartido; por gRPC solo viajan claves y metadatos.
+# Activar solo cuando todos los nodos comparten el almacenamiento y soportan input_key.
+NODE_BY_REFERENCE = os.getenv('NODE_BY_REFERENCE', 'false').lower() == 'true'
+STORAGE_IS_LOCAL = storage.local_path('.') is not None
+
+# ZIP de descarga armado a medida que llegan los resultados
+# (por referencia con S3 el servidor ya no ve los bytes: la descarga se arma en el DB Service)
+ARCHIVE_PREBUILD_ENABLED = (os.getenv('ARCHIVE_PREBUILD_ENABLED', 'true').lower() == 'true' and
+                            (STORAGE_IS_LOCAL or not NODE_BY_REFERENCE))
+archive_builder = ArchiveBuilder(OUTPUT_DIR, storage)
+
 # WSDL Template
 WSDL_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
 <definitions name="ImageProcessingService"
@@ -324,20 +383,57 @@ WSDL_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
 </definitions>
 '''
 
+# Métricas de los caminos calientes del servidor
+SOAP_REQUESTS_SECONDS = metrics.histogram(
+    'soap_requests_seconds', 'Duración de los requests POST por operación', ['operation', 'status']
+)
+NODE_RPC_SECONDS = metrics.histogram(
+    'soap_node_rpc_seconds', 'Latencia de ProcessImage en los nodos vista por el servidor', ['node', 'status']
+)
+
 class SOAPHandler(BaseHTTPRequestHandler):
     """MANEJADOR HTTP PARA SOLICITUDES SOAP"""
 
     def __init__(self, *args, **kwargs):
         self.rfile_max_size = 50 * 1024 * 1024  # 50 MB
+        self._status = 0
         super().__init__(*args, **kwargs)
     
+    def send_response(self, code, message=None):
+        self._status = code     # Para el label status de las métricas
+        super().send_response(code, message)
+    
+    def log_message(self, format, *args):
+        # Una línea por request (heartbeats incluidos): DEBUG y por la cola de logs,
+        # no directo a stderr como BaseHTTPRequestHandler
+        if access_log.isEnabledFor(logging.DEBUG):
+            access_log.debug("%s %s", self.address_string(), format % args)
+    
+    def log_error(self, format, *args):
+        access_log.warning("%s %s", self.address_string(), format % args)
+    
     def do_GET(self):
         """MANEJO DE SOLICITUDES GET"""
-        if self.path == '/wsdl' or self.path == '/?wsdl':
+        if self.path == '/metrics':
+            body = metrics.expose().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', metrics.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/wsdl' or self.path == '/?wsdl':
             self.send_response(200)
             self.send_header('Content-type', 'text/xml')
             self.end_headers()
             self.wfile.write(WSDL_TEMPLATE.encode())
+        elif self.path == '/stats':
+            # Contadores de escritura diferida (backlog y descartes de logs) y de sesiones
+            stats = rest_client.write_behind_stats()
+            stats['sessions'] = session_manager.stats()
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(stats).encode('utf-8'))
         else:
             self.send_response(200)
             self.send_header('Content-type', 'text/html')
@@ -375,7 +471,20 @@ class SOAPHandler(BaseHTTPRequestHandler):
             self.wfile.write(html_response.encode('utf-8'))
     
     def do_POST(self):
-        """MANEJO DE SOLICITUDES POST (SOAP)"""
+        """MANEJO DE SOLICITUDES POST (SOAP), medido por operación"""
+        start = time.perf_counter()
+        self._operation = {'/soap': 'invalid', '/heartbeat': 'JsonHeartbeat'}.get(self.path, 'not_found')
+        # Las operaciones SOAP sin traceparent (clientes directos) empiezan una traza
+        with tracing.span(f'POST {self.path}', parent=tracing.extract(self.headers),
+                          root=self.path == '/soap', kind='server') as span:
+            try:
+                self._handle_post()
+            finally:
+                span.name = f'soap {self._operation}'
+                span.set_attribute('http.status_code', self._status)
+                SOAP_REQUESTS_SECONDS.labels(self._operation, self._status).observe(time.perf_counter() - start)
+    
+    def _handle_post(self):
         if self.path == '/soap':
             content_length = int(self.headers['Content-Length'])
             
@@ -448,6 +557,9 @@ class SOAPHandler(BaseHTTPRequestHandler):
                     result = self.handle_node_heartbeat(node_id, ip_address, port, cpu_cores, ram_gb, current_load, status)
                     response_type = 'NodeHeartbeat'
                 
+                if response_type:
+                    self._operation = response_type
+                
                 if result and response_type:
                     soap_response = self.create_soap_response(response_type, result)
                     self.send_response(200)
@@ -458,13 +570,49 @@ class SOAPHandler(BaseHTTPRequestHandler):
                     self.send_error(400, 'Invalid SOAP request')
                     
             except Exception as e:
-                print(f"Error procesando solicitud SOAP: {e}")
-                import traceback
-                traceback.print_exc()
+                log.exception("Error procesando solicitud SOAP: %s", e)
                 self.send_error(500, f'Internal Server Error: {str(e)}')
+        elif self.path == '/heartbeat':
+            self.handle_json_heartbeat()
         else:
             self.send_error(404, 'Service not found')
     
+    def handle_json_heartbeat(self):
+        """
+        POST /heartbeat con JSON compacto (alternativa a NodeHeartbeat en SOAP)
+        
+        Body: {"node_id": int, "ip_address": str, "port": int, "cpu_cores": int,
+               "ram_gb": float, "current_load": int, "status": str,
+               "max_concurrent_jobs": int, "telemetry": {...}}
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length > 64 * 1024:
+                self.send_error(413, 'Request demasiado grande')
+                return
+            
+            data = json.loads(self.rfile.read(content_length) or b'{}')
+            rest_client.update_node_heartbeat(
+                node_id=int(data['node_id']),
+                ip_address=data.get('ip_address'),
+                port=data.get('port'),
+                cpu_cores=data.get('cpu_cores'),
+                ram_gb=data.get('ram_gb'),
+                current_load=data.get('current_load'),
+                status=data.get('status'),
+                max_concurrent_jobs=data.get('max_concurrent_jobs'),
+                telemetry=data.get('telemetry'),
+                deferred=True
+            )
+            status_code, reply = 202, {'success': True}
+        except (KeyError, TypeError, ValueError) as e:
+            status_code, reply = 400, {'success': False, 'error': f'Heartbeat inválido: {e}'}
+        
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(reply).encode('utf-8'))
+    
     def handle_register(self, request, namespaces):
         """Manejar registro de usuario"""
         username = request.find('.//ns:username', namespaces).text
@@ -476,7 +624,7 @@ class SOAPHandler(BaseHTTPRequestHandler):
         first_name = first_name_elem.text if first_name_elem is not None else None
         last_name = last_name_elem.text if last_name_elem is not None else None
         
-        print(f"[SERVIDOR] Registro: username={username}, email={email}")
+        log.info("Registro: username=%s, email=%s", username, email)
         
         success, result = rest_client.register_user(
             username=username,
@@ -504,7 +652,7 @@ class SOAPHandler(BaseHTTPRequestHandler):
         username = request.find('.//ns:username', namespaces).text
         password = request.find('.//ns:password', namespaces).text
         
-        print(f"[SERVIDOR] Login: username={username}")
+        log.info("Login: username=%s", username)
         
         success, result = rest_client.login_user(username, password)
         
@@ -532,7 +680,7 @@ class SOAPHandler(BaseHTTPRequestHandler):
         """Manejar logout de usuario"""
         session_token = request.find('.//ns:session_token', namespaces).text
         
-        print(f"[SERVIDOR] Logout: token={session_token[:8]}...")
+        log.info("Logout: token=%s...", session_token[:8])
         
         destroyed = session_manager.destroy_session(session_token)
         
@@ -543,28 +691,24 @@ class SOAPHandler(BaseHTTPRequestHandler):
     
     def handle_get_nodes_metrics(self):
         """Obtener métricas de nodos"""
-        print(f"[SERVIDOR] GetNodesMetrics")
-        
         try:
             # Consultar DB Service
             success, nodes = rest_client.get_active_nodes()
             
             if success:
-                print(f"[SERVIDOR] Métricas obtenidas: {len(nodes)} nodos")
+                log.debug("GetNodesMetrics: %d nodos", len(nodes))
                 return {
                     'success': True,
                     'nodes_json': json.dumps(nodes)
                 }
             else:
-                print(f"[SERVIDOR] Error obteniendo métricas")
+                log.warning("GetNodesMetrics: error obteniendo métricas")
                 return {
                     'success': False,
                     'nodes_json': '[]'
                 }
         except Exception as e:
-            print(f"[SERVIDOR] Error en GetNodesMetrics: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error en GetNodesMetrics: %s", e)
             return {
                 'success': False,
                 'nodes_json': '[]'
@@ -572,41 +716,48 @@ class SOAPHandler(BaseHTTPRequestHandler):
     
     def handle_get_batch_metrics(self, batch_id):
         """Obtener métricas de lote"""
-        print(f"[SERVIDOR] GetBatchMetrics: batch_id={batch_id}")
-        
         try:
-            # Consultar batch
-            success, batch_data = rest_client.get_batch(batch_id)
+            # Contadores y métricas materializadas del lote (sin agregar resultados)
+            success, progress = rest_client.get_batch_metrics(batch_id)
             if not success:
-                print(f"[SERVIDOR] Lote {batch_id} no encontrado")
+                log.info("GetBatchMetrics: lote %s no encontrado", batch_id)
                 return {
                     'success': False,
                     'metrics_json': '{}'
                 }
             
-            # Construir métricas básicas
-            total_images = batch_data.get('total_images', 0)
-            processed_images = batch_data.get('processed_images', 0)
+            # En un lote terminado, las imágenes sin resultado (fallaron antes
+            # de llegar a un nodo) cuentan como fallidas
+            finished = progress['status'] in ('completed', 'failed')
+            failed_images = progress['failed'] + (progress['pending'] if finished else 0)
             
-            metrics = {
+            batch_metrics = {
                 'batch_id': batch_id,
-                'batch_name': batch_data.get('batch_name', ''),
-                'total_images': total_images,
-                'processed_images': processed_images,
-                'failed_images': total_images - processed_images,
-                'status': batch_data.get('status', ''),
-                'created_at': str(batch_data.get('created_at', ''))
+                'batch_name': progress['batch_name'] or '',
+                'total_images': progress['total'],
+                'processed_images': progress['succeeded'],
+                'failed_images': failed_images,
+                'pending_images': 0 if finished else progress['pending'],
+                'percent': progress['percent'],
+                'processed_bytes': progress['bytes'],
+                'bytes_in': progress['metrics']['bytes_in'],
+                'bytes_out': progress['metrics']['bytes_out'],
+                'processing_time_ms': progress['processing_time_ms'],
+                'avg_processing_time_ms': progress['avg_processing_time_ms'],
+                'latency': progress['metrics']['latency'],
+                'throughput': progress['metrics']['throughput'],
+                'nodes': progress['metrics']['nodes'],
+                'status': progress['status'],
+                'created_at': str(progress['created_at'] or '')
             }
             
-            print(f"[SERVIDOR] Métricas de lote {batch_id} obtenidas")
+            log.debug("GetBatchMetrics: métricas de lote %s obtenidas", batch_id)
             return {
                 'success': True,
-                'metrics_json': json.dumps(metrics)
+                'metrics_json': json.dumps(batch_metrics)
             }
         except Exception as e:
-            print(f"[SERVIDOR] Error en GetBatchMetrics: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error en GetBatchMetrics: %s", e)
             return {
                 'success': False,
                 'metrics_json': '{}'
@@ -616,10 +767,8 @@ class SOAPHandler(BaseHTTPRequestHandler):
 
     def handle_node_heartbeat(self, node_id, ip_address, port, cpu_cores, ram_gb, current_load, status):
         """Recibir heartbeat de nodo y propagarlo al DB Service"""
-        print(f"[SERVIDOR] NodeHeartbeat recibido: node_id={node_id}, port={port}")
-        
         try:
-            # Propagar al DB Service
+            # Propagar al DB Service (en bloque con los demás heartbeats)
             success, result = rest_client.update_node_heartbeat(
                 node_id=node_id,
                 ip_address=ip_address,
@@ -627,25 +776,24 @@ class SOAPHandler(BaseHTTPRequestHandler):
                 cpu_cores=cpu_cores,
                 ram_gb=ram_gb,
                 current_load=current_load,
-                status=status
+                status=status,
+                deferred=True
             )
             
             if success:
-                print(f"[SERVIDOR] Heartbeat de nodo {node_id} registrado en DB")
+                log.debug("Heartbeat de nodo %s (puerto %s) encolado", node_id, port)
                 return {
                     'success': True,
                     'message': 'Heartbeat registrado'
                 }
             else:
-                print(f"[SERVIDOR] Error registrando heartbeat: {result}")
+                log.warning("Error registrando heartbeat de nodo %s: %s", node_id, result)
                 return {
                     'success': False,
                     'message': 'Error al registrar heartbeat'
                 }
         except Exception as e:
-            print(f"[SERVIDOR] Error en NodeHeartbeat: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error en NodeHeartbeat: %s", e)
             return {
                 'success': False,
                 'metrics_json': '{}'
@@ -673,22 +821,18 @@ class SOAPHandler(BaseHTTPRequestHandler):
             user_id = session['user_id']
             username = session['username']
             
-            print("\n" + "="*70)
-            print("NUEVA SOLICITUD DE LOTE")
-            print("="*70)
-            print(f"Usuario: {username} (ID: {user_id})")
-            print(f"Lote: {batch_name}")
+            log.info("Nueva solicitud de lote '%s' de %s (ID: %s)", batch_name, username, user_id)
             
             # DECODIFICAR IMÁGENES (✅ OPTIMIZADO: SIN GZIP)
             try:
-                images_json_decoded = base64.b64decode(images_json).decode('utf-8')
-                images = json.loads(images_json_decoded)
+                with tracing.span('batch.decode_payload', attributes={'payload_bytes': len(images_json)}):
+                    images_json_decoded = base64.b64decode(images_json).decode('utf-8')
+                    images = json.loads(images_json_decoded)
             except Exception as e:
-                print(f"[SERVIDOR] Error decodificando: {e}")
+                log.error("Error decodificando lote '%s': %s", batch_name, e)
                 raise Exception(f"Error al decodificar imágenes: {str(e)}")
             
             total_images = len(images)
-            print(f"Total de imágenes: {total_images}")
             
             # CREAR LOTE EN DB###########################################################################################################################
             success, batch_data = rest_client.create_batch(user_id, batch_name)
@@ -696,7 +840,12 @@ class SOAPHandler(BaseHTTPRequestHandler):
                 raise Exception(f"Error al crear lote: {batch_data.get('error')}")
             
             batch_id = batch_data['batch_id']
-            print(f"Lote creado en DB: batch_id={batch_id}")
+            log.info("Lote creado en DB: batch_id=%s, %d imágenes", batch_id, total_images)
+            
+            # tools/trace_timeline.py busca la traza del lote por este atributo
+            batch_span = tracing.current_span()
+            batch_span.set_attribute('batch_id', batch_id)
+            batch_span.set_attribute('images', total_images)
             
             # Log inicial##################################################################################################################
             rest_client.create_log(
@@ -707,193 +856,45 @@ class SOAPHandler(BaseHTTPRequestHandler):
             #########################################################################################################################################
             rest_client.update_batch_status(batch_id, 'processing')
             
-            # ✅ REGISTRAR IMÁGENES Y PREPARAR TRABAJOS (OPTIMIZADO CON BATCH INSERT)
-            print("\nPreparando trabajos...")
-            jobs = []
-            batch_images = []  # Para batch insert
-            
-            for idx, image_data in enumerate(images, 1):
-                filename = image_data['filename']
-                image_base64 = image_data['image_data_base64']
-                transformations = image_data.get('transformations', [])
-                
-                if len(transformations) > 5:
-                    print(f"  ⚠ Imagen {filename}: Limitando a 5 transformaciones")
-                    transformations = transformations[:5]
-                
-                try:
-                    # Decodificar imagen
-                    image_bytes = base64.b64decode(image_base64)
-                    file_size = len(image_bytes)
-                    
-                    # Guardar temporalmente con nombre único
-                    temp_dir = tempfile.gettempdir()
-                    # Agregar batch_id + timestamp para evitar colisiones
-                    unique_filename = f"batch_{batch_id}_{idx}_{filename}"
-                    image_path = os.path.join(temp_dir, unique_filename)
-                    with open(image_path, "wb") as f:
-                        f.write(image_bytes)
-                    
-                    # Preparar para batch insert
-                    batch_images.append({
-                        'original_filename': filename,
-                        'storage_path': image_path,
-                        'file_size': file_size,
-                        'transformations': [
-                            {
-                                'name': t.get('name', ''),
-                                'parameters': t.get('parameters', {}),
-                                'execution_order': order
-                            }
-                            for order, t in enumerate(transformations, 1)
-                        ]
-                    })
-                    
-                    # Guardar info para jobs (sin image_id aún)
-                    jobs.append({
-                        'image_path': image_path,
-                        'filename': filename,
-                        'file_size': file_size,
-                        'transformations': transformations,
-                        'batch_id': batch_id,
-                        'idx': idx  # Índice para matching después
-                    })
-                    
-                    print(f"  ✓ Trabajo {idx}/{total_images}: {filename} "
-                          f"({load_balancer._format_bytes(file_size)})")
-                    
-                except Exception as e:
-                    print(f"  ✗ Error preparando imagen {idx}: {e}")
-                    rest_client.create_log(
-                        batch_id=batch_id,
-                        log_level='error',
-                        message=f'Error preparando {filename}: {str(e)}'
-                    )
-            
-            # BATCH INSERT: 1 sola llamada REST en lugar de 30+
-            if batch_images:
-######################################################################################################################################################
-                success, batch_result = rest_client.create_images_batch(
-                    batch_id=batch_id,
-                    images=batch_images
-                )
-                
-                if success:
-                    image_ids = batch_result.get('image_ids', [])
-                    # Asignar image_ids a los jobs
-                    for i, job in enumerate(jobs):
-                        if i < len(image_ids):
-                            job['image_id'] = image_ids[i]
-                    print(f"✅ Batch insert: {len(batch_images)} imágenes + {batch_result.get('transformations_created', 0)} transformaciones")
-                else:
-                    print(f"❌ Error en batch insert: {batch_result.get('error')}")
-            
-            print(f"\n{len(jobs)} trabajos listos para distribución")
-            
-            # DISTRIBUIR TRABAJOS POR PESO
-            print("\n" + "="*70)
-            print("DISTRIBUYENDO TRABAJOS POR PESO")
-            print("="*70)
-            
-            try:
- ####################################################################################################################################################################               
-                job_assignments = load_balancer.distribute_jobs(jobs)
-                
-                # ⭐ MOSTRAR RESUMEN DE DISTRIBUCIÓN
-                print("\n📊 RESUMEN DE DISTRIBUCIÓN:")
-                print("-" * 70)
-                
-                # Agrupar por nodo
-                distribution = {}
-                for job, node in job_assignments:
-                    node_id = node['node_id']
-                    if node_id not in distribution:
-                        distribution[node_id] = {
-                            'node_name': node['node_name'],
-                            'node_address': f"{node['ip_address']}:{node['port']}",
-                            'images': [],
-                            'total_weight': 0
-                        }
-                    
-                    distribution[node_id]['images'].append({
-                        'filename': job['filename'],
-                        'size': job['file_size']
-                    })
-                    distribution[node_id]['total_weight'] += job['file_size']
-                
-                # Mostrar distribución por nodo
-                for node_id in sorted(distribution.keys()):
-                    node_info = distribution[node_id]
-                    print(f"\n🖥️  {node_info['node_name']} ({node_info['node_address']})")
-                    print(f"   Peso total: {load_balancer._format_bytes(node_info['total_weight'])}")
-                    print(f"   Imágenes asignadas: {len(node_info['images'])}")
-                    print(f"   Lista:")
-                    
-                    for idx, img in enumerate(node_info['images'], 1):
-                        print(f"      {idx}. {img['filename']} ({load_balancer._format_bytes(img['size'])})")
-                
-                print("\n" + "-" * 70)
-                print(f"✅ Distribución completada: {len(jobs)} imágenes en {len(distribution)} nodos")
-                print("=" * 70)
-                
-            except Exception as e:
-                print(f"[SERVIDOR] Error en distribución: {e}")
-                raise
-            
-            # PROCESAR EN PARALELO
-            print("\n" + "="*70)
-            print("INICIANDO PROCESAMIENTO PARALELO")
-            print("="*70)
+            # PREPARAR, REGISTRAR Y DESPACHAR TRABAJOS
+            if PIPELINE_ENABLED:
+                processed_count, failed_count, stage_timings = self._run_pipelined(batch_id, images)
+            else:
+                processed_count, failed_count, stage_timings = self._run_phased(batch_id, images)
             
-            futures = []
-            for job, node in job_assignments:
-                job['assigned_node'] = node
-####################################################################################################################################                
-                future = thread_pool.submit(self._delegate_to_node, job)
-                futures.append(future)
- ##########################################################################################################################           
-            # ESPERAR RESULTADOS
-            processed_count = 0
-            failed_count = 0
+            # FINALIZAR: garantizar que resultados y logs diferidos lleguen a DB
+            with tracing.span('batch.flush_pending'):
+                if not rest_client.flush_pending():
+                    log.warning("⚠ Quedaron resultados/logs pendientes de envío al DB Service (lote %s)", batch_id)
             
-            for idx, future in enumerate(as_completed(futures), 1):
+            # Publicar el ZIP del lote antes de marcarlo como terminado
+            if ARCHIVE_PREBUILD_ENABLED:
                 try:
-                    result = future.result()
-                    if result['success']:
-                        processed_count += 1
-                        print(f"[{idx}/{len(jobs)}] ✓ {result['filename']} completado")
-                    else:
-                        failed_count += 1
-                        print(f"[{idx}/{len(jobs)}] ✗ {result['filename']} falló")
+                    with tracing.span('batch.archive_finalize'):
+                        archive_builder.finalize(batch_id)
                 except Exception as e:
-                    print(f"[{idx}/{len(jobs)}] ✗ Error en thread: {e}")
-                    failed_count += 1
+                    log.warning("⚠ No se pudo cerrar el ZIP del lote %s: %s", batch_id, e)
+                    archive_builder.discard(batch_id)
             
-            # FINALIZAR
             final_status = 'completed' if failed_count == 0 else ('failed' if processed_count == 0 else 'completed')
-            rest_client.update_batch_status(batch_id, final_status, processed_images=processed_count)
+            # Los contadores del lote los suma el DB Service al registrar cada resultado
+            rest_client.update_batch_status(batch_id, final_status)
             
             processing_time = int((time.time() - start_time) * 1000)
+            stage_summary = ', '.join(f'{stage}={value}' for stage, value in stage_timings.items())
             
             # Log final
             rest_client.create_log(
                 batch_id=batch_id,
                 log_level='info',
                 message=f'Lote completado: {processed_count}/{total_images} exitosas, '
-                        f'{failed_count} fallidas en {processing_time}ms'
+                        f'{failed_count} fallidas en {processing_time}ms ({stage_summary})'
             )
             
-            print("\n" + "="*70)
-            print("RESUMEN DEL LOTE")
-            print("="*70)
-            print(f"Total:        {total_images}")
-            print(f"Exitosas:     {processed_count}")
-            print(f"Fallidas:     {failed_count}")
-            print(f"Tiempo total: {processing_time} ms")
-            print("="*70 + "\n")
-            
             download_url = f'http://localhost:5000/api/batches/{batch_id}/download'
-            print(f"Descarga disponible en: {download_url}\n")
+            log.info("Lote %s terminado: %d/%d exitosas, %d fallidas en %d ms (%s; %s). Descarga: %s",
+                     batch_id, processed_count, total_images, failed_count, processing_time,
+                     'pipeline' if PIPELINE_ENABLED else 'por fases', stage_summary, download_url)
             
             return {
                 'success': True,
@@ -907,9 +908,7 @@ class SOAPHandler(BaseHTTPRequestHandler):
             }
             
         except Exception as e:
-            print(f"\n[SERVIDOR] ERROR CRÍTICO: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.exception("ERROR CRÍTICO procesando lote: %s", e)
             
             processing_time = int((time.time() - start_time) * 1000)
             
@@ -924,8 +923,394 @@ class SOAPHandler(BaseHTTPRequestHandler):
                 'download_url': ''
             }
     
+    @tracing.traced('image.decode')
+    def _prepare_job(self, batch_id, idx, image_data, total_images):
+        """
+        Decodifica una imagen, la guarda temporalmente y arma su trabajo
+        
+        Returns:
+            (batch_image, job) o None si la imagen no pudo prepararse
+        """
+        filename = f'imagen {idx}'
+        
+        try:
+            # Una entrada mal formada cuenta como imagen fallida, no corta el lote
+            filename = image_data['filename']
+            image_base64 = image_data['image_data_base64']
+            transformations = image_data.get('transformations', [])
+            
+            if len(transformations) > 5:
+                log.warning("⚠ Imagen %s: limitando a 5 transformaciones", filename)
+                transformations = transformations[:5]
+            
+            # Decodificar imagen
+            image_bytes = base64.b64decode(image_base64)
+            file_size = len(image_bytes)
+            tracing.current_span().set_attribute('bytes', file_size)
+            
+            # Guardar original en el almacenamiento (clave única por lote e índice)
+            original_key = f"originals/batch_{batch_id}/{idx}_{os.path.basename(filename)}"
+            storage.put_bytes(original_key, image_bytes)
+            
+            # El cliente gRPC lee el original desde una ruta local (salvo por referencia)
+            image_path = storage.local_path(original_key)
+            if image_path is None and not NODE_BY_REFERENCE:
+                # Agregar batch_id + índice para evitar colisiones
+                unique_filename = f"batch_{batch_id}_{idx}_{os.path.basename(filename)}"
+                image_path = os.path.join(tempfile.gettempdir(), unique_filename)
+                with open(image_path, "wb") as f:
+                    f.write(image_bytes)
+            
+            # Preparar para batch insert
+            batch_image = {
+                'original_filename': filename,
+                'storage_path': original_key,
+                'file_size': file_size,
+                'transformations': [
+                    {
+                        'name': t.get('name', ''),
+                        'parameters': t.get('parameters', {}),
+                        'execution_order': order
+                    }
+                    for order, t in enumerate(transformations, 1)
+                ]
+            }
+            
+            # Guardar info para jobs (sin image_id aún)
+            job = {
+                'image_path': image_path,
+                'original_key': original_key,
+                'filename': filename,
+                'file_size': file_size,
+                'transformations': transformations,
+                'batch_id': batch_id,
+                'idx': idx  # Índice para matching después
+            }
+            
+            log.debug("✓ Trabajo %d/%d: %s (%d bytes)", idx, total_images, filename, file_size)
+            
+            return batch_image, job
+            
+        except Exception as e:
+            log.error("✗ Error preparando imagen %d (%s): %s", idx, filename, e)
+            rest_client.create_log(
+                batch_id=batch_id,
+                log_level='error',
+                message=f'Error preparando {filename}: {str(e)}'
+            )
+            return None
+    
+    @tracing.traced('batch.register_images')
+    def _register_jobs(self, batch_id, batch_images, jobs):
+        """
+        Registra imágenes y transformaciones en DB (1 llamada REST) y asigna image_id a los jobs
+        
+        Returns:
+            bool: True si el registro fue exitoso
+        """
+        tracing.current_span().set_attribute('images', len(batch_images))
+        success, batch_result = rest_client.create_images_batch(
+            batch_id=batch_id,
+            images=batch_images
+        )
+        
+        if success:
+            image_ids = batch_result.get('image_ids', [])
+            # Asignar image_ids a los jobs
+            for i, job in enumerate(jobs):
+                if i < len(image_ids):
+                    job['image_id'] = image_ids[i]
+            log.debug("✅ Batch insert: %d imágenes + %s transformaciones",
+                      len(batch_images), batch_result.get('transformations_created', 0))
+        else:
+            log.error("❌ Error en batch insert (lote %s): %s", batch_id, batch_result.get('error'))
+        
+        return success
+    
+    def _collect_results(self, futures, total_jobs):
+        """Espera los resultados de los nodos y cuenta exitosas/fallidas"""
+        processed_count = 0
+        failed_count = 0
+        
+        for idx, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+                if result['success']:
+                    processed_count += 1
+                    log.debug("[%d/%d] ✓ %s completado", idx, total_jobs, result['filename'])
+                else:
+                    failed_count += 1
+                    log.debug("[%d/%d] ✗ %s falló", idx, total_jobs, result['filename'])
+            except Exception as e:
+                log.error("[%d/%d] ✗ Error en thread: %s", idx, total_jobs, e)
+                failed_count += 1
+        
+        return processed_count, failed_count
+    
+    def _run_phased(self, batch_id, images):
+        """
+        MODO POR FASES: decodificar todo, registrar todo, distribuir y recién entonces despachar
+        
+        Returns:
+            (processed_count, failed_count, stage_timings)
+        """
+        total_images = len(images)
+        stage_timings = {}
+        
+        # ✅ REGISTRAR IMÁGENES Y PREPARAR TRABAJOS (OPTIMIZADO CON BATCH INSERT)
+        stage_start = time.time()
+        jobs = []
+        batch_images = []  # Para batch insert
+        
+        for idx, image_data in enumerate(images, 1):
+            prepared = self._prepare_job(batch_id, idx, image_data, total_images)
+            if prepared:
+                batch_images.append(prepared[0])
+                jobs.append(prepared[1])
+        
+        stage_timings['decode_ms'] = int((time.time() - stage_start) * 1000)
+        
+        # BATCH INSERT: 1 sola llamada REST en lugar de 30+
+        stage_start = time.time()
+        if batch_images:
+            self._register_jobs(batch_id, batch_images, jobs)
+        stage_timings['register_ms'] = int((time.time() - stage_start) * 1000)
+        stage_timings['register_calls'] = 1 if batch_images else 0
+        
+        # DISTRIBUIR TRABAJOS POR PESO
+        stage_start = time.time()
+        try:
+            with tracing.span('batch.distribute', attributes={'jobs': len(jobs)}):
+                job_assignments = load_balancer.distribute_jobs(jobs)
+            
+            # ⭐ RESUMEN DE DISTRIBUCIÓN (solo si se va a mostrar)
+            distribution = {}
+            for job, node in (job_assignments if log.isEnabledFor(logging.INFO) else ()):
+                node_id = node['node_id']
+                if node_id not in distribution:
+                    distribution[node_id] = {
+                        'node_name': node['node_name'],
+                        'node_address': f"{node['ip_address']}:{node['port']}",
+                        'images': [],
+                        'total_weight': 0
+                    }
+                
+                distribution[node_id]['images'].append({
+                    'filename': job['filename'],
+                    'size': job['file_size']
+                })
+                distribution[node_id]['total_weight'] += job['file_size']
+            
+            # Mostrar distribución por nodo
+            for node_id in sorted(distribution.keys()):
+                node_info = distribution[node_id]
+                log.info("🖥️  %s (%s): %d imágenes, %s", node_info['node_name'], node_info['node_address'],
+                         len(node_info['images']), load_balancer._format_bytes(node_info['total_weight']))
+                if log.isEnabledFor(logging.DEBUG):
+                    for idx, img in enumerate(node_info['images'], 1):
+                        log.debug("   %d. %s (%s)", idx, img['filename'], load_balancer._format_bytes(img['size']))
+            
+            log.info("✅ Distribución completada: %d imágenes en %d nodos", len(jobs), len(set(
+                node['node_id'] for _, node in job_assignments)))
+            
+        except Exception as e:
+            log.error("Error en distribución (lote %s): %s", batch_id, e)
+            raise
+        stage_timings['distribute_ms'] = int((time.time() - stage_start) * 1000)
+        
+        # PROCESAR EN PARALELO
+        stage_start = time.time()
+        futures = []
+        for job, node in job_assignments:
+            job['assigned_node'] = node
+            future = self._submit_job(job)
+            futures.append(future)
+        
+        # ESPERAR RESULTADOS
+        processed_count, failed_count = self._collect_results(futures, len(jobs))
+        stage_timings['process_ms'] = int((time.time() - stage_start) * 1000)
+        
+        # Imágenes que no llegaron a prepararse también cuentan como fallidas
+        failed_count += total_images - len(jobs)
+        
+        return processed_count, failed_count, stage_timings
+    
+    def _run_pipelined(self, batch_id, images):
+        """
+        MODO PIPELINE: decodificación → registro (micro-lotes) → despacho
+        
+        Las etapas se conectan con colas acotadas, así el primer nodo empieza
+        a trabajar apenas se registra la primera imagen en lugar de esperar
+        a que se decodifique y registre el lote completo.
+        
+        Returns:
+            (processed_count, failed_count, stage_timings)
+        """
+        total_images = len(images)
+        pipeline_start = time.time()
+        
+        # Los nodos se resuelven antes de arrancar para fallar rápido si no hay ninguno
+        bins = load_balancer.start_distribution()
+        
+        decode_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        dispatch_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        
+        # Si el registro termina antes de tiempo nadie drena decode_queue:
+        # la decodificación lo ve acá y deja de encolar en lugar de bloquearse
+        stop = threading.Event()
+        
+        stats = {
+            'decode_s': 0.0,
+            'register_s': 0.0,
+            'register_calls': 0,
+            'prepare_failed': 0
+        }
+        
+        def put_unless_stopped(item):
+            while not stop.is_set():
+                try:
+                    decode_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def decode_stage():
+            """ETAPA 1: base64 → archivo temporal"""
+            try:
+                for idx, image_data in enumerate(images, 1):
+                    if stop.is_set():
+                        break
+                    stage_start = time.time()
+                    prepared = self._prepare_job(batch_id, idx, image_data, total_images)
+                    stats['decode_s'] += time.time() - stage_start
+                    
+                    if prepared is None:
+                        stats['prepare_failed'] += 1
+                    elif not put_unless_stopped(prepared):
+                        break
+            finally:
+                put_unless_stopped(_PIPELINE_END)
+        
+        def register_stage():
+            """ETAPA 2: registro en DB por micro-lotes"""
+            finished = False
+            try:
+                while not finished:
+                    # Bloquear por el primer elemento y drenar lo que ya esté listo,
+                    # sin esperar a llenar el micro-lote (no agrega latencia)
+                    pending = []
+                    item = decode_queue.get()
+                    while True:
+                        if item is _PIPELINE_END:
+                            finished = True
+                            break
+                        pending.append(item)
+                        if len(pending) >= PIPELINE_REGISTER_BATCH:
+                            break
+                        try:
+                            item = decode_queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    
+                    if not pending:
+                        continue
+                    
+                    stage_start = time.time()
+                    self._register_jobs(
+                        batch_id,
+                        [batch_image for batch_image, _ in pending],
+                        [job for _, job in pending]
+                    )
+                    stats['register_s'] += time.time() - stage_start
+                    stats['register_calls'] += 1
+                    
+                    for _, job in pending:
+                        dispatch_queue.put(job)
+            except Exception as e:
+                log.error("✗ Registro del lote %s interrumpido: %s", batch_id, e)
+                raise
+            finally:
+                stop.set()
+                dispatch_queue.put(_PIPELINE_END)
+        
+        decoder = threading.Thread(target=tracing.wrap(decode_stage), name=f'decode-{batch_id}', daemon=True)
+        registrar = threading.Thread(target=tracing.wrap(register_stage), name=f'register-{batch_id}', daemon=True)
+        decoder.start()
+        registrar.start()
+        
+        log.info("Lote %s: procesamiento en pipeline (decodificar → registrar → despachar)", batch_id)
+        
+        # ETAPA 3: despacho (hilo actual)
+        futures = []
+        unregistered = 0
+        first_dispatch_s = None
+        
+        while True:
+            job = dispatch_queue.get()
+            if job is _PIPELINE_END:
+                break
+            
+            if 'image_id' not in job:
+                # El micro-lote no pudo registrarse en DB
+                unregistered += 1
+                log.warning("✗ %s sin image_id, no se despacha", job['filename'])
+                continue
+            
+            node = load_balancer.assign_job(bins, job)
+            job['assigned_node'] = node
+            futures.append(self._submit_job(job))
+            
+            if first_dispatch_s is None:
+                first_dispatch_s = time.time() - pipeline_start
+        
+        decoder.join()
+        registrar.join()
+        dispatch_done_s = time.time() - pipeline_start
+        
+        for bin_info in bins:
+            log.info("🖥️  %s: %d imágenes, %s (pipeline)", bin_info['node']['node_name'], bin_info['jobs'],
+                     load_balancer._format_bytes(bin_info['total_weight']))
+        
+        # ESPERAR RESULTADOS
+        processed_count, failed_count = self._collect_results(futures, len(futures))
+        
+        # Lo que no llegó a despacharse (no se pudo preparar o registrar, o una
+        # etapa se cortó) también cuenta como fallido
+        not_dispatched = total_images - len(futures)
+        if not_dispatched != stats['prepare_failed'] + unregistered:
+            log.warning("⚠ Lote %s: %d imágenes no llegaron a despacharse", batch_id,
+                        not_dispatched - stats['prepare_failed'] - unregistered)
+        failed_count += not_dispatched
+        
+        stage_timings = {
+            'decode_ms': int(stats['decode_s'] * 1000),
+            'register_ms': int(stats['register_s'] * 1000),
+            'register_calls': stats['register_calls'],
+            'first_dispatch_ms': int((first_dispatch_s or 0) * 1000),
+            'dispatch_done_ms': int(dispatch_done_s * 1000),
+            'process_ms': int((time.time() - pipeline_start) * 1000)
+        }
+        
+        return processed_count, failed_count, stage_timings
+    
+    def _submit_job(self, job):
+        """Encolar un trabajo en el pool con la traza del lote activa"""
+        job['submitted_ns'] = time.time_ns()
+        return thread_pool.submit(tracing.wrap(self._delegate_to_node), job)
+    
+    @tracing.traced('image.delegate')
     def _delegate_to_node(self, job):
         """Delega procesamiento a un nodo vía gRPC"""
+        # El span cubre desde que el trabajo entró al pool; la espera queda como hijo
+        span = tracing.current_span()
+        if 'submitted_ns' in job and span is not tracing.NOOP_SPAN:
+            span.start_ns = job['submitted_ns']
+            tracing.record_span('image.pool_wait', job['submitted_ns'], time.time_ns())
+        span.set_attribute('image_id', job['image_id'])
+        span.set_attribute('batch_id', job['batch_id'])
+        span.set_attribute('node', job['assigned_node']['node_name'])
+        
         image_id = job['image_id']
         image_path = job['image_path']
         filename = job['filename']
@@ -933,17 +1318,13 @@ class SOAPHandler(BaseHTTPRequestHandler):
         batch_id = job['batch_id']
         node = job['assigned_node']
         
-        thread_name = threading.current_thread().name
         file_size = job.get('file_size', 0)
         
-        print(f"\n[{thread_name}] Delegando {filename} "
-              f"({load_balancer._format_bytes(file_size)})")
-        
         try:
             node_id = node['node_id']
             node_address = f"{node['ip_address']}:{node['port']}"
             
-            print(f"[{thread_name}] Nodo asignado: {node['node_name']} ({node_address})")
+            log.debug("Delegando %s (%d bytes) a %s (%s)", filename, file_size, node['node_name'], node_address)
             
             rest_client.create_log(
                 batch_id=batch_id,
@@ -953,47 +1334,65 @@ class SOAPHandler(BaseHTTPRequestHandler):
                 message=f'Delegando {filename} ({load_balancer._format_bytes(file_size)}) a {node["node_name"]}'
             )
             
+            # NOMBRE DEL ARCHIVO RESULTADO
+            name_without_ext = os.path.splitext(os.path.basename(filename))[0]
+            extension = os.path.splitext(filename)[1]
+            result_filename = f"{name_without_ext}_processed{extension}"
+            relative_path = f'batch_{batch_id}/{result_filename}'
+            
             # DELEGAR AL NODO VÍA gRPC
 ##########################################################################################################################################            
+            rpc_start = time.perf_counter()
             client = NodeClient(node_address)
-            result = client.process_image(image_id, image_path, transformations)
+            if NODE_BY_REFERENCE:
+                result = client.process_image(
+                    image_id, image_path, transformations,
+                    input_key=job['original_key'],
+                    output_key=relative_path
+                )
+            else:
+                result = client.process_image(image_id, image_path, transformations)
             client.close()
+            NODE_RPC_SECONDS.labels(node['node_name'], 'success' if result['success'] else 'failed').observe(
+                time.perf_counter() - rpc_start
+            )
 ###################################################################################################################################################            
             if result['success']:
-                # CREAR DIRECTORIO POR BATCH
-                batch_output_dir = os.path.join(
-                    os.path.dirname(__file__), 
-                    'output', 
-                    f'batch_{batch_id}'
-                )
-                os.makedirs(batch_output_dir, exist_ok=True)
-                
-                # NOMBRE DEL ARCHIVO
-                name_without_ext = os.path.splitext(filename)[0]
-                extension = os.path.splitext(filename)[1]
-                result_filename = f"{name_without_ext}_processed{extension}"
-                result_path = os.path.join(batch_output_dir, result_filename)
-                
-                # GUARDAR IMAGEN RECIBIDA
-                with open(result_path, 'wb') as f:
-                    f.write(result['image_data'])
+                if result.get('result_key'):
+                    # El nodo ya escribió el resultado en el almacenamiento
+                    relative_path = result['result_key']
+                    result_size = result['result_size']
+                else:
+                    # GUARDAR IMAGEN RECIBIDA EN EL ALMACENAMIENTO
+                    with tracing.span('image.store_result', attributes={'bytes': len(result['image_data'])}):
+                        storage.put_bytes(relative_path, result['image_data'])
+                    result_size = len(result['image_data'])
                 
-                print(f"[{thread_name}] Imagen guardada en: {result_path}")
+                log.debug("Imagen guardada en: %s", relative_path)
                 
-                # REGISTRAR EN DB
-                relative_path = f'batch_{batch_id}/{result_filename}'
+                # AGREGAR AL ZIP DEL LOTE (si falla, la descarga se arma al vuelo)
+                if ARCHIVE_PREBUILD_ENABLED:
+                    try:
+                        if result['image_data']:
+                            archive_builder.add(batch_id, result_filename, result['image_data'])
+                        else:
+                            archive_builder.add_file(batch_id, result_filename, storage.local_path(relative_path))
+                    except Exception as e:
+                        log.warning("⚠ No se pudo agregar %s al ZIP del lote %s: %s", result_filename, batch_id, e)
                 
+                # REGISTRAR EN DB (write-behind: se envía en bloque)
                 rest_client.add_image_result(
                     image_id=image_id,
                     node_id=node_id,
                     result_filename=result_filename,
                     storage_path=relative_path,
                     processing_time_ms=result['processing_time_ms'],
-                    status='success'
+                    status='success',
+                    deferred=True,
+                    mark_processed=True,
+                    file_size=result_size
                 )
                 
-                rest_client.mark_image_processed(image_id)
-                
                 rest_client.create_log(
                     batch_id=batch_id,
                     image_id=image_id,
@@ -1002,7 +1401,7 @@ class SOAPHandler(BaseHTTPRequestHandler):
                     message=f'{filename} procesado exitosamente en {result["processing_time_ms"]}ms'
                 )
                 
-                print(f"[{thread_name}] ✓ {filename} completado ({result['processing_time_ms']}ms)")
+                log.debug("✓ %s completado (%s ms)", filename, result['processing_time_ms'])
             else:
                 rest_client.add_image_result(
                     image_id=image_id,
@@ -1011,7 +1410,9 @@ class SOAPHandler(BaseHTTPRequestHandler):
                     storage_path='',
                     processing_time_ms=result['processing_time_ms'],
                     status='failed',
-                    error_message=result['error_message']
+                    error_message=result['error_message'],
+                    deferred=True,
+                    mark_processed=True
                 )
                 
                 rest_client.create_log(
@@ -1022,12 +1423,12 @@ class SOAPHandler(BaseHTTPRequestHandler):
                     message=f'{filename} falló: {result["error_message"]}'
                 )
                 
-                print(f"[{thread_name}] ✗ {filename} falló: {result['error_message']}")
+                log.warning("✗ %s falló: %s", filename, result['error_message'])
             
             return {'success': result['success'], 'filename': filename}
             
         except Exception as e:
-            print(f"[{thread_name}] ✗ Error delegando {filename}: {e}")
+            log.error("✗ Error delegando %s: %s", filename, e)
             
             rest_client.create_log(
                 batch_id=batch_id,
@@ -1157,6 +1558,7 @@ def run_server(host='0.0.0.0', port=8000):
     except KeyboardInterrupt:
         print("\n[SERVIDOR] Deteniendo servidor...")
         thread_pool.shutdown(wait=True)
+        rest_client.close()
         httpd.server_close()
         print("[SERVIDOR] Servidor detenido correctamente.")
 
@@ -0,0 +1,84 @@
+# Archivo: server/tests/test_log_sink.py
+# PRUEBAS DEL SUMIDERO DE LOGS (send_batch falso, sin DB Service)
+#
+# Uso (desde server/):
+#   python -m pytest tests
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_sink import LogSink
+
+class LogSinkTest(unittest.TestCase):
+
+    def make_sink(self, send_batch, **kwargs):
+        options = {'max_queue': 100, 'batch_size': 10, 'flush_interval': 0.01, 'max_retries': 2}
+        options.update(kwargs)
+        sink = LogSink(send_batch, **options)
+        self.addCleanup(sink.close, 1)
+        return sink
+
+    def test_sends_everything_in_blocks(self):
+        batches = []
+        sink = self.make_sink(lambda logs: (batches.append(list(logs)), (True, {}))[1])
+        for i in range(25):
+            self.assertTrue(sink.submit({'message': str(i)}))
+
+        self.assertTrue(sink.flush(timeout=5))
+
+        self.assertTrue(all(len(batch) <= 10 for batch in batches))
+        self.assertEqual([log['message'] for batch in batches for log in batch],
+                         [str(i) for i in range(25)])
+        stats = sink.stats()
+        self.assertEqual(stats['submitted'], 25)
+        self.assertEqual(stats['sent'], 25)
+        self.assertEqual(stats['dropped'], 0)
+
+    def test_full_queue_drops_without_blocking(self):
+        release = threading.Event()
+
+        def send_batch(logs):
+            release.wait(5)
+            return True, {}
+
+        sink = self.make_sink(send_batch, max_queue=3, batch_size=1)
+        accepted = [sink.submit({'message': str(i)}) for i in range(10)]
+        release.set()
+
+        self.assertIn(False, accepted)
+        self.assertTrue(sink.flush(timeout=5))
+        stats = sink.stats()
+        self.assertEqual(stats['dropped'], accepted.count(False))
+        self.assertEqual(stats['sent'], accepted.count(True))
+
+    def test_failed_block_is_retried_then_dropped(self):
+        calls = []
+
+        def send_batch(logs):
+            calls.append(len(logs))
+            raise ConnectionError('DB Service caído')
+
+        sink = self.make_sink(send_batch)
+        sink.submit({'message': 'x'})
+
+        self.assertTrue(sink.flush(timeout=5))
+
+        self.assertEqual(calls, [1, 1])
+        stats = sink.stats()
+        self.assertEqual(stats['failed_batches'], 2)
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['sent'], 0)
+
+    def test_submit_after_close_is_dropped(self):
+        sink = self.make_sink(lambda logs: (True, {}))
+        sink.close(1)
+
+        self.assertFalse(sink.submit({'message': 'tarde'}))
+        self.assertEqual(sink.stats()['dropped'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
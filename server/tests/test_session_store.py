@@ -0,0 +1,94 @@
+# Archivo: server/tests/test_session_store.py
+# PRUEBAS DEL ALMACÉN DE SESIONES EN MEMORIA
+#
+# Uso (desde server/):
+#   python -m pytest tests
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import session_store
+from session_store import MemorySessionStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class MemorySessionStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(session_store.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_before_and_after_expiry(self):
+        store = MemorySessionStore()
+        store.set('a', {'user_id': 1}, ttl=10)
+
+        self.assertEqual(store.get('a'), {'user_id': 1})
+        self.clock.now += 10
+        self.assertIsNone(store.get('a'))
+        self.assertEqual(store.stats()['expired'], 1)
+        self.assertEqual(len(store), 0)
+
+    def test_purge_removes_only_expired(self):
+        store = MemorySessionStore()
+        store.set('short', 1, ttl=5)
+        store.set('long', 2, ttl=50)
+
+        self.clock.now += 6
+
+        self.assertEqual(store.purge_expired(), 1)
+        self.assertIsNone(store.get('short'))
+        self.assertEqual(store.get('long'), 2)
+
+    def test_renewed_session_survives_old_heap_entry(self):
+        store = MemorySessionStore()
+        store.set('a', 1, ttl=5)
+        store.set('a', 1, ttl=60)       # Renovada: la entrada vieja del heap queda obsoleta
+
+        self.clock.now += 10
+
+        self.assertEqual(store.purge_expired(), 0)
+        self.assertEqual(store.get('a'), 1)
+
+    def test_deleted_session_not_counted_as_expired(self):
+        store = MemorySessionStore()
+        store.set('a', 1, ttl=5)
+
+        self.assertTrue(store.delete('a'))
+        self.assertFalse(store.delete('a'))
+        self.clock.now += 10
+
+        self.assertEqual(store.purge_expired(), 0)
+        self.assertEqual(store.stats()['expired'], 0)
+
+    def test_evicts_least_recently_used(self):
+        store = MemorySessionStore(max_entries=2)
+        store.set('a', 1, ttl=60)
+        store.set('b', 2, ttl=60)
+        store.get('a')                  # 'b' pasa a ser la menos usada
+        store.set('c', 3, ttl=60)
+
+        self.assertIsNone(store.get('b'))
+        self.assertEqual(store.get('a'), 1)
+        self.assertEqual(store.get('c'), 3)
+        self.assertEqual(store.stats()['evicted'], 1)
+
+    def test_heap_is_compacted(self):
+        store = MemorySessionStore()
+        for _ in range(3000):
+            store.set('a', 1, ttl=60)
+
+        self.assertLessEqual(len(store._heap), 2 * len(store) + 1024)
+
+if __name__ == '__main__':
+    unittest.main()
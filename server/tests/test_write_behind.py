@@ -0,0 +1,175 @@
+# Archivo: server/tests/test_write_behind.py
+# PRUEBAS DEL BUFFER WRITE-BEHIND (send_batch falso, sin DB Service)
+#
+# Uso (desde server/):
+#   python -m pytest tests
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from write_behind import WriteBehindBuffer
+
+class FakeSender:
+    """send_batch que anota los bloques y responde según los registros"""
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+        self.down = False
+
+    def __call__(self, records):
+        with self.lock:
+            self.batches.append(list(records))
+        if self.down:
+            return False, {'error': 'Connection refused'}
+        if 'bad' in records:
+            return False, {'error': '500 Server Error', 'status_code': 500}
+        if 'boom' in records:
+            raise TypeError('Object of type object is not JSON serializable')
+        rejected = [{'index': index, 'error': 'no existe'}
+                    for index, record in enumerate(records) if record == 'rejected']
+        return True, {'rejected': rejected}
+
+    def delivered(self):
+        """Registros que llegaron en un bloque aceptado"""
+        return [record for batch in self.batches for record in batch
+                if not {'bad', 'boom'} & set(batch) and record != 'rejected']
+
+class WriteBehindBufferTest(unittest.TestCase):
+
+    def make_buffer(self, sender, **kwargs):
+        # flush_interval alto: los envíos los dispara el test con flush()
+        options = {'max_items': 10, 'flush_interval': 60, 'max_retries': 3}
+        options.update(kwargs)
+        buffer = WriteBehindBuffer('test', sender, **options)
+        self.addCleanup(setattr, buffer, '_closed', True)
+        self.addCleanup(buffer._wakeup.set)
+        return buffer
+
+    def test_flush_sends_in_blocks_of_max_items(self):
+        sender = FakeSender()
+        buffer = self.make_buffer(sender)
+        for i in range(25):
+            buffer.add(i)
+
+        self.assertTrue(buffer.flush())
+
+        self.assertEqual([len(batch) for batch in sender.batches], [10, 10, 5])
+        self.assertEqual(sender.delivered(), list(range(25)))
+        self.assertEqual(buffer.stats(), {'pending': 0, 'sent': 25, 'dropped': 0,
+                                          'batches_sent': 3, 'failed_batches': 0})
+
+    def test_background_thread_sends_when_full(self):
+        sender = FakeSender()
+        buffer = self.make_buffer(sender, max_items=5)
+        for i in range(5):
+            buffer.add(i)
+
+        deadline = time.monotonic() + 2
+        while buffer.pending() and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(sender.delivered(), list(range(5)))
+
+    def test_connection_failure_retries_whole_block_then_drops(self):
+        sender = FakeSender()
+        sender.down = True
+        buffer = self.make_buffer(sender)
+        for i in range(4):
+            buffer.add(i)
+
+        for _ in range(2):
+            self.assertFalse(buffer.flush())
+            self.assertEqual(buffer.pending(), 4)
+        self.assertFalse(buffer.flush())
+
+        self.assertEqual([len(batch) for batch in sender.batches], [4, 4, 4])
+        self.assertEqual(buffer.stats()['pending'], 0)
+        self.assertEqual(buffer.stats()['dropped'], 4)
+        self.assertEqual(buffer.stats()['failed_batches'], 3)
+
+    def test_recovers_after_connection_failure(self):
+        sender = FakeSender()
+        sender.down = True
+        buffer = self.make_buffer(sender)
+        for i in range(4):
+            buffer.add(i)
+
+        self.assertFalse(buffer.flush())
+        sender.down = False
+        self.assertTrue(buffer.flush())
+
+        self.assertEqual(sender.batches[-1], [0, 1, 2, 3])
+        self.assertEqual(buffer.stats()['sent'], 4)
+
+    def test_rejected_rows_are_retried_alone(self):
+        sender = FakeSender()
+        buffer = self.make_buffer(sender)
+        for record in (1, 'rejected', 2):
+            buffer.add(record)
+
+        self.assertTrue(buffer.flush())
+
+        self.assertEqual(sender.batches, [[1, 'rejected', 2], ['rejected'], ['rejected']])
+        stats = buffer.stats()
+        self.assertEqual(stats['sent'], 2)
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['pending'], 0)
+
+    def test_bad_record_does_not_sink_the_block(self):
+        sender = FakeSender()
+        buffer = self.make_buffer(sender)
+        records = list(range(9)) + ['bad']
+        for record in records:
+            buffer.add(record)
+
+        # Cada flush aísla al registro malo y le consume un reintento
+        for _ in range(3):
+            buffer.flush()
+
+        self.assertEqual(sorted(sender.delivered()), list(range(9)))
+        stats = buffer.stats()
+        self.assertEqual(stats['sent'], 9)
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['pending'], 0)
+
+    def test_exception_in_send_batch_requeues_block(self):
+        sender = FakeSender()
+        buffer = self.make_buffer(sender)
+        for record in (1, 2, 'boom', 3):
+            buffer.add(record)
+
+        self.assertFalse(buffer.flush())
+
+        # Nada se perdió: lo anterior se envió, 'boom' y lo que sigue esperan
+        self.assertEqual(sender.delivered(), [1, 2])
+        self.assertEqual(buffer.pending(), 2)
+        self.assertGreater(buffer.stats()['failed_batches'], 0)
+        self.assertEqual(buffer.stats()['dropped'], 0)
+
+        # Agotados los reintentos se descarta solo 'boom'
+        self.assertFalse(buffer.flush())
+        self.assertFalse(buffer.flush())
+        self.assertTrue(buffer.flush())
+        self.assertEqual(sender.delivered(), [1, 2, 3])
+        self.assertEqual(buffer.stats()['dropped'], 1)
+
+    def test_close_sends_pending(self):
+        sender = FakeSender()
+        buffer = WriteBehindBuffer('test', sender, max_items=10, flush_interval=0.05)
+        for i in range(3):
+            buffer.add(i)
+
+        buffer.close()
+
+        self.assertEqual(sender.delivered(), [0, 1, 2])
+        self.assertFalse(buffer._thread.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
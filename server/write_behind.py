@@ -0,0 +1,183 @@
+# Archivo: server/write_behind.py
+# BUFFER DE ESCRITURA DIFERIDA (WRITE-BEHIND) PARA LLAMADAS AL DB SERVICE
+
+import threading
+import time
+
+from logger import get_logger
+import tracing
+
+log = get_logger('WRITE-BEHIND')
+
+class WriteBehindBuffer:
+    """
+    Acumula registros en memoria y los envía en bloque al DB Service
+
+    El envío ocurre en un thread propio cuando se alcanza max_items o
+    cuando pasan flush_interval segundos, así los threads que procesan
+    imágenes no esperan ningún round-trip HTTP. flush() fuerza el envío
+    de todo lo pendiente y retorna recién cuando terminó.
+
+    Cada registro guarda la traza activa al encolarlo: el envío en bloque
+    se registra como span hijo del primero y enlazado (links) al resto.
+
+    Un registro malo no arrastra al resto del bloque: las filas que el DB
+    Service rechaza ('rejected' con 'index') se reintentan solas, y si el
+    bloque entero falla con el servidor respondiendo (o send_batch lanza
+    una excepción) se reenvía en mitades hasta aislar al culpable. Si el
+    servidor no responde se reintenta el bloque completo más tarde.
+    """
+
+    def __init__(self, name, send_batch, max_items=50, flush_interval=0.5, max_retries=3):
+        """
+        Args:
+            name: Nombre del buffer (para logs)
+            send_batch: Función que recibe una lista de registros y retorna (success, result);
+                        result puede traer 'rejected': [{'index': i, 'error': str}] y,
+                        si falló con respuesta del servidor, 'status_code'
+            max_items: Cantidad de registros que dispara un envío
+            flush_interval: Segundos máximos que un registro espera en el buffer
+            max_retries: Reintentos de un registro antes de descartarlo
+        """
+        self.name = name
+        self.send_batch = send_batch
+        self.max_items = max_items
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._items = []                  # Lista de (registro, intentos, SpanContext)
+        self._lock = threading.Lock()     # Protege _items
+        self._flush_lock = threading.Lock()  # Serializa los envíos
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.batches_sent = 0
+        self.failed_batches = 0
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f'write-behind-{name}',
+            daemon=True
+        )
+        self._thread.start()
+
+    def add(self, record):
+        """Encola un registro (no bloquea por red)"""
+        with self._lock:
+            self._items.append((record, 0, tracing.current_context()))
+            size = len(self._items)
+
+        if size >= self.max_items:
+            self._wakeup.set()
+
+    def pending(self):
+        """Cantidad de registros esperando envío"""
+        with self._lock:
+            return len(self._items)
+
+    def flush(self):
+        """
+        Envía todo lo pendiente
+
+        Returns:
+            bool: True si no quedó nada pendiente
+        """
+        with self._flush_lock:
+            limit = self.max_items
+            while True:
+                with self._lock:
+                    batch = self._items[:limit]
+                    self._items = self._items[limit:]
+
+                if not batch:
+                    return True
+
+                contexts = [context for _, _, context in batch if context is not None]
+                with tracing.span(f'write_behind.{self.name}', parent=contexts[0] if contexts else None,
+                                  links=contexts[1:], attributes={'records': len(batch)}) as span:
+                    try:
+                        success, result = self.send_batch([record for record, _, _ in batch])
+                    except Exception as e:
+                        # Un registro que no se puede serializar/enviar: tratarlo como rechazo del bloque
+                        log.exception("%s: error enviando %d registros: %s", self.name, len(batch), e)
+                        span.set_error(e)
+                        success, result = False, {'error': str(e), 'exception': True}
+
+                if success:
+                    rejected = self._rejected(batch, result)
+                    self.sent += len(batch) - len(rejected)
+                    self.batches_sent += 1
+                    if rejected:
+                        self._requeue(rejected)
+                        log.warning("%s: %d de %d registros rechazados (%s)", self.name, len(rejected),
+                                    len(batch), result['rejected'][0].get('error'))
+                    continue
+
+                self.failed_batches += 1
+                if len(batch) > 1 and ('status_code' in result or result.get('exception')):
+                    # El servidor respondió: probablemente un registro malo. Reenviar en mitades
+                    limit = (len(batch) + 1) // 2
+                    with self._lock:
+                        self._items = batch + self._items
+                    continue
+
+                retry = self._requeue(batch)
+                log.warning("%s: error enviando %d registros: %s (%d reencolados)",
+                            self.name, len(batch), result.get('error'), retry)
+                return False
+
+    def _rejected(self, batch, result):
+        """Registros del bloque que el DB Service rechazó por fila"""
+        rejected = []
+        for entry in (result or {}).get('rejected') or []:
+            index = entry.get('index') if isinstance(entry, dict) else None
+            if isinstance(index, int) and 0 <= index < len(batch):
+                rejected.append(batch[index])
+        return rejected
+
+    def _requeue(self, items):
+        """
+        Reencolar al frente lo que todavía tiene reintentos
+
+        Returns:
+            int: registros reencolados (el resto se cuenta en dropped)
+        """
+        retry = [(record, attempts + 1, context) for record, attempts, context in items
+                 if attempts + 1 < self.max_retries]
+        self.dropped += len(items) - len(retry)
+
+        with self._lock:
+            self._items = retry + self._items
+        return len(retry)
+
+    def close(self):
+        """Detiene el thread de envío y vacía el buffer"""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=self.flush_interval * 4 + 5)
+        self.flush()
+
+    def stats(self):
+        """Contadores del buffer"""
+        return {
+            'pending': self.pending(),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'batches_sent': self.batches_sent,
+            'failed_batches': self.failed_batches
+        }
+
+    def _run(self):
+        """Loop del thread: envía por tamaño o por tiempo"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+            try:
+                if not self.flush():
+                    # Evitar martillar al DB Service si está caído
+                    time.sleep(self.flush_interval)
+            except Exception as e:
+                log.exception("%s: error inesperado: %s", self.name, e)
@@ -0,0 +1,260 @@
+# Archivo: tools/trace_timeline.py
+# CAMINO CRÍTICO Y LÍNEA DE TIEMPO DE UN LOTE A PARTIR DE LAS TRAZAS EXPORTADAS
+#
+# Lee los archivos JSON Lines que escribe tracing.py en cada servicio
+# (TRACE_EXPORTER=file, un ExportTraceServiceRequest OTLP por línea), arma
+# el árbol de spans de la traza del lote y muestra:
+#   - el camino crítico: qué etapa ocupaba el tiempo en cada momento,
+#   - una línea de tiempo de las etapas del camino crítico,
+#   - el total por etapa (todas las spans, incluidas las paralelas).
+#
+# Los relojes de cada máquina no están sincronizados: entre hosts distintos
+# los inicios pueden correrse unos milisegundos.
+#
+# Uso:
+#   python tools/trace_timeline.py --batch 42 backend_rest/traces/*.jsonl server/traces/*.jsonl \
+#       db_service/traces/*.jsonl node/traces/*.jsonl
+#   python tools/trace_timeline.py --trace 4bf92f3577b34da6a3ce929d0e0e4736 traces/*.jsonl
+#   python tools/trace_timeline.py --list traces/*.jsonl
+
+import argparse
+import glob
+import json
+from collections import defaultdict
+
+class SpanRecord:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'service', 'start', 'end',
+                 'attributes', 'error', 'links', 'children')
+
+    def __init__(self, raw, service):
+        self.trace_id = raw['traceId']
+        self.span_id = raw['spanId']
+        self.parent_id = raw.get('parentSpanId') or None
+        self.name = raw['name']
+        self.service = service
+        self.start = int(raw['startTimeUnixNano'])
+        self.end = max(int(raw['endTimeUnixNano']), self.start)
+        self.attributes = {item['key']: _value(item['value']) for item in raw.get('attributes', [])}
+        self.error = raw.get('status', {}).get('message') if raw.get('status', {}).get('code') == 2 else None
+        self.links = [(link['traceId'], link['spanId']) for link in raw.get('links', [])]
+        self.children = []
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+def _value(value):
+    if 'intValue' in value:
+        return int(value['intValue'])
+    for key in ('stringValue', 'doubleValue', 'boolValue'):
+        if key in value:
+            return value[key]
+    return None
+
+def load_spans(patterns):
+    """Todas las spans de los archivos (acepta comodines)"""
+    spans = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    for resource_spans in json.loads(line).get('resourceSpans', []):
+                        service = 'desconocido'
+                        for item in resource_spans.get('resource', {}).get('attributes', []):
+                            if item['key'] == 'service.name':
+                                service = _value(item['value'])
+                        for scope_spans in resource_spans.get('scopeSpans', []):
+                            for raw in scope_spans.get('spans', []):
+                                record = SpanRecord(raw, service)
+                                spans[(record.trace_id, record.span_id)] = record
+    return spans
+
+def find_trace(spans, batch_id):
+    """Traza que contiene una span con el atributo batch_id"""
+    candidates = defaultdict(int)
+    for span in spans.values():
+        if span.attributes.get('batch_id') == batch_id:
+            candidates[span.trace_id] += 1
+    if not candidates:
+        return None
+    return max(candidates, key=candidates.get)
+
+def build_tree(spans, trace_id):
+    """
+    Árbol de la traza. Los envíos en bloque (write-behind) que la enlazan
+    desde otra traza se cuelgan del span enlazado.
+
+    Returns:
+        (raíces, spans de la traza)
+    """
+    members = {span_id: span for (tid, span_id), span in spans.items() if tid == trace_id}
+
+    for span in spans.values():
+        if span.trace_id != trace_id and any(tid == trace_id for tid, _ in span.links):
+            members.setdefault(span.span_id, span)
+
+    roots = []
+    for span in members.values():
+        span.children = []
+    for span in members.values():
+        parent = members.get(span.parent_id)
+        if parent is None and span.trace_id != trace_id:
+            linked = [sid for tid, sid in span.links if tid == trace_id]
+            parent = members.get(linked[0]) if linked else None
+        if parent is not None and parent is not span:
+            parent.children.append(span)
+        else:
+            roots.append(span)
+
+    for span in members.values():
+        span.children.sort(key=lambda child: child.start)
+    roots.sort(key=lambda span: span.start)
+    return roots, members
+
+def critical_path(span, until=None):
+    """
+    Segmentos (span, desde, hasta) que cubren la duración de span
+
+    Desde el final hacia atrás, el tiempo se atribuye al hijo que terminó
+    último antes del cursor (recursivamente); lo que no cubre ningún hijo
+    es tiempo propio del span.
+    """
+    cursor = span.end if until is None else min(until, span.end)
+    segments = []
+
+    for child in sorted(span.children, key=lambda child: child.end, reverse=True):
+        if cursor <= span.start:
+            break
+        if child.start >= cursor:
+            continue
+        child_end = min(child.end, cursor)
+        if child_end < cursor:
+            segments.append((span, child_end, cursor))
+        segments.extend(critical_path(child, child_end))
+        cursor = max(child.start, span.start)
+
+    if cursor > span.start:
+        segments.append((span, span.start, cursor))
+    return segments
+
+def _ms(nanoseconds):
+    return nanoseconds / 1e6
+
+def _label(span):
+    label = span.name
+    for key in ('filename', 'node', 'image_id'):
+        if key in span.attributes:
+            label += f' [{key}={span.attributes[key]}]'
+            break
+    return label
+
+def report(roots, members, width):
+    root = max(roots, key=lambda span: span.duration)
+    origin = root.start
+    total = max(root.duration, 1)
+    services = {span.service for span in members.values()}
+
+    batch_id = next((span.attributes['batch_id'] for span in members.values()
+                     if 'batch_id' in span.attributes), '-')
+    errors = [span for span in members.values() if span.error]
+    print(f"Traza {root.trace_id}  lote {batch_id}  duración {_ms(total):,.1f} ms  "
+          f"({len(members)} spans, servicios: {', '.join(sorted(services))})")
+    if errors:
+        print(f"  ⚠ {len(errors)} spans con error (p. ej. {errors[0].name}: {errors[0].error})")
+
+    # Camino crítico en orden cronológico, uniendo segmentos seguidos del mismo span
+    segments = sorted(critical_path(root), key=lambda segment: segment[1])
+    merged = []
+    for span, start, end in segments:
+        if merged and merged[-1][0] is span and merged[-1][2] == start:
+            merged[-1][2] = end
+        else:
+            merged.append([span, start, end])
+
+    print("\nCAMINO CRÍTICO")
+    print(f"  {'inicio ms':>10} {'propio ms':>10} {'%':>6}  {'servicio':<14} etapa")
+    for span, start, end in merged:
+        share = (end - start) / total * 100
+        if share < 0.1:
+            continue
+        print(f"  {_ms(start - origin):10.1f} {_ms(end - start):10.1f} {share:5.1f}%  "
+              f"{span.service:<14} {_label(span)}")
+
+    # Línea de tiempo: █ tramo en el camino crítico, ░ resto de la span
+    print("\nLÍNEA DE TIEMPO (etapas del camino crítico)")
+    on_path = defaultdict(list)
+    order = []
+    for span, start, end in merged:
+        if span not in on_path:
+            order.append(span)
+        on_path[span].append((start, end))
+
+    scale = width / total
+    for span in order:
+        if sum(end - start for start, end in on_path[span]) / total < 0.005:
+            continue
+        bar = [' '] * width
+        for position in range(int((span.start - origin) * scale), min(width, int((span.end - origin) * scale) + 1)):
+            bar[position] = '░'
+        for start, end in on_path[span]:
+            for position in range(int((start - origin) * scale), min(width, int((end - origin) * scale) + 1)):
+                bar[position] = '█'
+        print(f"  {_label(span)[:34]:<34} |{''.join(bar)}| {_ms(span.duration):,.1f} ms")
+
+    # Total por etapa (incluye lo que corre en paralelo)
+    print("\nETAPAS (todas las spans)")
+    print(f"  {'etapa':<32} {'servicio':<14} {'spans':>6} {'total ms':>11} {'p50 ms':>9} "
+          f"{'máx ms':>9} {'crítico ms':>11}")
+    stages = defaultdict(list)
+    critical = defaultdict(int)
+    for span in members.values():
+        stages[(span.name, span.service)].append(span.duration)
+    for span, start, end in merged:
+        critical[(span.name, span.service)] += end - start
+
+    for (name, service), durations in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        durations.sort()
+        print(f"  {name[:32]:<32} {service:<14} {len(durations):6d} {_ms(sum(durations)):11,.1f} "
+              f"{_ms(durations[len(durations) // 2]):9,.1f} {_ms(durations[-1]):9,.1f} "
+              f"{_ms(critical[(name, service)]):11,.1f}")
+
+def list_batches(spans):
+    batches = {}
+    for span in spans.values():
+        batch_id = span.attributes.get('batch_id')
+        if batch_id is not None and span.parent_id is not None:
+            batches.setdefault(batch_id, span.trace_id)
+    for batch_id in sorted(batches):
+        print(f"  lote {batch_id:<8} traza {batches[batch_id]}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Camino crítico de un lote a partir de las trazas')
+    parser.add_argument('files', nargs='+', help='Archivos JSON Lines de los servicios (acepta comodines)')
+    parser.add_argument('--batch', type=int, help='batch_id del lote')
+    parser.add_argument('--trace', help='trace_id (32 hex) en lugar de --batch')
+    parser.add_argument('--list', action='store_true', help='Listar los lotes encontrados')
+    parser.add_argument('--width', type=int, default=60, help='Ancho de la línea de tiempo')
+    args = parser.parse_args()
+
+    spans = load_spans(args.files)
+    if not spans:
+        raise SystemExit('No se encontraron spans')
+
+    if args.list or (args.batch is None and args.trace is None):
+        list_batches(spans)
+        return
+
+    trace_id = args.trace or find_trace(spans, args.batch)
+    if trace_id is None:
+        raise SystemExit(f'No hay spans con batch_id={args.batch}')
+
+    roots, members = build_tree(spans, trace_id)
+    if not members:
+        raise SystemExit(f'No hay spans de la traza {trace_id}')
+    report(roots, members, args.width)
+
+if __name__ == '__main__':
+    main()